@@ -1,8 +1,45 @@
+import os
 import random
-pieceScore = {"K": 0, "Q": 900, "R": 500, "N": 300, "B": 310, "P": 100}
-CHECKMATE = 10000
+import sys
+import time
+from Chess import ChessTranspositionTable, ChessMoveOrdering, ChessOpeningBook, ChessTablebase, ChessSearchStats
+from Chess.ChessTranspositionTable import EXACT, LOWER, UPPER
+from Chess.ChessEvaluation import pieceScore, piece_optimal_squares, position_value
+CHECKMATE = 10000  # being mated n plies from the root scores -(CHECKMATE - n)
 STALEMATE = 0
 DEPTH = 4
+MAX_DEPTH = 32  # deepest iteration findBestMove will start
+TIME_LIMIT = 2.0  # seconds findBestMove may think for, None to only stop at maxDepth / nodeLimit
+SEARCH_WORKERS = 1  # above 1, findBestMove spreads the root moves over this many processes (see ChessParallel)
+DEBUG_EVAL = False  # recompute every leaf score from scratch and check it against the running total
+TT_SIZE_MB = 16  # memory budget of the transposition table
+QUIESCENCE = True  # at depth 0 keep searching captures and promotions until the position is quiet
+DELTA_MARGIN = 200  # quiescence skips captures that can't raise alpha even when winning this much extra
+BATCH_EVAL = False  # order the last ply's moves with ChessBatchEval.scoreChildren, slower (see orderByChildScores)
+STALEMATE_PROBE_PIECES = 12  # with this many pieces or fewer, quiescence checks a position without captures for stalemate
+transpositionTable = ChessTranspositionTable.TranspositionTable(TT_SIZE_MB)
+moveOrderer = ChessMoveOrdering.MoveOrderer()
+OPENING_BOOK_PATH = os.path.join(os.path.dirname(__file__), "books", "openings.bin")  # None to play without a book
+openingBook = None  # opened on first use, False if there is no usable book file
+TABLEBASE_PATH = os.path.join(os.path.dirname(__file__), "tablebases")  # None to play without endgame tables
+TABLEBASE_WIN = CHECKMATE - 1000  # a tablebase win n plies from the root scores TABLEBASE_WIN - n
+MAX_TABLEBASE_PLIES = 255  # the tables store the distance to mate in one byte
+MATE_BOUND = TABLEBASE_WIN - 2 * MAX_TABLEBASE_PLIES  # a score this far from 0 is a forced mate, from a search or the tables
+tablebases = None  # ChessTablebase.Tablebases found on first use, False if there are no tables
+searchScore = None  # score for the side to move of the last depth findBestMove finished, None after a book move
+searchDepth = 0  # that depth, 0 if the move came from the book or the tables
+stopSearch = False  # set from another thread to end the search at the next node, findBestMove keeps the last full depth
+iterationCallback = None  # called as (depth, score, nodes, principal variation) each time findBestMove finishes a depth
+stats = ChessSearchStats.SearchStats()  # statistics of the current / last search, see ChessSearchStats
+PRINT_STATS = True  # print a summary line after every findBestMove
+STATS_PATH = None  # file to append the statistics of every findBestMove to as JSON lines
+TIME_CALLS = False  # count and time the GameState calls and evaluation during the search (slows it down)
+PROFILE_PATH = None  # file to write the cProfile statistics of all searches so far to after each one
+
+
+class SearchTimeout(Exception):
+    pass
+
 
 def findRandomMove(validMoves):
     return validMoves[random.randint(0, len(validMoves)-1)]
@@ -24,13 +61,7 @@ def findBestMoveOG(gs, validMoves):
             opponentMaxScore = -CHECKMATE       # If it is not checkmate or stalemate, calculates opposing moves
             for opponentsMove in opponentsMoves:
                 gs.makeMove(opponentsMove)      # Makes a potential move
-                gs.get_valid_moves()            # Checks if it is checkmate or stalemate
-                if gs.checkmate:                # If checkmate, score = Max value
-                    score = CHECKMATE
-                elif gs.stalemate:              # If stalemate, score = 0
-                    score = STALEMATE
-                else:                           # If neither, calculates score of board
-                    score = -turnMultiplier * scoreBoard(gs)
+                score = -turnMultiplier * scoreBoard(gs)    # Checkmate scores max value, stalemate 0
                 if score > opponentMaxScore:    # If score is greater than opponent max score, sets opp score.
                     opponentMaxScore = score
                 gs.undo_move()
@@ -40,18 +71,193 @@ def findBestMoveOG(gs, validMoves):
         gs.undo_move()
     return bestPlayerMove
 """
-Helper method to make first recursive call
+Returns a book move for the position, or None if there is no book or the position is out of book
 """
-def findBestMove(gs, validMoves):
-    global nextMove, counter
-    nextMove = None
-    counter = 0
-    random.shuffle(validMoves)
+def findBookMove(gs, validMoves):
+    global openingBook
+    if openingBook is None:
+        openingBook = False
+        if OPENING_BOOK_PATH is not None and os.path.exists(OPENING_BOOK_PATH):
+            try:
+                openingBook = ChessOpeningBook.OpeningBook(OPENING_BOOK_PATH)
+            except ValueError as error:
+                print(error, file=sys.stderr)  # stdout is the UCI channel under ChessUCI
+    if not openingBook:
+        return None
+    return openingBook.chooseMove(gs, validMoves)
+
+
+"""
+Returns the endgame tables (opening them on first use), or False if there are none
+"""
+def loadTablebases():
+    global tablebases
+    if tablebases is None:
+        tablebases = False
+        if TABLEBASE_PATH is not None:
+            found = ChessTablebase.Tablebases(TABLEBASE_PATH)
+            if found.paths:
+                tablebases = found
+    return tablebases
+
+
+"""
+Search score of a tablebase result for the side to move, probed ply moves from the root: wins count down from
+TABLEBASE_WIN with the distance to mate from the root, losses are the negative of that and draws are 0
+"""
+def tablebaseScore(result, ply=0):
+    outcome, plies = result
+    return outcome * (TABLEBASE_WIN - ply - plies)
+
+
+"""
+True for the score of a forced mate, whether the search found it or the tables know it
+"""
+def isMateScore(score):
+    return abs(score) >= MATE_BOUND
+
+
+"""
+Plies from the root to the mate of a mate score (see isMateScore), found by the search or in the tables
+"""
+def mateDistance(score):
+    score = abs(score)
+    return CHECKMATE - score if score > TABLEBASE_WIN else TABLEBASE_WIN - score
+
+
+"""
+The transposition table keeps mate scores counted from the position stored rather than from the root, so they stay
+right when the position comes up again at another ply. scoreFromTable turns them back.
+"""
+def scoreToTable(score, ply):
+    if score >= MATE_BOUND:
+        return score + ply
+    if score <= -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def scoreFromTable(score, ply):
+    if score >= MATE_BOUND:
+        return score - ply
+    if score <= -MATE_BOUND:
+        return score + ply
+    return score
+
+
+"""
+Helper method to make first recursive call. Positions in the opening book are answered from the book, and positions in
+the endgame tables with the fastest mate (or slowest loss) they know, both without a search.
+Otherwise uses iterative deepening: searches depth 1, 2, 3... until the time or node
+budget runs out, and returns the best move of the last depth that finished. Each iteration searches the principal
+variation of the one before first. Depth 1 always finishes so there is always a move to return.
+The statistics of the search are kept in stats, returnStats=True returns (move, stats) instead of the move.
+"""
+def findBestMove(gs, validMoves, timeLimit=TIME_LIMIT, maxDepth=MAX_DEPTH, nodeLimit=None, useBook=True,
+                 returnStats=False):
+    global stats, searchScore, searchDepth
+    stats = searchStats = ChessSearchStats.SearchStats()
+    searchScore = None
+    searchDepth = 0
+    # The timed calls are set on gs itself, which the parallel search has to send to its workers
+    with ChessSearchStats.instrumented(searchStats, gs, sys.modules[__name__], TIME_CALLS and SEARCH_WORKERS <= 1,
+                                       PROFILE_PATH):
+        bestMove = chooseMove(gs, validMoves, timeLimit, maxDepth, nodeLimit, useBook)
+    if searchStats.source == "search":
+        searchStats.finish(bestMove, transpositionTable, moveOrderer)
+    else:
+        searchStats.finish(bestMove)
+    if PRINT_STATS:
+        print(searchStats.summary())
+    if STATS_PATH is not None:
+        searchStats.writeJSON(STATS_PATH)
+    return (bestMove, searchStats) if returnStats else bestMove
+
+
+def chooseMove(gs, validMoves, timeLimit, maxDepth, nodeLimit, useBook):
+    global nextMove, deadline, maxNodes, canAbort, principalVariation, followPV, pvTable, searchScore, searchDepth
+    if useBook:
+        bookMove = findBookMove(gs, validMoves)
+        if bookMove is not None:
+            stats.source = "book"
+            return bookMove
+    if loadTablebases():
+        tablebaseMove = tablebases.bestMove(gs, validMoves)
+        if tablebaseMove is not None:
+            stats.source = "tablebase"
+            return tablebaseMove
+    if SEARCH_WORKERS > 1:
+        from Chess import ChessParallel
+        stats.source = "parallel"
+        return ChessParallel.findBestMoveParallel(gs, validMoves, SEARCH_WORKERS, timeLimit, maxDepth, nodeLimit, stats)
+    deadline = None if timeLimit is None else time.time() + timeLimit
+    maxNodes = nodeLimit
+    transpositionTable.newSearch()
+    moveOrderer.newSearch()
+    random.shuffle(validMoves)  # so equally good moves are picked at random
     # findMoveMinMax(gs, validMoves, DEPTH, gs.whiteToMove)
     #findMoveNegaMax(gs, validMoves, DEPTH, 1 if gs.whiteToMove else -1)
-    findMoveNegaMaxAlphaBeta(gs, validMoves, DEPTH, -CHECKMATE, CHECKMATE, 1 if gs.whiteToMove else -1)
-    print(counter)
-    return nextMove
+    bestMove = None
+    principalVariation = []
+    startLength = len(gs.moveLog)
+    for depth in range(1, maxDepth + 1):
+        nextMove = None
+        canAbort = depth > 1
+        followPV = True
+        pvTable = [[] for ply in range(depth + 1)]
+        try:
+            score = findMoveNegaMaxAlphaBeta(gs, validMoves, depth, -CHECKMATE, CHECKMATE, 1 if gs.whiteToMove else -1)
+        except SearchTimeout:
+            while len(gs.moveLog) > startLength:  # unwind the moves the interrupted iteration left on the board
+                gs.undo_move()
+            break
+        bestMove = nextMove
+        searchScore = score
+        searchDepth = depth
+        principalVariation = pvTable[0]
+        stats.recordIteration(depth, score, principalVariation)
+        if iterationCallback is not None:
+            iterationCallback(depth, score, stats.nodes, principalVariation)
+        if len(validMoves) <= 1 or isMateScore(score):  # nothing to gain from searching deeper
+            break
+    return bestMove
+
+
+"""
+Target for a background search process (see ChessMain). Puts (position key, moveID of the best move) on returnQueue so
+the receiver can check the answer still belongs to the position on its board.
+"""
+def findBestMoveWorker(gs, validMoves, returnQueue):
+    move = findBestMove(gs, validMoves)
+    returnQueue.put((gs.zobristKey, None if move is None else move.moveID))
+
+
+"""
+Searches gs to the given depth with a full window and returns (score for the side to move, nodes searched). This is
+what a parallel worker runs for each root move, with ply 1 so mate scores count from the real root. Raises
+SearchTimeout if searchDeadline or nodeLimit is reached.
+"""
+def scorePosition(gs, depth, searchDeadline=None, nodeLimit=None, ply=0):
+    global stats, deadline, maxNodes, canAbort, principalVariation, followPV, pvTable
+    loadTablebases()
+    stats = ChessSearchStats.SearchStats()
+    deadline = searchDeadline
+    maxNodes = nodeLimit
+    canAbort = True
+    principalVariation = []
+    followPV = False
+    pvTable = [[] for index in range(ply + depth + 1)]
+    score = findMoveNegaMaxAlphaBeta(gs, None, depth, -CHECKMATE, CHECKMATE, 1 if gs.whiteToMove else -1, ply)
+    return score, stats.nodes
+
+
+"""
+Raises SearchTimeout once the time or node budget of the current search is used up, or stopSearch is set
+"""
+def checkSearchBudget():
+    if canAbort:
+        if stopSearch or (deadline is not None and time.time() > deadline) or (maxNodes is not None and stats.nodes >= maxNodes):
+            raise SearchTimeout()
 
 def findMoveMinMax(gs, validMoves, depth, whiteToMove):
     global nextMove
@@ -86,9 +292,10 @@ def findMoveMinMax(gs, validMoves, depth, whiteToMove):
 
 
 def findMoveNegaMax(gs, validMoves, depth, turnMultiplier):
-    global nextMove, counter
+    global nextMove
     if depth == 0:
-        counter += 1
+        stats.nodes += 1
+        stats.leafEvaluations += 1
         return turnMultiplier * scoreBoard(gs)
     maxScore = -CHECKMATE
     for move in validMoves:
@@ -104,33 +311,158 @@ def findMoveNegaMax(gs, validMoves, depth, turnMultiplier):
 
 
 '''
-Finds move using negamax algorithm with alpha beta pruning
+Finds move using negamax algorithm with alpha beta pruning. Below the root validMoves is None and each node generates
+its own moves lazily through the move orderer, so a transposition table cutoff skips move generation and a beta cutoff
+skips the moves not reached yet. ply counts moves from the root.
 '''
-def findMoveNegaMaxAlphaBeta(gs, validMoves, depth, alpha, beta, turnMultiplier):
-    global nextMove, counter
-    counter+=1
+def findMoveNegaMaxAlphaBeta(gs, validMoves, depth, alpha, beta, turnMultiplier, ply=0):
+    global nextMove, followPV
+    stats.nodes += 1
+    checkSearchBudget()
+    pvTable[ply] = []
+    if ply != 0 and gs.isRepetition(2):  # going back to an earlier position is scored as a draw
+        return STALEMATE
+    if tablebases and ply != 0 and gs.pieceCount <= tablebases.maxPieces:
+        result = tablebases.probe(gs)
+        if result is not None:  # the tables know the outcome, no need to search this subtree
+            return tablebaseScore(result, ply)
     if depth == 0:
-        return turnMultiplier * scoreBoard(gs)
-    # Move ordering - implement later
-    maxScore = -CHECKMATE
-    for move in validMoves:
+        if QUIESCENCE:
+            stats.nodes -= 1  # counted again as a quiescence node
+            return quiescence(gs, alpha, beta, turnMultiplier, ply)
+        stats.leafEvaluations += 1
+        score = turnMultiplier * scoreBoard(gs)
+        return score + ply if score == -CHECKMATE else score  # only the side to move can be mated
+    alphaOrig = alpha
+    ttEntry = transpositionTable.probe(gs.zobristKey)
+    if ttEntry is not None:
+        ttDepth, ttBound, ttScore, ttMoveID = ttEntry
+        ttScore = scoreFromTable(ttScore, ply)
+        # Reuse a result searched at least as deep, the root still has to search to pick nextMove
+        if ttDepth >= depth and ply != 0:
+            if ttBound == EXACT:
+                transpositionTable.cutoffs += 1
+                return ttScore
+            elif ttBound == LOWER:
+                alpha = max(alpha, ttScore)
+            else:
+                beta = min(beta, ttScore)
+            if alpha >= beta:
+                transpositionTable.cutoffs += 1
+                return ttScore
+    # Search the previous iteration's principal variation first, otherwise the stored best move
+    firstMoveID = None
+    if followPV and ply < len(principalVariation):
+        firstMoveID = principalVariation[ply]
+    elif ttEntry is not None:
+        firstMoveID = ttMoveID
+    if validMoves is None and BATCH_EVAL and depth == 1:
+        moves = orderByChildScores(gs, gs.get_valid_moves(), turnMultiplier, firstMoveID)
+    elif validMoves is None:
+        # Below the root moves are generated stage by stage, a cutoff stops before the rest are made
+        moves = moveOrderer.stagedMoves(gs, ply, firstMoveID)
+    else:
+        moveOrderer.orderMoves(validMoves, ply, firstMoveID)
+        moves = validMoves
+    maxScore = -CHECKMATE - 1  # below any real score, so a move is kept even when every move gets mated
+    bestMove = None
+    for moveIndex, move in enumerate(moves):
         gs.makeMove(move)
-        nextMoves = gs.get_valid_moves()
-        score = -findMoveNegaMaxAlphaBeta(gs, nextMoves, depth-1, -beta, -alpha, -turnMultiplier)
+        score = -findMoveNegaMaxAlphaBeta(gs, None, depth-1, -beta, -alpha, -turnMultiplier, ply + 1)
+        followPV = False  # only the first move searched at each node can be on the principal variation
         if score > maxScore:
             maxScore = score
-            if depth == DEPTH:
+            bestMove = move
+            if ply == 0:
                 nextMove = move
         gs.undo_move()
         if maxScore > alpha:
             alpha = maxScore
+            pvTable[ply] = [move.moveID] + pvTable[ply + 1]
         if alpha >= beta:
+            moveOrderer.recordCutoff(move, ply, depth, moveIndex)
             break
+    if bestMove is None:  # no legal move, generating the (empty) list left inCheck set for this position
+        return -CHECKMATE + ply if gs.inCheck else STALEMATE
+    if maxScore <= alphaOrig:
+        transpositionTable.store(gs.zobristKey, depth, UPPER, scoreToTable(maxScore, ply))  # fail low, no best move
+    else:
+        bound = LOWER if maxScore >= beta else EXACT
+        transpositionTable.store(gs.zobristKey, depth, bound, scoreToTable(maxScore, ply), bestMove.moveID)
     return maxScore
+"""
+The moves of a node at the last ply, firstMoveID first and then by the static score of the child each one leads to, best
+for the side to move first. ChessBatchEval.scoreChildren scores all the children in one call without making the moves.
+Only the order changes, not the result. It searches more nodes than the staged generator and takes longer, because
+every move is generated up front and a capture of a defended piece looks best, so BATCH_EVAL is off.
+"""
+def orderByChildScores(gs, moves, turnMultiplier, firstMoveID):
+    from Chess import ChessBatchEval
+    scores = ChessBatchEval.scoreChildren(gs, moves)
+    order = sorted(range(len(moves)), key=lambda index: (moves[index].moveID == firstMoveID,
+                                                         turnMultiplier * int(scores[index])), reverse=True)
+    return [moves[index] for index in order]
+
+
+'''
+Searches only captures and promotions (all moves when in check) until the position is quiet, so the score at the
+horizon doesn't depend on a capture that is about to be answered. The side to move can always stand pat on the static
+score instead of capturing, except in check. Captures that can't bring the score up to alpha even with DELTA_MARGIN to
+spare are skipped (delta pruning).
+'''
+def quiescence(gs, alpha, beta, turnMultiplier, ply):
+    stats.nodes += 1
+    stats.quiescenceNodes += 1
+    checkSearchBudget()
+    stages = gs.generateMovesInStages()
+    moves = next(stages)  # captures and promotions, the quiet moves are never generated unless in check
+    inCheck = gs.inCheck
+    if inCheck:
+        moves = moves + next(stages)
+        if not moves:
+            return -CHECKMATE + ply
+        bestScore = -CHECKMATE + ply
+    else:
+        if not moves and gs.pieceCount <= STALEMATE_PROBE_PIECES and not gs.hasLegalMove():
+            return STALEMATE
+        stats.leafEvaluations += 1
+        bestScore = turnMultiplier * materialBalance(gs)
+        if bestScore >= beta:
+            return bestScore
+        if bestScore > alpha:
+            alpha = bestScore
+    standPat = bestScore
+    moveOrderer.orderMoves(moves, ply, None)
+    for move in moves:
+        if not inCheck:
+            # an en passant Move only learns what it captures in makeMove, so pieceCaptured is still "--" here
+            if move.isEnPassantMove:
+                gain = pieceScore["P"]
+            else:
+                gain = pieceScore[move.pieceCaptured[1]] if move.pieceCaptured != "--" else 0
+            if move.isPawnPromotion:
+                gain += pieceScore["Q"] - pieceScore["P"]
+            if standPat + gain + DELTA_MARGIN <= alpha:
+                continue
+        gs.makeMove(move)
+        score = -quiescence(gs, -beta, -alpha, -turnMultiplier, ply + 1)
+        gs.undo_move()
+        if score > bestScore:
+            bestScore = score
+            if score > alpha:
+                alpha = score
+                if alpha >= beta:
+                    break
+    return bestScore
+
+
 '''
-A positive score is good for white, a negative score is good for black
+A positive score is good for white, a negative score is good for black. The material and square score is the running
+total the GameState keeps in makeMove / undo_move. Mate and stalemate are found with GameState.hasLegalMove, which stops
+at the first legal move instead of generating them all.
 '''
 def scoreBoard(gs):
+    gs.hasLegalMove()
     if gs.checkmate:
         if gs.whiteToMove:
             return -CHECKMATE #blackwins
@@ -140,6 +472,25 @@ def scoreBoard(gs):
         return STALEMATE
     elif gs.drawRep:
         return STALEMATE
+    return materialBalance(gs)
+
+
+'''
+The running material and square score (white minus black), checked against a full count when DEBUG_EVAL is on
+'''
+def materialBalance(gs):
+    if DEBUG_EVAL:
+        fullScore = scoreMaterial(gs)
+        if fullScore != gs.materialScore:
+            raise AssertionError("Incremental score %d does not match board score %d after %s" %
+                                 (gs.materialScore, fullScore, [str(move) for move in gs.moveLog]))
+    return gs.materialScore
+
+
+'''
+Material and square score counted over the whole board, what GameState.materialScore must always equal
+'''
+def scoreMaterial(gs):
     score = 0
     for r in range(8):
         for c in range(8):
@@ -149,107 +500,3 @@ def scoreBoard(gs):
             elif square[0] == "b":
                 score -= (pieceScore[square[1]] + piece_optimal_squares[square][r][c])
     return score
-
-
-def position_value(piece, r, c):
-    piece_map = piece_optimal_squares[piece]
-    value = piece_map[r][c]
-    return value
-  
-piece_optimal_squares = {"wN": [[-20, 0, 0, 0, 0, 0, 0, -20],
-                                [0, 10, 10, 10, 10, 10, 10, 0],
-                                [0, 10, 20, 20, 20, 20, 10, 0],
-                                [0, 10, 20, 20, 20, 20, 10, 0],
-                                [0, 10, 20, 20, 20, 20, 10, 0],
-                                [0, 10, 20, 20, 20, 20, 10, 0],
-                                [0, 10, 10, 10, 10, 10, 10, 0],
-                                [-20, 0, 0, 0, 0, 0, 0, -20]],
-                         "bN": [[-20, 0, 0, 0, 0, 0, 0, -20],
-                                [0, 10, 10, 10, 10, 10, 10, 0],
-                                [0, 10, 20, 20, 20, 20, 10, 0],
-                                [0, 10, 20, 20, 20, 20, 10, 0],
-                                [0, 10, 20, 20, 20, 20, 10, 0],
-                                [0, 10, 20, 20, 20, 20, 10, 0],
-                                [0, 10, 10, 10, 10, 10, 10, 0],
-                                [-20, 0, 0, 0, 0, 0, 0, -20]],
-                         "wK": [[0, 0, 0, 0, 0, 0, 0, 0],
-                                  [0, 0, 0, -20, -20, 0, 0, 0],
-                                  [0, 0, 0, -20, -20, 0, 0, 0],
-                                  [0, 0, 0, -10, -10, 0, 0, 0],
-                                  [0, 0, 0, -10, -10, 0, 0, 0],
-                                  [0, 0, 0, -10, -10, 0, 0, 0],
-                                  [0, 0, 0, -10, -10, 0, 0, 0],
-                                  [30, 30, 20, 0, 0, 0, 30, 30]],
-                         "bK": [[30, 30, 20, 0, 0, 0, 30, 30],
-                                [0, 0, 0, -10, -10, 0, 0, 0],
-                                [0, 0, 0, -10, -10, 0, 0, 0],
-                                [0, 0, 0, -10, -10, 0, 0, 0],
-                                [0, 0, 0, -10, -10, 0, 0, 0],
-                                [0, 0, 0, -20, -20, 0, 0, 0],
-                                [0, 0, 0, -20, -20, 0, 0, 0],
-                                [0, 0, 0, 0, 0, 0, 0, 0]],
-                         "wB": [[-20, -10, -10, -10, -10, -10, -10, -20],
-                                [0, 0, 0, 0, 0, 0, 0, 0],
-                                [0, 0, 0, 0, 0, 0, 0, 0],
-                                [0, 0, 0, 0, 0, 0, 0, 0],
-                                [0, 0, 0, 0, 0, 0, 0, 0],
-                                [0, 0, 0, 0, 0, 0, 0, 0],
-                                [0, 10, 0, 0, 0, 0, 10, 0],
-                                [-20, -10, -10, -10, -10, -10, -10, -20]],
-                         "bB": [[-20, -10, -10, -10, -10, -10, -10, -20],
-                                [0, 10, 0, 0, 0, 0, 10, 0],
-                                [0, 0, 0, 0, 0, 0, 0, 0],
-                                [0, 0, 0, 0, 0, 0, 0, 0],
-                                [0, 0, 0, 0, 0, 0, 0, 0],
-                                [0, 0, 0, 0, 0, 0, 0, 0],
-                                [0, 0, 0, 0, 0, 0, 0, 0],
-                                [-20, -10, -10, -10, -10, -10, -10, -20]],
-                         "wR": [[0, 0, 0, 0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0, 0, 0, 0],
-                              [0, 0, 0, 20, 20, 20, 0, 0]],
-                         "bR": [[0, 0, 0, 20, 20, 20, 0, 0],
-                              [0, 0, 0, 0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0, 0, 0, 0]],
-                         "wQ": [[0, 0, 0, 0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0, 0, 0, 0]],
-                         "bQ": [[0, 0, 0, 0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0, 0, 0, 0],
-                              [0, 0, 0, 0, 0, 0, 0, 0]],
-                         "wP": [[900, 900, 900, 900, 900, 900, 900, 900],
-                              [200, 200, 200, 200, 200, 200, 200, 200],
-                              [20, 20, 20, 20, 20, 20, 20, 20],
-                              [0, 0, 0, 0, 0, 0, 0, 0],
-                              [0, 0, 20, 25, 25, 20, 0, 10],
-                              [0, 0, 10, 10, 10, 10, 0, 10],
-                              [10, 10, 10, 0, 0, 10, 10, 10],
-                              [0, 0, 0, 0, 0, 0, 0, 0]],
-                         "bP": [[0, 0, 0, 0, 0, 0, 0, 0],
-                              [10, 10, 10, 0, 0, 10, 10, 10],
-                              [0, 0, 10, 10, 10, 10, 0, 10],
-                              [0, 0, 20, 25, 25, 20, 0, 10],
-                              [0, 0, 0, 0, 0, 0, 0, 0],
-                              [20, 20, 20, 20, 20, 20, 20, 20],
-                              [200, 200, 200, 200, 200, 200, 200, 200],
-                              [900, 900, 900, 900, 900, 900, 900, 900]]
-                         }
@@ -0,0 +1,132 @@
+"""
+Batch analysis of a position set. Streams an EPD file (or one FEN per line) through ChessAI.findBestMove on a pool of
+worker processes and writes one JSON line per position as soon as it is searched, so the lines come out in the order
+the positions finish ("index" is the position's line number among the positions). Positions with bm / am operations
+are marked solved or not. Positions per second goes to stderr at the end, so the output stays pure JSON lines:
+    python -m Chess.ChessAnalysis positions.epd --depth 4 --workers 4 --output results.jsonl
+"""
+import argparse
+import json
+import multiprocessing
+import sys
+import time
+from Chess import ChessEngine, ChessAI, ChessPGN
+
+
+"""
+Yields (index, line) for every position line of the file, reading it as it goes. Blank lines and # comments are skipped.
+"""
+def readPositions(path):
+    index = 0
+    with open(path) as positionFile:
+        for line in positionFile:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield index, line
+                index += 1
+
+
+"""
+The moveIDs of the moves an operation lists (bm / am are in SAN), leaving out any the engine can't read or play
+"""
+def operationMoveIDs(gs, validMoves, operands):
+    moveIDs = set()
+    for text in operands:
+        try:
+            moveIDs.add(ChessPGN.moveFromText(gs, text, validMoves).moveID)
+        except ValueError:
+            pass
+    return moveIDs
+
+
+"""
+Worker task: sets up one position and searches it. Returns the result dict written as a JSON line.
+"""
+def analysePosition(task):
+    index, line, depth, timeLimit, nodeLimit, backend = task
+    result = {"index": index}
+    gs = ChessEngine.newGameState(backend)
+    try:
+        fields = line.split()
+        if len(fields) in (4, 5, 6) and all(field.isdigit() for field in fields[4:]):
+            gs.loadFEN(line)
+            operations = {}
+        else:
+            operations = gs.loadEPD(line)
+    except ValueError as error:
+        result.update({"line": line, "error": str(error)})
+        return result
+    if "id" in operations:
+        result["id"] = " ".join(operations["id"])
+    result["fen"] = gs.getFEN()
+    validMoves = gs.get_valid_moves()
+    if not validMoves:
+        result.update({"bestmove": None, "result": "checkmate" if gs.checkmate else "stalemate"})
+        return result
+    ChessAI.transpositionTable.clear()  # every position is searched the same however the tasks were shared out
+    ChessAI.PRINT_STATS = False
+    move, stats = ChessAI.findBestMove(gs, validMoves, timeLimit, depth, nodeLimit, useBook=False, returnStats=True)
+    result.update({"bestmove": move.get_chess_notation(), "score": stats.score, "depth": stats.depth,
+                   "nodes": stats.nodes, "pv": stats.iterations[-1]["pv"] if stats.iterations else [],
+                   "seconds": round(stats.seconds, 4)})
+    if "bm" in operations or "am" in operations:
+        best = operationMoveIDs(gs, validMoves, operations.get("bm", []))
+        avoid = operationMoveIDs(gs, validMoves, operations.get("am", []))
+        result["solved"] = (not best or move.moveID in best) and move.moveID not in avoid
+    return result
+
+
+"""
+Analyses every position of the file and writes the JSON lines to output. Returns (positions, seconds, solved, with
+a bm / am to solve).
+"""
+def analyseFile(path, output, depth, timeLimit, nodeLimit, workers, backend=None):
+    tasks = ((index, line, depth, timeLimit, nodeLimit, backend) for index, line in readPositions(path))
+    positions = 0
+    solved = 0
+    scored = 0
+    start = time.perf_counter()
+    pool = multiprocessing.Pool(workers) if workers > 1 else None
+    try:
+        results = pool.imap_unordered(analysePosition, tasks) if pool is not None else map(analysePosition, tasks)
+        for result in results:
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+            positions += 1
+            if "solved" in result:
+                scored += 1
+                solved += result["solved"]
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+    return positions, time.perf_counter() - start, solved, scored
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search every position of an EPD / FEN file and write JSON lines")
+    parser.add_argument("positions", help="EPD file, or a file with one FEN per line")
+    parser.add_argument("--depth", type=int, default=4, help="deepest iteration of each search")
+    parser.add_argument("--time", type=float, default=None, help="seconds per position, no limit by default")
+    parser.add_argument("--nodes", type=int, default=None, help="node budget per position")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--backend", choices=("board", "bitboard"), default=None)
+    parser.add_argument("--output", help="file to write the JSON lines to, stdout by default")
+    args = parser.parse_args(argv)
+    output = open(args.output, "w") if args.output else sys.stdout
+    try:
+        positions, seconds, solved, scored = analyseFile(args.positions, output, args.depth, args.time, args.nodes,
+                                                         max(1, args.workers), args.backend)
+    finally:
+        if args.output:
+            output.close()
+    summary = "%d positions in %.2fs, %.2f positions/s over %d workers" % (
+        positions, seconds, positions / seconds if seconds else 0, max(1, args.workers))
+    if scored:
+        summary += ", solved %d of %d" % (solved, scored)
+    print(summary, file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
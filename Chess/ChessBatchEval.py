@@ -0,0 +1,181 @@
+"""
+Batched material and square evaluation. A position is encoded as 64 piece codes (Move.pieceCodes, 0 for an empty
+square, square sq = row * 8 + col) and the evaluation tables of ChessEvaluation become one lookup table indexed by
+(piece code, square), so scoring a whole batch of positions is a single gather and sum with NumPy. The scores are the
+same as ChessAI.scoreMaterial: positive is good for white.
+NumPy is optional. Without it every function here still works, looping over the positions in plain Python.
+Score a file of FEN / EPD lines (only the piece placement field is read) with:
+    python -m Chess.ChessBatchEval positions.epd --compare
+"""
+import argparse
+import sys
+import time
+from Chess import ChessEngine, ChessAI
+from Chess.ChessEvaluation import squareScore
+
+try:
+    import numpy as np
+except ImportError:  # fall back to the plain Python loops below
+    np = None
+
+pieceCodes = ChessEngine.Move.pieceCodes
+fenCodes = {(piece[1] if piece[0] == "w" else piece[1].lower()): code for piece, code in pieceCodes.items() if piece != "--"}
+expandBlanks = {ord(str(blanks)): "." * blanks for blanks in range(1, 9)}
+expandBlanks[ord("/")] = None
+# scoreTable[code][sq] is what the piece with that code adds to the score standing on sq, row 0 (empty) is all zeros
+scoreTable = [[0] * 64 for code in range(len(pieceCodes))]
+for piece, code in pieceCodes.items():
+    if piece != "--":
+        scoreTable[code] = list(squareScore[piece])
+if np is not None:
+    scoreTable = np.array(scoreTable, dtype=np.int32)
+    squareIndex = np.arange(64)
+    fenCodeTable = np.full(256, -1, dtype=np.int8)  # FEN character -> piece code, "." (an expanded blank) is empty
+    fenCodeTable[ord(".")] = 0
+    for char, code in fenCodes.items():
+        fenCodeTable[ord(char)] = code
+
+
+"""
+The 64 piece codes of an 8x8 board as used by GameState.board
+"""
+def encodeBoard(board):
+    codes = [pieceCodes[piece] for row in board for piece in row]
+    return codes if np is None else np.array(codes, dtype=np.int8)
+
+
+"""
+The 64 piece codes of the piece placement field of a FEN or EPD line, without setting up a GameState
+"""
+def encodeFEN(fen):
+    return encodeFENs([fen])[0]
+
+
+"""
+Encodes many FEN / EPD lines at once. The placement fields are expanded to one character per square and joined, so with
+NumPy the whole batch is turned into codes with one table lookup.
+"""
+def encodeFENs(fens):
+    placements = []
+    for fen in fens:
+        placement = fen.split()[0].translate(expandBlanks)
+        if len(placement) != 64:
+            raise ValueError("Bad piece placement in FEN " + fen)
+        placements.append(placement)
+    if np is None:
+        return [[fenCodes[char] if char != "." else 0 for char in placement] for placement in placements]
+    characters = np.frombuffer("".join(placements).encode("ascii"), dtype=np.uint8)
+    codes = fenCodeTable[characters]
+    if (codes < 0).any():
+        raise ValueError("Bad piece in FEN")
+    return codes.reshape(-1, 64)
+
+
+"""
+Stacks encoded positions into one (positions, 64) int8 array (a list of lists without NumPy)
+"""
+def stack(encoded):
+    encoded = list(encoded)
+    if np is None:
+        return encoded
+    if not encoded:
+        return np.zeros((0, 64), dtype=np.int8)
+    return np.stack(encoded)
+
+
+"""
+Scores a batch of encoded positions, returns one score per position (an int32 array, or a list without NumPy)
+"""
+def scoreEncoded(batch):
+    if np is None:
+        return [sum(scoreTable[code][sq] for sq, code in enumerate(codes) if code) for codes in batch]
+    return scoreTable[batch.astype(np.intp), squareIndex].sum(axis=1)
+
+
+def scoreBoards(boards):
+    return scoreEncoded(stack(encodeBoard(board) for board in boards))
+
+
+def scoreFENs(fens):
+    return scoreEncoded(encodeFENs(fens))
+
+
+"""
+The (piece code, square) pairs a move changes: the piece lifted, the piece placed, the piece captured and, when
+castling, the rook lifted and placed. Unused pairs are (0, 0), the empty square that scores nothing. An en passant
+Move only learns what it captures in makeMove, so the captured pawn is filled in here.
+"""
+def movePairs(move):
+    color = move.pieceMoved[0]
+    moved = pieceCodes[move.pieceMoved]
+    pairs = [moved, move.startRow * 8 + move.startCol,
+             pieceCodes[color + "Q"] if move.isPawnPromotion else moved, move.endRow * 8 + move.endCol,
+             0, 0, 0, 0, 0, 0]
+    if move.isEnPassantMove:
+        pairs[4] = pieceCodes[("b" if color == "w" else "w") + "P"]
+        pairs[5] = move.startRow * 8 + move.endCol
+    elif move.pieceCaptured != "--":
+        pairs[4] = pieceCodes[move.pieceCaptured]
+        pairs[5] = pairs[3]
+    elif move.isCastleMove:
+        rowStart = move.endRow * 8
+        kingside = move.endCol - move.startCol == 2
+        pairs[6] = pairs[8] = pieceCodes[color + "R"]
+        pairs[7] = rowStart + (7 if kingside else 0)
+        pairs[9] = rowStart + (5 if kingside else 3)
+    return pairs
+
+
+"""
+Scores every child of the current position in one call, without making the moves: the GameState's running score plus
+what each move changes, the sum GameState.scoreDelta works out one move at a time.
+"""
+def scoreChildren(gs, moves):
+    if np is None:
+        scores = []
+        for move in moves:
+            pairs = movePairs(move)
+            lookups = [scoreTable[pairs[k]][pairs[k + 1]] for k in range(0, 10, 2)]
+            scores.append(gs.materialScore - lookups[0] + lookups[1] - lookups[2] - lookups[3] + lookups[4])
+        return scores
+    pairs = np.array([movePairs(move) for move in moves], dtype=np.intp).reshape(-1, 10)
+    lookups = scoreTable[pairs[:, 0::2], pairs[:, 1::2]]
+    return gs.materialScore + lookups @ np.array([-1, 1, -1, -1, 1], dtype=np.int32)
+
+
+def readPositions(path):
+    with open(path) as positionFile:
+        return [line.strip() for line in positionFile if line.strip() and not line.startswith("#")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a file of FEN / EPD positions in one batch")
+    parser.add_argument("positions", help="text file with one FEN or EPD position per line")
+    parser.add_argument("--compare", action="store_true",
+                        help="also score each position through a GameState and report both timings")
+    parser.add_argument("--quiet", action="store_true", help="don't print the score of every position")
+    args = parser.parse_args(argv)
+    fens = readPositions(args.positions)
+    start = time.perf_counter()
+    scores = scoreFENs(fens)
+    seconds = time.perf_counter() - start
+    if not args.quiet:
+        for fen, score in zip(fens, scores):
+            print(int(score), fen)
+    print("%d positions in %.3fs (%s)" % (len(fens), seconds, "numpy" if np is not None else "no numpy, plain Python"))
+    if args.compare:
+        gs = ChessEngine.newGameState("board")
+        start = time.perf_counter()
+        mismatches = 0
+        for fen, score in zip(fens, scores):
+            gs.loadFEN(" ".join(fen.split()[:4]) if len(fen.split()) >= 4 else fen.split()[0] + " w - -")
+            if ChessAI.scoreMaterial(gs) != score:
+                mismatches += 1
+        seconds = time.perf_counter() - start
+        print("%d positions one at a time in %.3fs, %d scores differ" % (len(fens), seconds, mismatches))
+        return 1 if mismatches else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,498 @@
+"""
+Bitboard backed version of the GameState. The position is kept as twelve 64 bit piece sets plus the occupancy of each
+side, and move generation works on those sets with precomputed attack tables instead of walking the board square by
+square. The 8x8 board list, the move log and every other attribute of ChessEngine.GameState are still maintained, so
+ChessMain and ChessAI can use either backend without knowing which one they have.
+Squares are numbered sq = row * 8 + col, so bit 0 is a8 and bit 63 is h1.
+"""
+from Chess import ChessEngine
+
+PIECES = ("wP", "wN", "wB", "wR", "wQ", "wK", "bP", "bN", "bB", "bR", "bQ", "bK")
+FULL_BOARD = (1 << 64) - 1
+
+# Directions as (row step, col step). The first four move towards higher square numbers, the last four towards lower.
+ORTHOGONALS = ((1, 0), (0, 1), (-1, 0), (0, -1))
+DIAGONALS = ((1, 1), (1, -1), (-1, -1), (-1, 1))
+POSITIVE_DIRECTIONS = {(1, 0), (0, 1), (1, 1), (1, -1)}
+
+
+def square_bit(r, c):
+    return 1 << (r * 8 + c)
+
+
+def lowest_square(bb):
+    return (bb & -bb).bit_length() - 1
+
+
+def highest_square(bb):
+    return bb.bit_length() - 1
+
+
+def squares_of(bb):
+    # yields every square index set in the bitboard, lowest first
+    while bb:
+        lsb = bb & -bb
+        yield lsb.bit_length() - 1
+        bb ^= lsb
+
+
+def step_table(steps):
+    table = []
+    for sq in range(64):
+        r, c = divmod(sq, 8)
+        bb = 0
+        for x, y in steps:
+            if ChessEngine.in_range(r + x, c + y):
+                bb |= square_bit(r + x, c + y)
+        table.append(bb)
+    return table
+
+
+def ray_table(direction):
+    table = []
+    for sq in range(64):
+        r, c = divmod(sq, 8)
+        bb = 0
+        r, c = r + direction[0], c + direction[1]
+        while ChessEngine.in_range(r, c):
+            bb |= square_bit(r, c)
+            r, c = r + direction[0], c + direction[1]
+        table.append(bb)
+    return table
+
+
+KNIGHT_ATTACKS = step_table(((2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, 2), (-1, -2)))
+KING_ATTACKS = step_table(ORTHOGONALS + DIAGONALS)
+# Squares attacked by a pawn of the given color standing on sq
+PAWN_ATTACKS = {"w": step_table(((-1, -1), (-1, 1))), "b": step_table(((1, -1), (1, 1)))}
+RAYS = {d: ray_table(d) for d in ORTHOGONALS + DIAGONALS}
+ORTHOGONAL_RAYS = [(RAYS[d], d in POSITIVE_DIRECTIONS) for d in ORTHOGONALS]
+DIAGONAL_RAYS = [(RAYS[d], d in POSITIVE_DIRECTIONS) for d in DIAGONALS]
+
+SQUARE_COORDS = [divmod(sq, 8) for sq in range(64)]  # (row, col) of each square, saves a divmod per generated move
+RANK_3 = 0xFF << 40  # row 5, where a white pawn lands after a single push from its start square
+RANK_6 = 0xFF << 16  # row 2, same for black
+LAST_RANKS = 0xFF | 0xFF << 56  # rows 0 and 7, where pawns promote
+FILE_A = sum(1 << (r * 8) for r in range(8))
+FILE_H = FILE_A << 7
+
+
+def slider_attacks(sq, occupied, rays):
+    attacks = 0
+    for table, positive in rays:
+        ray = table[sq]
+        blockers = ray & occupied
+        if blockers:
+            blocker = lowest_square(blockers) if positive else highest_square(blockers)
+            ray ^= table[blocker]
+        attacks |= ray
+    return attacks
+
+
+def rook_attacks(sq, occupied):
+    return slider_attacks(sq, occupied, ORTHOGONAL_RAYS)
+
+
+def bishop_attacks(sq, occupied):
+    return slider_attacks(sq, occupied, DIAGONAL_RAYS)
+
+
+class BitboardGameState(ChessEngine.GameState):
+    def __init__(self):
+        self.pieceBitboards = {}
+        self.colorOccupancy = {"w": 0, "b": 0}
+        self.occupancy = 0
+        super().__init__()
+        self.initBitboards()
+
+    """
+    Rebuilds all bitboards from the 8x8 board. Must be called whenever the board is set up by hand.
+    """
+    def initBitboards(self):
+        self.pieceBitboards = {piece: 0 for piece in PIECES}
+        self.colorOccupancy = {"w": 0, "b": 0}
+        for r in range(8):
+            for c in range(8):
+                piece = self.board[r][c]
+                if piece != "--":
+                    self.pieceBitboards[piece] |= square_bit(r, c)
+                    self.colorOccupancy[piece[0]] |= square_bit(r, c)
+        self.occupancy = self.colorOccupancy["w"] | self.colorOccupancy["b"]
+
+    def loadFEN(self, fen):
+        super().loadFEN(fen)
+        self.initBitboards()
+
+    def makeMove(self, move):
+        super().makeMove(move)
+        self.toggleMoveBits(move)
+
+    def undo_move(self):
+        if len(self.moveLog) != 0:
+            last_move = self.moveLog[-1]
+            super().undo_move()
+            self.toggleMoveBits(last_move)
+
+    """
+    Applies a move to the bitboards. Every update is an XOR, so calling it a second time with the same move undoes it.
+    """
+    def toggleMoveBits(self, move):
+        bb = self.pieceBitboards
+        color = move.pieceMoved[0]
+        fromBit = square_bit(move.startRow, move.startCol)
+        toBit = square_bit(move.endRow, move.endCol)
+        bb[move.pieceMoved] ^= fromBit
+        bb[color + "Q" if move.isPawnPromotion else move.pieceMoved] ^= toBit
+        self.colorOccupancy[color] ^= fromBit | toBit
+        if move.pieceCaptured != "--":
+            captureBit = square_bit(move.startRow, move.endCol) if move.isEnPassantMove else toBit
+            bb[move.pieceCaptured] ^= captureBit
+            self.colorOccupancy[move.pieceCaptured[0]] ^= captureBit
+        if move.isCastleMove:
+            if move.endCol - move.startCol == 2:  # Kingside, rook jumps from h to f file
+                rookBits = square_bit(move.endRow, 7) | square_bit(move.endRow, 5)
+            else:  # Queenside, rook jumps from a to d file
+                rookBits = square_bit(move.endRow, 0) | square_bit(move.endRow, 3)
+            bb[color + "R"] ^= rookBits
+            self.colorOccupancy[color] ^= rookBits
+        self.occupancy = self.colorOccupancy["w"] | self.colorOccupancy["b"]
+
+    """
+    Returns a bitboard of the pieces of byColor that attack sq, using the given occupancy for sliding pieces.
+    """
+    def attackersOf(self, sq, byColor, occupied):
+        bb = self.pieceBitboards
+        queens = bb[byColor + "Q"]
+        attackers = KNIGHT_ATTACKS[sq] & bb[byColor + "N"]
+        attackers |= KING_ATTACKS[sq] & bb[byColor + "K"]
+        attackers |= PAWN_ATTACKS["b" if byColor == "w" else "w"][sq] & bb[byColor + "P"]
+        attackers |= rook_attacks(sq, occupied) & (bb[byColor + "R"] | queens)
+        attackers |= bishop_attacks(sq, occupied) & (bb[byColor + "B"] | queens)
+        return attackers
+
+    def squareUnderAttack(self, r, c, allyColor):
+        attacked = self.attackMaps.get(allyColor)
+        if attacked is None:
+            # the ally king does not block attacks, same as the board version
+            occupied = self.occupancy & ~self.pieceBitboards[allyColor + "K"]
+            return self.attackersOf(r * 8 + c, "b" if allyColor == "w" else "w", occupied) != 0
+        return attacked >> (r * 8 + c) & 1 == 1
+
+    """
+    Bitboard of every square an enemy of allyColor attacks, with the ally king lifted off the board (same as the board
+    version). Built once per position and kept in attackMaps until the next makeMove / undo_move.
+    """
+    def buildAttackMap(self, allyColor):
+        enemyColor = "b" if allyColor == "w" else "w"
+        bb = self.pieceBitboards
+        occupied = self.occupancy & ~bb[allyColor + "K"]
+        pawns = bb[enemyColor + "P"]
+        if enemyColor == "w":
+            attacked = (pawns & ~FILE_A) >> 9 | (pawns & ~FILE_H) >> 7
+        else:
+            attacked = ((pawns & ~FILE_A) << 7 | (pawns & ~FILE_H) << 9) & FULL_BOARD
+        for sq in squares_of(bb[enemyColor + "N"]):
+            attacked |= KNIGHT_ATTACKS[sq]
+        queens = bb[enemyColor + "Q"]
+        for sq in squares_of(bb[enemyColor + "R"] | queens):
+            attacked |= rook_attacks(sq, occupied)
+        for sq in squares_of(bb[enemyColor + "B"] | queens):
+            attacked |= bishop_attacks(sq, occupied)
+        attacked |= KING_ATTACKS[lowest_square(bb[enemyColor + "K"])]
+        self.attackMaps[allyColor] = attacked
+        return attacked
+
+    """
+    Finds the pieces checking the king and the pinned allied pieces. Returns the checkers bitboard, the mask of squares
+    a non king move must land on to deal with a single check, and a dict mapping pinned squares to the line they may move on.
+    """
+    def checksAndPins(self, kingSq, allyColor, enemyColor):
+        bb = self.pieceBitboards
+        occupied = self.occupancy
+        allies = self.colorOccupancy[allyColor]
+        queens = bb[enemyColor + "Q"]
+        checkers = KNIGHT_ATTACKS[kingSq] & bb[enemyColor + "N"]
+        checkers |= PAWN_ATTACKS[allyColor][kingSq] & bb[enemyColor + "P"]
+        checkMask = checkers
+        pinMasks = {}
+        for rays, sliders in ((ORTHOGONAL_RAYS, bb[enemyColor + "R"] | queens),
+                              (DIAGONAL_RAYS, bb[enemyColor + "B"] | queens)):
+            for table, positive in rays:
+                ray = table[kingSq] & occupied
+                if not ray or not table[kingSq] & sliders:
+                    continue
+                first = lowest_square(ray) if positive else highest_square(ray)
+                firstBit = 1 << first
+                if firstBit & sliders:
+                    checkers |= firstBit
+                    checkMask |= table[kingSq] ^ table[first]
+                elif firstBit & allies:
+                    beyond = table[first] & occupied
+                    if beyond:
+                        second = lowest_square(beyond) if positive else highest_square(beyond)
+                        if (1 << second) & sliders:
+                            pinMasks[first] = table[kingSq] ^ table[second]
+        return checkers, checkMask, pinMasks
+
+    """
+    All moves considering checks
+    """
+    def get_valid_moves(self):
+        stages = self.generateMovesInStages()
+        moves = next(stages) + next(stages)
+        self.checkmate = False
+        self.stalemate = False
+        if len(moves) == 0:
+            if self.inCheck:
+                self.checkmate = True
+            else:
+                self.stalemate = True
+        return moves
+
+    """
+    True if the side to move has a legal move, setting inCheck, checkmate and stalemate like get_valid_moves. Works on
+    the bitboards alone and returns at the first target square it finds, no Move objects are made.
+    """
+    def hasLegalMove(self):
+        if self.whiteToMove:
+            allyColor, enemyColor = "w", "b"
+            kingRow, kingCol = self.whiteKingLocation
+        else:
+            allyColor, enemyColor = "b", "w"
+            kingRow, kingCol = self.blackKingLocation
+        kingSq = kingRow * 8 + kingCol
+        checkers, checkMask, pinMasks = self.checksAndPins(kingSq, allyColor, enemyColor)
+        self.inCheck = checkers != 0
+        self.checkmate = False
+        self.stalemate = False
+        if self.anyLegalMove(allyColor, enemyColor, kingSq, checkers, checkMask, pinMasks):
+            return True
+        if self.inCheck:
+            self.checkmate = True
+        else:
+            self.stalemate = True
+        return False
+
+    def anyLegalMove(self, allyColor, enemyColor, kingSq, checkers, checkMask, pinMasks):
+        bb = self.pieceBitboards
+        allies = self.colorOccupancy[allyColor]
+        occupied = self.occupancy
+        attacked = self.attackMaps.get(allyColor)
+        occupiedNoKing = occupied ^ (1 << kingSq)
+        for to in squares_of(KING_ATTACKS[kingSq] & ~allies):
+            if attacked is None:
+                if not self.attackersOf(to, enemyColor, occupiedNoKing):
+                    return True
+            elif not attacked >> to & 1:
+                return True
+        if checkers & (checkers - 1):  # double check, only the king could have moved
+            return False
+        targetMask = (checkMask if checkers else FULL_BOARD) & ~allies
+        for sq in squares_of(bb[allyColor + "N"]):
+            if sq not in pinMasks and KNIGHT_ATTACKS[sq] & targetMask:
+                return True
+        pawns = bb[allyColor + "P"]
+        empty = FULL_BOARD ^ occupied
+        if allyColor == "w":
+            forward = -8
+            singles = (pawns >> 8) & empty
+            doubles = ((singles & RANK_3) >> 8) & empty
+        else:
+            forward = 8
+            singles = (pawns << 8) & empty
+            doubles = ((singles & RANK_6) << 8) & empty
+        for to in squares_of(singles & targetMask):
+            sq = to - forward
+            if sq not in pinMasks or pinMasks[sq] >> to & 1:
+                return True
+        for to in squares_of(doubles & targetMask):
+            sq = to - 2 * forward
+            if sq not in pinMasks or pinMasks[sq] >> to & 1:
+                return True
+        enemies = self.colorOccupancy[enemyColor]
+        for sq in squares_of(pawns):
+            targets = PAWN_ATTACKS[allyColor][sq] & enemies & targetMask
+            if sq in pinMasks:
+                targets &= pinMasks[sq]
+            if targets:
+                return True
+        queens = bb[allyColor + "Q"]
+        for pieces, attackFunction in ((bb[allyColor + "R"] | queens, rook_attacks),
+                                       (bb[allyColor + "B"] | queens, bishop_attacks)):
+            for sq in squares_of(pieces):
+                targets = attackFunction(sq, occupied) & targetMask
+                if sq in pinMasks:
+                    targets &= pinMasks[sq]
+                if targets:
+                    return True
+        if self.enPassantPossible != ():
+            epRow, epCol = self.enPassantPossible
+            epSq = epRow * 8 + epCol
+            for sq in squares_of(PAWN_ATTACKS[enemyColor][epSq] & pawns):
+                if self.enPassantIsLegal(sq, epSq, epSq - forward, kingSq, enemyColor):
+                    return True
+        return False
+
+    """
+    Legal moves in two batches: the first next() returns the captures and promotions, the second the quiet moves. The
+    quiet moves are only generated when asked for, so a search that cuts off on a capture never builds them. The board
+    must be back in the same position before the second next().
+    """
+    def generateMovesInStages(self):
+        if self.whiteToMove:
+            allyColor, enemyColor = "w", "b"
+            kingRow, kingCol = self.whiteKingLocation
+        else:
+            allyColor, enemyColor = "b", "w"
+            kingRow, kingCol = self.blackKingLocation
+        kingSq = kingRow * 8 + kingCol
+        checkers, checkMask, pinMasks = self.checksAndPins(kingSq, allyColor, enemyColor)
+        self.inCheck = checkers != 0
+        numChecks = bin(checkers).count("1")
+        enemies = self.colorOccupancy[enemyColor]
+        empty = FULL_BOARD ^ self.occupancy
+        targetMask = checkMask if numChecks == 1 else FULL_BOARD
+
+        # King steps, the king is lifted off the board so it can't hide behind its own square. With few squares to test
+        # it is cheaper to look for attackers of each than to build the whole attack map.
+        kingTargets = KING_ATTACKS[kingSq] & (enemies | empty)
+        attacked = self.attackMaps.get(allyColor)
+        if attacked is None and kingTargets:
+            if bin(kingTargets).count("1") >= ChessEngine.ATTACK_MAP_MIN_TARGETS:
+                attacked = self.buildAttackMap(allyColor)
+            else:
+                attacked = 0
+                occupiedNoKing = self.occupancy ^ (1 << kingSq)
+                for to in squares_of(kingTargets):
+                    if self.attackersOf(to, enemyColor, occupiedNoKing):
+                        attacked |= 1 << to
+        if kingTargets:
+            kingTargets &= ~attacked
+
+        captures = []
+        for to in squares_of(kingTargets & enemies):
+            captures.append(ChessEngine.Move((kingRow, kingCol), SQUARE_COORDS[to], self.board))
+        if numChecks < 2:
+            self.getPieceMoves(allyColor, enemies & targetMask, pinMasks, captures)
+            self.getPawnCaptures(allyColor, enemyColor, kingSq, targetMask, pinMasks, captures)
+        yield captures
+
+        moves = []
+        for to in squares_of(kingTargets & empty):
+            moves.append(ChessEngine.Move((kingRow, kingCol), SQUARE_COORDS[to], self.board))
+        if numChecks < 2:
+            self.getPieceMoves(allyColor, empty & targetMask, pinMasks, moves)
+            self.getPawnPushes(allyColor, targetMask, pinMasks, moves)
+            if numChecks == 0:
+                self.getBitboardCastleMoves(kingRow, kingCol, allyColor, enemyColor, moves)
+        yield moves
+
+    """
+    Knight, bishop, rook and queen moves that land on targetMask
+    """
+    def getPieceMoves(self, allyColor, targetMask, pinMasks, moves):
+        bb = self.pieceBitboards
+        board = self.board
+        Move = ChessEngine.Move
+        occupied = self.occupancy
+        for sq in squares_of(bb[allyColor + "N"]):
+            if sq in pinMasks:  # a pinned knight can never move
+                continue
+            start = SQUARE_COORDS[sq]
+            for to in squares_of(KNIGHT_ATTACKS[sq] & targetMask):
+                moves.append(Move(start, SQUARE_COORDS[to], board))
+        queens = bb[allyColor + "Q"]
+        for pieces, attackFunction in ((bb[allyColor + "R"] | queens, rook_attacks),
+                                       (bb[allyColor + "B"] | queens, bishop_attacks)):
+            for sq in squares_of(pieces):
+                targets = attackFunction(sq, occupied) & targetMask
+                if sq in pinMasks:
+                    targets &= pinMasks[sq]
+                start = SQUARE_COORDS[sq]
+                for to in squares_of(targets):
+                    moves.append(Move(start, SQUARE_COORDS[to], board))
+
+    """
+    Pawn captures, en passant and pushes onto the last rank (promotions go with the captures)
+    """
+    def getPawnCaptures(self, allyColor, enemyColor, kingSq, targetMask, pinMasks, captures):
+        bb = self.pieceBitboards
+        pawns = bb[allyColor + "P"]
+        enemies = self.colorOccupancy[enemyColor]
+        empty = FULL_BOARD ^ self.occupancy
+        if allyColor == "w":
+            forward = -8
+            promotions = (pawns >> 8) & empty & LAST_RANKS
+        else:
+            forward = 8
+            promotions = (pawns << 8) & empty & LAST_RANKS
+        for to in squares_of(promotions & targetMask):
+            sq = to - forward
+            if sq not in pinMasks or pinMasks[sq] >> to & 1:
+                captures.append(ChessEngine.Move(SQUARE_COORDS[sq], SQUARE_COORDS[to], self.board))
+        for sq in squares_of(pawns):
+            targets = PAWN_ATTACKS[allyColor][sq] & enemies & targetMask
+            if sq in pinMasks:
+                targets &= pinMasks[sq]
+            for to in squares_of(targets):
+                captures.append(ChessEngine.Move(SQUARE_COORDS[sq], SQUARE_COORDS[to], self.board))
+        if self.enPassantPossible != ():
+            epRow, epCol = self.enPassantPossible
+            epSq = epRow * 8 + epCol
+            capturedSq = epSq - forward
+            for sq in squares_of(PAWN_ATTACKS[enemyColor][epSq] & pawns):
+                if self.enPassantIsLegal(sq, epSq, capturedSq, kingSq, enemyColor):
+                    captures.append(ChessEngine.Move(SQUARE_COORDS[sq], (epRow, epCol), self.board, isEnPassantMove=True))
+
+    """
+    Single and double pawn pushes that don't promote
+    """
+    def getPawnPushes(self, allyColor, targetMask, pinMasks, moves):
+        pawns = self.pieceBitboards[allyColor + "P"]
+        empty = FULL_BOARD ^ self.occupancy
+        if allyColor == "w":
+            forward = -8
+            singles = (pawns >> 8) & empty
+            doubles = ((singles & RANK_3) >> 8) & empty
+        else:
+            forward = 8
+            singles = (pawns << 8) & empty
+            doubles = ((singles & RANK_6) << 8) & empty
+        for to in squares_of(singles & targetMask & ~LAST_RANKS):
+            sq = to - forward
+            if sq not in pinMasks or pinMasks[sq] >> to & 1:
+                moves.append(ChessEngine.Move(SQUARE_COORDS[sq], SQUARE_COORDS[to], self.board))
+        for to in squares_of(doubles & targetMask):
+            sq = to - 2 * forward
+            if sq not in pinMasks or pinMasks[sq] >> to & 1:
+                moves.append(ChessEngine.Move(SQUARE_COORDS[sq], SQUARE_COORDS[to], self.board))
+
+    """
+    En passant removes two pawns from one rank at once, so rather than relying on pins the king is tested for attacks
+    on the board as it would look after the capture.
+    """
+    def enPassantIsLegal(self, fromSq, epSq, capturedSq, kingSq, enemyColor):
+        bb = self.pieceBitboards
+        capturedBit = 1 << capturedSq
+        occupied = (self.occupancy ^ (1 << fromSq) ^ capturedBit) | (1 << epSq)
+        queens = bb[enemyColor + "Q"]
+        if rook_attacks(kingSq, occupied) & (bb[enemyColor + "R"] | queens):
+            return False
+        if bishop_attacks(kingSq, occupied) & (bb[enemyColor + "B"] | queens):
+            return False
+        allyColor = "b" if enemyColor == "w" else "w"
+        if KNIGHT_ATTACKS[kingSq] & bb[enemyColor + "N"]:
+            return False
+        return not PAWN_ATTACKS[allyColor][kingSq] & bb[enemyColor + "P"] & ~capturedBit
+
+    def getBitboardCastleMoves(self, r, c, allyColor, enemyColor, moves):
+        rights = self.castleRights
+        kingside = rights & (ChessEngine.WHITE_KINGSIDE if allyColor == "w" else ChessEngine.BLACK_KINGSIDE)
+        queenside = rights & (ChessEngine.WHITE_QUEENSIDE if allyColor == "w" else ChessEngine.BLACK_QUEENSIDE)
+        occupied = self.occupancy
+        if kingside and not occupied & (square_bit(r, c + 1) | square_bit(r, c + 2)):
+            if not self.squareUnderAttack(r, c + 1, allyColor) and not self.squareUnderAttack(r, c + 2, allyColor):
+                moves.append(ChessEngine.Move((r, c), (r, c + 2), self.board, isCastleMove=True))
+        if queenside and not occupied & (square_bit(r, c - 1) | square_bit(r, c - 2) | square_bit(r, c - 3)):
+            if not self.squareUnderAttack(r, c - 1, allyColor) and not self.squareUnderAttack(r, c - 2, allyColor):
+                moves.append(ChessEngine.Move((r, c), (r, c - 2), self.board, isCastleMove=True))
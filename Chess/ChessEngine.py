@@ -2,12 +2,74 @@
 This class is responsible for storing all information about the current state of a chess game and will be responsible for determining valid moves at current state.
 It will also keep a move log.
 """
+import random
+import re
+from Chess.ChessEvaluation import squareScore
+
+
+# Which GameState implementation newGameState() builds: "board" for the 8x8 list below, "bitboard" for ChessBitboard
+BACKEND = "bitboard"
 
 
 def in_range(r, c):
     return 7 >= r >= 0 and 7 >= c >= 0
 
 
+# Zobrist keys. A position's hash is the XOR of one key per (piece, square), the castling rights, the en passant file
+# and the side to move. The generator is seeded so keys (and anything stored by hash) are the same on every run.
+zobristRandom = random.Random(2021)
+zobristPieces = {color + piece: [zobristRandom.getrandbits(64) for sq in range(64)]
+                 for color in "wb" for piece in "PNBRQK"}
+zobristCastling = [zobristRandom.getrandbits(64) for rights in range(16)]
+zobristEnPassant = [zobristRandom.getrandbits(64) for col in range(8)]
+zobristBlackToMove = zobristRandom.getrandbits(64)
+
+# Castling rights are 4 bits in GameState.castleRights
+WHITE_KINGSIDE = 1
+WHITE_QUEENSIDE = 2
+BLACK_KINGSIDE = 4
+BLACK_QUEENSIDE = 8
+ALL_CASTLE_RIGHTS = 15
+# Rights kept when a move starts or ends on a square: moving or capturing on a king or rook home square clears its rights
+castleRightsMask = [ALL_CASTLE_RIGHTS] * 64
+castleRightsMask[0] = ALL_CASTLE_RIGHTS & ~BLACK_QUEENSIDE  # a8
+castleRightsMask[4] = ALL_CASTLE_RIGHTS & ~(BLACK_KINGSIDE | BLACK_QUEENSIDE)  # e8
+castleRightsMask[7] = ALL_CASTLE_RIGHTS & ~BLACK_KINGSIDE  # h8
+castleRightsMask[56] = ALL_CASTLE_RIGHTS & ~WHITE_QUEENSIDE  # a1
+castleRightsMask[60] = ALL_CASTLE_RIGHTS & ~(WHITE_KINGSIDE | WHITE_QUEENSIDE)  # e1
+castleRightsMask[63] = ALL_CASTLE_RIGHTS & ~WHITE_KINGSIDE  # h1
+
+# (row, col) of every square, so make / unmake can reuse the same tuples instead of building new ones
+squareCoords = [(sq // 8, sq % 8) for sq in range(64)]
+
+# Squares reachable from every square, used to build the attack maps. raySquares[sq] has one list of squares per
+# direction, the 4 orthogonal directions first and then the 4 diagonals.
+rayDirections = ((1, 0), (-1, 0), (0, 1), (0, -1), (-1, -1), (-1, 1), (1, -1), (1, 1))
+raySquares = [[[(r + dr * i) * 8 + c + dc * i for i in range(1, 8) if in_range(r + dr * i, c + dc * i)]
+               for dr, dc in rayDirections] for r, c in squareCoords]
+knightSquares = [[(r + dr) * 8 + c + dc for dr, dc in ((2, 1), (2, -1), (-2, 1), (-2, -1), (1, 2), (1, -2), (-1, -2), (-1, 2))
+                  if in_range(r + dr, c + dc)] for r, c in squareCoords]
+kingSquares = [[(r + dr) * 8 + c + dc for dr, dc in rayDirections if in_range(r + dr, c + dc)] for r, c in squareCoords]
+# get_king_moves builds the attack map once the king has this many squares to test
+ATTACK_MAP_MIN_TARGETS = 4
+# Squares a pawn of each color attacks
+pawnAttackSquares = {"w": [[(r - 1) * 8 + c + dc for dc in (-1, 1) if in_range(r - 1, c + dc)] for r, c in squareCoords],
+                     "b": [[(r + 1) * 8 + c + dc for dc in (-1, 1) if in_range(r + 1, c + dc)] for r, c in squareCoords]}
+
+
+"""
+Creates a GameState using the chosen backend (BACKEND by default). Both backends expose the same interface.
+"""
+def newGameState(backend=None):
+    backend = BACKEND if backend is None else backend
+    if backend == "bitboard":
+        from Chess import ChessBitboard
+        return ChessBitboard.BitboardGameState()
+    elif backend == "board":
+        return GameState()
+    raise ValueError("Unknown GameState backend: " + str(backend))
+
+
 class GameState():
     def __init__(self):
         # board is an 8x8 2d list that has each space represented by 2 characters
@@ -42,42 +104,67 @@ class GameState():
         self.pins = []
         self.checks = []
         self.enPassantPossible = ()
-        self.enPassantPossibleLog = [self.enPassantPossible]
-        self.currentCastlingRight = CastleRights(True, True, True, True)
-        self.castleRightsLog = [CastleRights(self.currentCastlingRight.wks, self.currentCastlingRight.wqs,
-                                             self.currentCastlingRight.bks, self.currentCastlingRight.bqs,)]
+        self.castleRights = ALL_CASTLE_RIGHTS
+        self.halfmoveClock = 0  # half moves since the last capture or pawn move, for the fifty move rule
+        self.fullmoveNumber = 1  # starts at 1 and goes up after every black move, as in FEN
+        # One packed int per move in moveLog with what undo_move can't get back from the move itself, see makeMove
+        self.undoStack = []
         self.checkmate = False
         self.stalemate = False
         self.drawRep = False
-        # Keep track of board positions that have happened using FEN notation
-        self.currentPosition = self.generateFENNotation()
-        self.boardPositions = []
-        self.repPositions = []
+        # Keep track of board positions that have happened using Zobrist hashes
+        self.zobristKey = self.computeZobristKey()
+        self.hashHistory = [self.zobristKey]  # key of every position in the game, the current one last
+        self.repetitionCounts = {self.zobristKey: 1}
+        # Material plus piece square score (white minus black), kept up to date by makeMove / undo_move
+        self.materialScore = self.computeMaterialScore()
+        self.pieceCount = 32  # pieces on the board, kings included
+        # Attack count maps of the current position by ally color, built on first use and dropped when the board changes
+        self.attackMaps = {}
 
     """
     Makes a given move on the board
     """
     def makeMove(self, move):
+        oldCastleRights = self.castleRights
+        oldEnPassant = self.enPassantPossible
+        # Undo record: castling rights in bits 0-3, en passant square + 1 (0 for none) in bits 4-10, the half move clock
+        # in bits 11-26 and the material score above them. The score can be negative, shifting it back down restores the
+        # sign.
+        self.attackMaps = {}
+        self.undoStack.append(self.materialScore << 27 | self.halfmoveClock << 11 |
+                              (0 if oldEnPassant == () else oldEnPassant[0] * 8 + oldEnPassant[1] + 1) << 4 |
+                              oldCastleRights)
+        startSq = move.startRow * 8 + move.startCol
+        endSq = move.endRow * 8 + move.endCol
         self.board[move.startRow][move.startCol] = "--"
         self.board[move.endRow][move.endCol] = move.pieceMoved
         self.moveLog.append(move)  # log the move to undo or record
         self.whiteToMove = not self.whiteToMove
         if move.pieceMoved == "wK":
-            self.whiteKingLocation = (move.endRow, move.endCol)
+            self.whiteKingLocation = squareCoords[endSq]
         elif move.pieceMoved == "bK":
-            self.blackKingLocation = (move.endRow, move.endCol)
+            self.blackKingLocation = squareCoords[endSq]
         # Pawn Promotion
         if move.isPawnPromotion:
             self.board[move.endRow][move.endCol] = move.pieceMoved[0] + "Q"
-            move.isPawnPromotion = False
         # en passant move
         if move.isEnPassantMove:
             move.pieceCaptured = self.board[move.startRow][move.endCol]
             self.board[move.startRow][move.endCol] = "--"
+        if move.pieceCaptured != "--":
+            self.pieceCount -= 1
+            self.halfmoveClock = 0
+        elif move.pieceMoved[1] == "P":
+            self.halfmoveClock = 0
+        else:
+            self.halfmoveClock += 1
+        if move.pieceMoved[0] == "b":
+            self.fullmoveNumber += 1
 
         # en passant available
         if move.pieceMoved[1] == "P" and abs(move.endRow-move.startRow) == 2:
-            self.enPassantPossible = ((move.startRow+move.endRow)//2, move.startCol)
+            self.enPassantPossible = squareCoords[(startSq + endSq) // 2]
         else:
             self.enPassantPossible = ()
 
@@ -90,11 +177,35 @@ class GameState():
                 self.board[move.endRow][move.endCol + 1] = self.board[move.endRow][move.endCol - 2]  # Moves Rook
                 self.board[move.endRow][move.endCol - 2] = "--"
 
-        # Update castling rights - whenever it is a rook or king move
-        self.updateCastleRights(move)
-        self.castleRightsLog.append(CastleRights(self.currentCastlingRight.wks, self.currentCastlingRight.bks,
-                                                 self.currentCastlingRight.wqs, self.currentCastlingRight.bqs))
-        self.enPassantPossibleLog.append(self.enPassantPossible)
+        # Update castling rights - whenever a king or rook square is moved from or captured on
+        self.castleRights = oldCastleRights & castleRightsMask[startSq] & castleRightsMask[endSq]
+        self.materialScore += self.scoreDelta(move)
+
+        # Update the hash with only what this move changed
+        key = self.zobristKey ^ zobristBlackToMove
+        key ^= zobristPieces[move.pieceMoved][startSq]
+        placedPiece = move.pieceMoved[0] + "Q" if move.isPawnPromotion else move.pieceMoved
+        key ^= zobristPieces[placedPiece][endSq]
+        if move.pieceCaptured != "--":
+            captureRow = move.startRow if move.isEnPassantMove else move.endRow
+            key ^= zobristPieces[move.pieceCaptured][captureRow * 8 + move.endCol]
+        if move.isCastleMove:
+            rookKeys = zobristPieces[move.pieceMoved[0] + "R"]
+            rowStart = move.endRow * 8
+            if move.endCol - move.startCol == 2:
+                key ^= rookKeys[rowStart + 7] ^ rookKeys[rowStart + 5]
+            else:
+                key ^= rookKeys[rowStart] ^ rookKeys[rowStart + 3]
+        if oldEnPassant != ():
+            key ^= zobristEnPassant[oldEnPassant[1]]
+        if self.enPassantPossible != ():
+            key ^= zobristEnPassant[self.enPassantPossible[1]]
+        key ^= zobristCastling[oldCastleRights] ^ zobristCastling[self.castleRights]
+        self.zobristKey = key
+        self.hashHistory.append(key)
+        count = self.repetitionCounts.get(key, 0) + 1
+        self.repetitionCounts[key] = count
+        self.drawRep = count >= 3
 
     """
     Undo last move
@@ -102,26 +213,39 @@ class GameState():
     def undo_move(self):
         if len(self.moveLog) != 0:
             last_move = self.moveLog.pop()
+            record = self.undoStack.pop()
+            self.attackMaps = {}
             self.board[last_move.startRow][last_move.startCol] = last_move.pieceMoved
             self.board[last_move.endRow][last_move.endCol] = last_move.pieceCaptured
             self.whiteToMove = not self.whiteToMove
             if last_move.pieceMoved == "wK":
-                self.whiteKingLocation = (last_move.startRow, last_move.startCol)
+                self.whiteKingLocation = squareCoords[last_move.startRow * 8 + last_move.startCol]
             elif last_move.pieceMoved == "bK":
-                self.blackKingLocation = (last_move.startRow, last_move.startCol)
+                self.blackKingLocation = squareCoords[last_move.startRow * 8 + last_move.startCol]
             # undo en passant
             if last_move.isEnPassantMove:
                 self.board[last_move.endRow][last_move.endCol] = "--"
                 self.board[last_move.startRow][last_move.endCol] = last_move.pieceCaptured
-            self.enPassantPossibleLog.pop()
-            self.enPassantPossible = self.enPassantPossibleLog[-1]
+            if last_move.pieceCaptured != "--":
+                self.pieceCount += 1
+            if last_move.pieceMoved[0] == "b":
+                self.fullmoveNumber -= 1
+            enPassantIndex = record >> 4 & 0x7F
+            self.enPassantPossible = () if enPassantIndex == 0 else squareCoords[enPassantIndex - 1]
+            self.castleRights = record & ALL_CASTLE_RIGHTS
+            self.halfmoveClock = record >> 11 & 0xFFFF
+            self.materialScore = record >> 27
             self.checkmate = False
             self.stalemate = False
-            self.drawRep = False
-            # Undo castle rights
-            self.castleRightsLog.pop() # get rid of new castle rights
-            newRights = self.castleRightsLog[-1]
-            self.currentCastlingRight = CastleRights(newRights.wks, newRights.bks, newRights.wqs, newRights.bqs) # set current rights to rights of previous move
+            # Restore the previous hash from the history instead of recomputing it
+            key = self.hashHistory.pop()
+            count = self.repetitionCounts[key]
+            if count == 1:  # drop positions no longer on the path, or the dict keeps every one the search visited
+                del self.repetitionCounts[key]
+            else:
+                self.repetitionCounts[key] = count - 1
+            self.zobristKey = self.hashHistory[-1]
+            self.drawRep = self.repetitionCounts[self.zobristKey] >= 3
             # Undo Castle Move
             if last_move.isCastleMove:
                 if last_move.endCol-last_move.startCol == 2:
@@ -132,36 +256,59 @@ class GameState():
                     self.board[last_move.endRow][last_move.endCol + 1] = "--"
 
 
-    def updateCastleRights(self, move):
-        if move.pieceMoved == "wK":
-            self.currentCastlingRight.wqs = False
-            self.currentCastlingRight.wks = False
-        elif move.pieceMoved == "bK":
-            self.currentCastlingRight.bqs = False
-            self.currentCastlingRight.bks = False
-        elif move.pieceMoved[1] == "R":
-            if move.startRow == 7:
-                if move.startCol == 0:
-                    self.currentCastlingRight.wqs = False   # White Queenside rook moved
-                elif move.startCol == 7:
-                    self.currentCastlingRight.wks = False   # White Kingside rook moved
-            elif move.startRow == 0:
-                if move.startCol == 0:
-                    self.currentCastlingRight.bqs = False   # Black Queenside rook moved
-                elif move.startCol == 7:
-                    self.currentCastlingRight.bks = False   # Black Kingside rook moved
-        if move.pieceCaptured[1] == "R":
-            if move.endRow == 7:
-                if move.endCol == 0:
-                    self.currentCastlingRight.wqs = False   # White Queenside rook moved
-                elif move.endCol == 7:
-                    self.currentCastlingRight.wks = False   # White Kingside rook moved
-            elif move.endRow == 0:
-                if move.endCol == 0:
-                    self.currentCastlingRight.bqs = False   # Black Queenside rook moved
-                elif move.endCol == 7:
-                    self.currentCastlingRight.bks = False   # Black Kingside rook moved
-                
+    """
+    Computes the Zobrist hash of the current position from scratch. makeMove and undo_move keep it up to date after this.
+    """
+    def computeZobristKey(self):
+        key = 0
+        for r in range(8):
+            for c in range(8):
+                if self.board[r][c] != "--":
+                    key ^= zobristPieces[self.board[r][c]][r * 8 + c]
+        key ^= zobristCastling[self.castleRights]
+        if self.enPassantPossible != ():
+            key ^= zobristEnPassant[self.enPassantPossible[1]]
+        if not self.whiteToMove:
+            key ^= zobristBlackToMove
+        return key
+
+    """
+    Computes the material and square score from scratch, see ChessEvaluation.squareScore
+    """
+    def computeMaterialScore(self):
+        score = 0
+        for r in range(8):
+            for c in range(8):
+                if self.board[r][c] != "--":
+                    score += squareScore[self.board[r][c]][r * 8 + c]
+        return score
+
+    """
+    Change in materialScore caused by a move. makeMove adds it and undo_move subtracts it.
+    """
+    def scoreDelta(self, move):
+        delta = -squareScore[move.pieceMoved][move.startRow * 8 + move.startCol]
+        placedPiece = move.pieceMoved[0] + "Q" if move.isPawnPromotion else move.pieceMoved
+        delta += squareScore[placedPiece][move.endRow * 8 + move.endCol]
+        if move.pieceCaptured != "--":
+            captureRow = move.startRow if move.isEnPassantMove else move.endRow
+            delta -= squareScore[move.pieceCaptured][captureRow * 8 + move.endCol]
+        if move.isCastleMove:
+            rookScores = squareScore[move.pieceMoved[0] + "R"]
+            rowStart = move.endRow * 8
+            if move.endCol - move.startCol == 2:
+                delta += rookScores[rowStart + 5] - rookScores[rowStart + 7]
+            else:
+                delta += rookScores[rowStart + 3] - rookScores[rowStart]
+        return delta
+
+    """
+    Returns True if the current position has occurred at least the given number of times in this game. Constant time,
+    so the search can use it (times=2) as well as the GUI (threefold).
+    """
+    def isRepetition(self, times=3):
+        return self.repetitionCounts[self.zobristKey] >= times
+
     """
     All moves considering checks
     """
@@ -178,23 +325,10 @@ class GameState():
         if self.inCheck:
             if len(self.checks) == 1:   # Only one check, block check, capture, or move king
                 moves = self.get_all_possible_moves()
-                check = self.checks[0]
-                checkRow = check[0]
-                checkCol = check[1]
-                pieceChecking = self.board[checkRow][checkCol]
-                validSquares = []
-                if pieceChecking[1] == "N":
-                    validSquares = [(checkRow, checkCol)]
-                else:
-                    for i in range(1,8):
-                        validSquare = (kingRow + check[2] * i, kingCol + check[3] * i)
-                        validSquares.append(validSquare)
-                        if validSquare[0] == checkRow and validSquare[1] == checkCol:
-                            break
+                validSquares = self.checkBlockSquares(kingRow, kingCol)
                 for i in range(len(moves) - 1, -1, -1):
-                    if moves[i].pieceMoved[1] != "K":
-                        if not (moves[i].endRow, moves[i].endCol) in validSquares:
-                            moves.remove(moves[i])
+                    if moves[i].pieceMoved[1] != "K" and not self.answersCheck(moves[i], validSquares):
+                        moves.remove(moves[i])
             else:  # double check, king has to move
                 self.get_king_moves(kingRow, kingCol, moves, captures)
                 moves = moves + captures
@@ -211,6 +345,85 @@ class GameState():
         return moves
 
 
+    """
+    Squares a piece other than the king can move to against a single check: the checking piece and, for a sliding
+    checker, the squares between it and the king at (kingRow, kingCol).
+    """
+    def checkBlockSquares(self, kingRow, kingCol):
+        check = self.checks[0]
+        checkRow = check[0]
+        checkCol = check[1]
+        pieceChecking = self.board[checkRow][checkCol]
+        validSquares = []
+        if pieceChecking[1] == "N":
+            validSquares = [(checkRow, checkCol)]
+        else:
+            for i in range(1,8):
+                validSquare = (kingRow + check[2] * i, kingCol + check[3] * i)
+                validSquares.append(validSquare)
+                if validSquare[0] == checkRow and validSquare[1] == checkCol:
+                    break
+        return validSquares
+
+    def answersCheck(self, move, validSquares):
+        if move.isEnPassantMove and (move.startRow, move.endCol) == self.checks[0][:2]:
+            return True  # en passant capturing the checking pawn
+        return (move.endRow, move.endCol) in validSquares
+
+    """
+    True if the side to move has a legal move. Sets inCheck, checkmate and stalemate like get_valid_moves, but stops at
+    the first legal move it finds instead of building the whole list, so the search can tell mate and stalemate apart
+    from a live position cheaply. The king steps are tried first, one square at a time, then the other pieces.
+    Castling is never needed: a king that can castle can also step to the square next to it.
+    """
+    def hasLegalMove(self):
+        self.inCheck, self.pins, self.checks = self.checkForPinsAndChecks()
+        self.checkmate = False
+        self.stalemate = False
+        if self.whiteToMove:
+            allyColor = "w"
+            kingRow, kingCol = self.whiteKingLocation
+        else:
+            allyColor = "b"
+            kingRow, kingCol = self.blackKingLocation
+        for to in kingSquares[kingRow * 8 + kingCol]:
+            r, c = squareCoords[to]
+            if self.board[r][c][0] != allyColor and not self.squareUnderAttack(r, c, allyColor):
+                return True
+        if len(self.checks) < 2:
+            validSquares = self.checkBlockSquares(kingRow, kingCol) if self.inCheck else None
+            for r in range(8):
+                for c in range(8):
+                    piece = self.board[r][c]
+                    if piece[0] == allyColor and piece[1] != "K":
+                        moves = []
+                        captures = []
+                        self.moveFunctions[piece[1]](r, c, moves, captures)
+                        for move in captures + moves:
+                            if validSquares is None or self.answersCheck(move, validSquares):
+                                return True
+        if self.inCheck:
+            self.checkmate = True
+        else:
+            self.stalemate = True
+        return False
+
+    """
+    Legal moves in two batches for the search: the first next() returns the captures and promotions, the second the quiet
+    moves. This version builds the full list up front and splits it, ChessBitboard only generates each batch when asked.
+    """
+    def generateMovesInStages(self):
+        moves = self.get_valid_moves()
+        noisy = []
+        quiet = []
+        for move in moves:
+            if move.pieceCaptured != "--" or move.isEnPassantMove or move.isPawnPromotion:
+                noisy.append(move)
+            else:
+                quiet.append(move)
+        yield noisy
+        yield quiet
+
     """
     Gets all moves without considering checks
     """
@@ -254,11 +467,12 @@ class GameState():
                         if self.whiteKingLocation[0] == 3:
                             self.board[self.enPassantPossible[0]+1][self.enPassantPossible[1]] = "--"
                             incheck, pins, checks = self.checkForPinsAndChecks()
+                            enPassantPinned = False
                             self.board[self.enPassantPossible[0]+1][self.enPassantPossible[1]] = "bP"
                             for i in range(len(pins) - 1, -1, -1):
                                 if pins[i][0] == r and pins[i][1] == c:
-                                    piecePinned = True
-                            if not piecePinned:
+                                    enPassantPinned = True
+                            if not enPassantPinned:
                                 captures.append(Move((r, c), (r - 1, c - 1), self.board, isEnPassantMove=True))
                         else:
                             captures.append(Move((r, c), (r - 1, c - 1), self.board, isEnPassantMove=True))
@@ -272,11 +486,12 @@ class GameState():
                         if self.whiteKingLocation[0] == 3:
                             self.board[self.enPassantPossible[0] + 1][self.enPassantPossible[1]] = "--"
                             incheck, pins, checks = self.checkForPinsAndChecks()
+                            enPassantPinned = False
                             self.board[self.enPassantPossible[0] + 1][self.enPassantPossible[1]] = "bP"
                             for i in range(len(pins) - 1, -1, -1):
                                 if pins[i][0] == r and pins[i][1] == c:
-                                    piecePinned = True
-                            if not piecePinned:
+                                    enPassantPinned = True
+                            if not enPassantPinned:
                                 captures.append(Move((r, c), (r - 1, c + 1), self.board, isEnPassantMove=True))
                         else: captures.append(Move((r, c), (r - 1, c + 1), self.board, isEnPassantMove=True))
         else:    # black pawn moves
@@ -295,11 +510,12 @@ class GameState():
                         if self.blackKingLocation[0] == 4:
                             self.board[self.enPassantPossible[0] - 1][self.enPassantPossible[1]] = "--"
                             incheck, pins, checks = self.checkForPinsAndChecks()
+                            enPassantPinned = False
                             self.board[self.enPassantPossible[0] - 1][self.enPassantPossible[1]] = "wP"
                             for i in range(len(pins) - 1, -1, -1):
                                 if pins[i][0] == r and pins[i][1] == c:
-                                    piecePinned = True
-                            if not piecePinned:
+                                    enPassantPinned = True
+                            if not enPassantPinned:
                                 captures.append(Move((r, c), (r + 1, c - 1), self.board, isEnPassantMove=True))
                         else:
                             captures.append(Move((r, c), (r + 1, c - 1), self.board, isEnPassantMove=True))
@@ -313,11 +529,12 @@ class GameState():
                         if self.blackKingLocation[0] == 4:
                             self.board[self.enPassantPossible[0] - 1][self.enPassantPossible[1]] = "--"
                             incheck, pins, checks = self.checkForPinsAndChecks()
+                            enPassantPinned = False
                             self.board[self.enPassantPossible[0] - 1][self.enPassantPossible[1]] = "wP"
                             for i in range(len(pins) - 1, -1, -1):
                                 if pins[i][0] == r and pins[i][1] == c:
-                                    piecePinned = True
-                            if not piecePinned:
+                                    enPassantPinned = True
+                            if not enPassantPinned:
                                 captures.append(Move((r, c), (r + 1, c + 1), self.board, isEnPassantMove=True))
                         else:
                             captures.append(Move((r, c), (r + 1, c + 1), self.board, isEnPassantMove=True))
@@ -347,13 +564,12 @@ class GameState():
         for x, y in steps:  # Increments in each direction on board until not blank.
             x_step = x
             y_step = y
+            if piecePinned and pinDirection != (x_step, y_step) and pinDirection != (-x_step, -y_step):
+                continue  # pinned pieces can only move along the pin
             while in_range(r + x, c + y) and self.board[r + x][c + y] == "--":
-                if (not piecePinned) or (pinDirection == (x, y) or pinDirection == (-x, -y)):
-                    moves.append(Move((r, c), (r + x, c + y), self.board))
-                    x += x_step
-                    y += y_step
-                else:
-                    break
+                moves.append(Move((r, c), (r + x, c + y), self.board))
+                x += x_step
+                y += y_step
             if in_range(r + x, c + y) and self.board[r + x][c + y][0] == "b" and self.whiteToMove:
                 captures.append(Move((r, c), (r + x, c + y), self.board))
             elif in_range(r + x, c + y) and self.board[r + x][c + y][0] == "w" and not self.whiteToMove:
@@ -378,6 +594,14 @@ class GameState():
     def get_king_moves(self, r, c, moves, captures):
         steps = [(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (-1, -1), (-1, 1), (1, -1)]
         allyColor = self.board[r][c][0]
+        # Scanning a square costs about a tenth of building the attack map, so only build it for a king with room to move
+        if allyColor not in self.attackMaps:
+            targets = 0
+            for to in kingSquares[r * 8 + c]:
+                if self.board[to >> 3][to & 7][0] != allyColor:
+                    targets += 1
+            if targets >= ATTACK_MAP_MIN_TARGETS:
+                self.buildAttackMap(allyColor)
         for x, y in steps:  # Checks in each step direction one time.
 
             if in_range(r + x, c + y) and self.board[r + x][c + y][0] != allyColor:
@@ -392,9 +616,9 @@ class GameState():
     def getCastleMoves(self, r, c, moves, allyColor):
         if self.inCheck:  # can't castle in check
             return
-        if (self.whiteToMove and self.currentCastlingRight.wks) or (not self.whiteToMove and self.currentCastlingRight.bks):
+        if self.castleRights & (WHITE_KINGSIDE if self.whiteToMove else BLACK_KINGSIDE):
             self.getKingsideCastleMoves(r, c, moves, allyColor)
-        if (self.whiteToMove and self.currentCastlingRight.wqs) or (not self.whiteToMove and self.currentCastlingRight.bqs):
+        if self.castleRights & (WHITE_QUEENSIDE if self.whiteToMove else BLACK_QUEENSIDE):
             self.getQueensideCastleMoves(r, c, moves, allyColor)
 
     def getKingsideCastleMoves(self, r, c, moves, allyColor):
@@ -407,7 +631,18 @@ class GameState():
             if not self.squareUnderAttack(r, c - 1, allyColor) and not self.squareUnderAttack(r, c - 2, allyColor):
                 moves.append(Move((r, c), (r, c - 2), self.board, isCastleMove=True))
 
+    """
+    True if an enemy of allyColor attacks (r, c). The ally king does not block attacks, so the squares a king would step
+    back to along a checking line count as attacked. Once the position's attack map is built this is a lookup, before
+    that the square is scanned on its own.
+    """
     def squareUnderAttack(self, r, c, allyColor):
+        attacks = self.attackMaps.get(allyColor)
+        if attacks is None:
+            return self.scanForAttack(r, c, allyColor)
+        return attacks[r * 8 + c] > 0
+
+    def scanForAttack(self, r, c, allyColor):
         enemyColor = "b" if allyColor == "w" else "w"
         directions = ((1, 0), (-1, 0), (0, 1), (0, -1), (-1, -1), (-1, 1), (1, -1), (1, 1))
         for j in range(len(directions)):
@@ -448,6 +683,45 @@ class GameState():
         return False
 
 
+    """
+    Counts for every square how many enemy pieces of allyColor attack it, with the ally king lifted off the board. Done
+    once per position and color, then kept in attackMaps until the next makeMove / undo_move.
+    """
+    def buildAttackMap(self, allyColor):
+        enemyColor = "b" if allyColor == "w" else "w"
+        allyKing = allyColor + "K"
+        attacks = [0] * 64
+        board = self.board
+        for sq in range(64):
+            piece = board[sq >> 3][sq & 7]
+            if piece[0] != enemyColor:
+                continue
+            pieceType = piece[1]
+            if pieceType == "P":
+                targets = pawnAttackSquares[enemyColor][sq]
+            elif pieceType == "N":
+                targets = knightSquares[sq]
+            elif pieceType == "K":
+                targets = kingSquares[sq]
+            else:
+                rays = raySquares[sq]
+                if pieceType == "R":
+                    rays = rays[:4]
+                elif pieceType == "B":
+                    rays = rays[4:]
+                for ray in rays:
+                    for to in ray:
+                        attacks[to] += 1
+                        blocker = board[to >> 3][to & 7]
+                        if blocker != "--" and blocker != allyKing:
+                            break
+                continue
+            for to in targets:
+                attacks[to] += 1
+        self.attackMaps[allyColor] = attacks
+        return attacks
+
+
     """
     Checks outward from king's location to find checks and pins. Returns the list of checks and pinned pieces.
     """
@@ -515,7 +789,7 @@ class GameState():
         return inCheck, pins, checks
 
     '''
-    Generates segment 1 of FEN notation for a board's position. Used to keep track of repetitions, not load game states.
+    Generates segment 1 of FEN notation for a board's position.
     '''
     def generateFENNotation(self):
         newPosition = ""
@@ -535,24 +809,155 @@ class GameState():
                 blanksquares = 0
             if row < 7:
                 newPosition += "/"
-        self.currentPosition = newPosition
         return newPosition
-    def addBoardPosition(self):
-        if self.currentPosition in self.boardPositions:
-            if self.currentPosition in self.repPositions:
-                self.drawRep = True
-            else:
-                self.repPositions.append(self.currentPosition)
+
+    """
+    The four position fields of FEN / EPD: piece placement, side to move, castling rights and en passant square
+    """
+    def positionFields(self):
+        castling = "".join(char for char, right in (("K", WHITE_KINGSIDE), ("Q", WHITE_QUEENSIDE),
+                                                    ("k", BLACK_KINGSIDE), ("q", BLACK_QUEENSIDE))
+                           if self.castleRights & right) or "-"
+        if self.enPassantPossible == ():
+            enPassant = "-"
         else:
-            self.boardPositions.append(self.currentPosition)
-class CastleRights():
-    def __init__(self, wks, bks, wqs, bqs):
-        self.wks = wks
-        self.bks = bks
-        self.wqs = wqs
-        self.bqs = bqs
+            enPassant = Move.colsToFiles[self.enPassantPossible[1]] + Move.rowsToRanks[self.enPassantPossible[0]]
+        return [self.generateFENNotation(), "w" if self.whiteToMove else "b", castling, enPassant]
+
+    """
+    The full FEN of the current position, clocks included. loadFEN(getFEN()) gives back the same position.
+    """
+    def getFEN(self):
+        return " ".join(self.positionFields() + [str(self.halfmoveClock), str(self.fullmoveNumber)])
+
+    """
+    The position as an EPD line: the four position fields followed by the operations in the given dict (opcode to a
+    list of operands, or a single operand), in the order given.
+    """
+    def getEPD(self, operations=None):
+        line = " ".join(self.positionFields())
+        for opcode, operands in (operations or {}).items():
+            if not isinstance(operands, (list, tuple)):
+                operands = [operands]
+            line += " " + " ".join([opcode] + [formatEPDOperand(operand) for operand in operands]) + ";"
+        return line
+
+    """
+    Sets the game up from an EPD line and returns its operations as a dict of opcode to list of operands. The hmvc and
+    fmvn operations, if there, set the clocks.
+    """
+    def loadEPD(self, line):
+        fields, operations = parseEPD(line)
+        clocks = [operations.get("hmvc", ["0"])[0], operations.get("fmvn", ["1"])[0]]
+        self.loadFEN(" ".join(fields + clocks))
+        return operations
+
+    """
+    Sets the game up from a FEN string: piece placement, side to move, castling rights, en passant square and the
+    optional half move clock and full move number (0 and 1 when left out). The move log and repetition history start
+    empty from this position. Raises ValueError for a malformed FEN and for a position that can't occur: not exactly
+    one king per side, a pawn on the first or last rank, or the side not to move in check.
+    """
+    def loadFEN(self, fen):
+        fields = fen.split()
+        if not 4 <= len(fields) <= 6:
+            raise ValueError("FEN needs 4 to 6 fields: " + fen)
+        clocks = fields[4:] + ["0", "1"][len(fields) - 4:]
+        if not all(clock.isdigit() for clock in clocks) or int(clocks[0]) > 0xFFFF or int(clocks[1]) < 1:
+            raise ValueError("Bad move clocks in FEN: " + fen)
+        rows = fields[0].split("/")
+        if len(rows) != 8:
+            raise ValueError("FEN piece placement needs 8 ranks: " + fen)
+        board = []
+        for r in range(8):
+            boardRow = []
+            for char in rows[r]:
+                if char.isdigit():
+                    boardRow.extend(["--"] * int(char))
+                elif char.upper() in "PNBRQK":
+                    boardRow.append(("w" if char.isupper() else "b") + char.upper())
+                    if char == "K":
+                        self.whiteKingLocation = (r, len(boardRow) - 1)
+                    elif char == "k":
+                        self.blackKingLocation = (r, len(boardRow) - 1)
+                else:
+                    raise ValueError("Unknown piece '" + char + "' in FEN: " + fen)
+            if len(boardRow) != 8:
+                raise ValueError("FEN rank " + str(8 - r) + " does not have 8 squares: " + fen)
+            board.append(boardRow)
+        if fields[1] not in ("w", "b"):
+            raise ValueError("FEN side to move must be w or b: " + fen)
+        # The move generators assume a legal position, the backends disagree on any other
+        if sum(boardRow.count("wK") for boardRow in board) != 1 or sum(boardRow.count("bK") for boardRow in board) != 1:
+            raise ValueError("FEN needs exactly one king per side: " + fen)
+        if "wP" in board[0] + board[7] or "bP" in board[0] + board[7]:
+            raise ValueError("FEN has a pawn on the first or last rank: " + fen)
+        self.board = board
+        self.whiteToMove = fields[1] == "w"
+        r, c = self.blackKingLocation if self.whiteToMove else self.whiteKingLocation
+        if self.scanForAttack(r, c, "b" if self.whiteToMove else "w"):
+            raise ValueError("FEN side not to move is in check: " + fen)
+        castling = fields[2]
+        self.castleRights = (WHITE_KINGSIDE if "K" in castling else 0) | (WHITE_QUEENSIDE if "Q" in castling else 0) | \
+            (BLACK_KINGSIDE if "k" in castling else 0) | (BLACK_QUEENSIDE if "q" in castling else 0)
+        if fields[3] == "-":
+            self.enPassantPossible = ()
+        else:
+            if fields[3][0] not in Move.filesToCols or fields[3][1:] not in Move.ranksToRows:
+                raise ValueError("Bad en passant square in FEN: " + fen)
+            self.enPassantPossible = squareCoords[Move.ranksToRows[fields[3][1:]] * 8 + Move.filesToCols[fields[3][0]]]
+        self.halfmoveClock = int(clocks[0])
+        self.fullmoveNumber = int(clocks[1])
+        self.moveLog = []
+        self.undoStack = []
+        self.inCheck = False
+        self.pins = []
+        self.checks = []
+        self.checkmate = False
+        self.stalemate = False
+        self.drawRep = False
+        self.zobristKey = self.computeZobristKey()
+        self.hashHistory = [self.zobristKey]
+        self.repetitionCounts = {self.zobristKey: 1}
+        self.materialScore = self.computeMaterialScore()
+        self.pieceCount = sum(square != "--" for boardRow in board for square in boardRow)
+        self.attackMaps = {}
+
+
+epdOperation = re.compile(r'\s*([A-Za-z][A-Za-z0-9_]*)((?:\s+(?:"[^"]*"|[^\s;"]+))*)\s*;')
+epdOperand = re.compile(r'"([^"]*)"|([^\s;"]+)')
+
+
+"""
+Splits an EPD line into its four position fields and a dict of operations (opcode to list of operands, quotes removed)
+"""
+def parseEPD(line):
+    fields = line.split(None, 4)
+    if len(fields) < 4:
+        raise ValueError("EPD needs 4 position fields: " + line)
+    operations = {}
+    rest = fields[4].strip() if len(fields) == 5 else ""
+    position = 0
+    while position < len(rest):
+        match = epdOperation.match(rest, position)
+        if not match:
+            raise ValueError("Bad EPD operation in: " + line)
+        operations[match.group(1)] = [quoted if quoted else bare for quoted, bare in epdOperand.findall(match.group(2))]
+        position = match.end()
+        while position < len(rest) and rest[position].isspace():
+            position += 1
+    return fields[:4], operations
+
+
+def formatEPDOperand(operand):
+    text = str(operand)
+    return text if text and not any(char.isspace() or char in ';"' for char in text) else '"' + text.replace('"', "'") + '"'
+
 
 class Move():
+    # Moves are created by the hundred thousand during a search, so they have slots instead of a per instance __dict__
+    __slots__ = ("startRow", "startCol", "endRow", "endCol", "pieceMoved", "pieceCaptured", "moveID",
+                 "isPawnPromotion", "isEnPassantMove", "isCastleMove")
     # maps keys to values
     # key : value
     ranksToRows = {"1": 7, "2": 6, "3": 5, "4": 4,
@@ -561,23 +966,61 @@ class Move():
     filesToCols = {"h": 7, "g": 6, "f": 5, "e": 4,
                    "d": 3, "c": 2, "b": 1, "a": 0}
     colsToFiles = {v: k for k, v in filesToCols.items()}
+    # 4 bit piece codes for the packed encoding
+    pieceCodes = {"--": 0, "wP": 1, "wN": 2, "wB": 3, "wR": 4, "wQ": 5, "wK": 6,
+                  "bP": 7, "bN": 8, "bB": 9, "bR": 10, "bQ": 11, "bK": 12}
+    codePieces = {v: k for k, v in pieceCodes.items()}
+    PROMOTION_FLAG = 1
+    EN_PASSANT_FLAG = 2
+    CASTLE_FLAG = 4
 
     def __init__(self, startSq, endSq, board, isEnPassantMove=False, isCastleMove = False):
-        self.startRow = startSq[0]
-        self.startCol = startSq[1]
-        self.endRow = endSq[0]
-        self.endCol = endSq[1]
-        self.pieceMoved = board[self.startRow][self.startCol]
-        self.pieceCaptured = board[self.endRow][self.endCol]
-        self.moveID = self.startRow*1000 + self.startCol*100 + self.endRow*10 + self.endCol
+        startRow, startCol = startSq
+        endRow, endCol = endSq
+        self.startRow = startRow
+        self.startCol = startCol
+        self.endRow = endRow
+        self.endCol = endCol
+        self.pieceMoved = pieceMoved = board[startRow][startCol]
+        self.pieceCaptured = board[endRow][endCol]
+        # from square in the high 6 bits, to square in the low 6 bits, so it fits in 12 bits
+        self.moveID = (startRow * 8 + startCol) << 6 | endRow * 8 + endCol
 
         # Piece Promotion
-        self.isPawnPromotion = self.pieceMoved[1] == "P" and (self.endRow == 7 or self.endRow == 0)
+        self.isPawnPromotion = pieceMoved[1] == "P" and (endRow == 7 or endRow == 0)
         # en passant
         self.isEnPassantMove = isEnPassantMove
         #Castle move
         self.isCastleMove = isCastleMove
 
+    """
+    Packs the move into one int: moveID in bits 0-11, the flags in bits 12-14, the moved piece in bits 15-18 and the
+    captured piece in bits 19-22. Good for storing moves without keeping Move objects alive.
+    """
+    def encode(self):
+        flags = (self.PROMOTION_FLAG if self.isPawnPromotion else 0) | \
+                (self.EN_PASSANT_FLAG if self.isEnPassantMove else 0) | (self.CASTLE_FLAG if self.isCastleMove else 0)
+        return self.moveID | flags << 12 | self.pieceCodes[self.pieceMoved] << 15 | \
+            self.pieceCodes[self.pieceCaptured] << 19
+
+    """
+    Expands a packed move from encode() back into a Move, without needing the board
+    """
+    @staticmethod
+    def decode(code):
+        move = Move.__new__(Move)
+        startSq = code >> 6 & 63
+        endSq = code & 63
+        move.startRow, move.startCol = divmod(startSq, 8)
+        move.endRow, move.endCol = divmod(endSq, 8)
+        move.moveID = code & 0xFFF
+        flags = code >> 12 & 7
+        move.isPawnPromotion = bool(flags & Move.PROMOTION_FLAG)
+        move.isEnPassantMove = bool(flags & Move.EN_PASSANT_FLAG)
+        move.isCastleMove = bool(flags & Move.CASTLE_FLAG)
+        move.pieceMoved = Move.codePieces[code >> 15 & 15]
+        move.pieceCaptured = Move.codePieces[code >> 19 & 15]
+        return move
 
     """
     Overriding equals method
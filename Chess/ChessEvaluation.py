@@ -0,0 +1,115 @@
+"""
+Evaluation tables shared by the search (ChessAI.scoreBoard) and the GameState, which keeps a running total of them so
+the leaf evaluation does not have to loop over the board.
+A positive score is good for white, a negative score is good for black.
+"""
+pieceScore = {"K": 0, "Q": 900, "R": 500, "N": 300, "B": 310, "P": 100}
+
+
+def position_value(piece, r, c):
+    piece_map = piece_optimal_squares[piece]
+    value = piece_map[r][c]
+    return value
+  
+piece_optimal_squares = {"wN": [[-20, 0, 0, 0, 0, 0, 0, -20],
+                                [0, 10, 10, 10, 10, 10, 10, 0],
+                                [0, 10, 20, 20, 20, 20, 10, 0],
+                                [0, 10, 20, 20, 20, 20, 10, 0],
+                                [0, 10, 20, 20, 20, 20, 10, 0],
+                                [0, 10, 20, 20, 20, 20, 10, 0],
+                                [0, 10, 10, 10, 10, 10, 10, 0],
+                                [-20, 0, 0, 0, 0, 0, 0, -20]],
+                         "bN": [[-20, 0, 0, 0, 0, 0, 0, -20],
+                                [0, 10, 10, 10, 10, 10, 10, 0],
+                                [0, 10, 20, 20, 20, 20, 10, 0],
+                                [0, 10, 20, 20, 20, 20, 10, 0],
+                                [0, 10, 20, 20, 20, 20, 10, 0],
+                                [0, 10, 20, 20, 20, 20, 10, 0],
+                                [0, 10, 10, 10, 10, 10, 10, 0],
+                                [-20, 0, 0, 0, 0, 0, 0, -20]],
+                         "wK": [[0, 0, 0, 0, 0, 0, 0, 0],
+                                  [0, 0, 0, -20, -20, 0, 0, 0],
+                                  [0, 0, 0, -20, -20, 0, 0, 0],
+                                  [0, 0, 0, -10, -10, 0, 0, 0],
+                                  [0, 0, 0, -10, -10, 0, 0, 0],
+                                  [0, 0, 0, -10, -10, 0, 0, 0],
+                                  [0, 0, 0, -10, -10, 0, 0, 0],
+                                  [30, 30, 20, 0, 0, 0, 30, 30]],
+                         "bK": [[30, 30, 20, 0, 0, 0, 30, 30],
+                                [0, 0, 0, -10, -10, 0, 0, 0],
+                                [0, 0, 0, -10, -10, 0, 0, 0],
+                                [0, 0, 0, -10, -10, 0, 0, 0],
+                                [0, 0, 0, -10, -10, 0, 0, 0],
+                                [0, 0, 0, -20, -20, 0, 0, 0],
+                                [0, 0, 0, -20, -20, 0, 0, 0],
+                                [0, 0, 0, 0, 0, 0, 0, 0]],
+                         "wB": [[-20, -10, -10, -10, -10, -10, -10, -20],
+                                [0, 0, 0, 0, 0, 0, 0, 0],
+                                [0, 0, 0, 0, 0, 0, 0, 0],
+                                [0, 0, 0, 0, 0, 0, 0, 0],
+                                [0, 0, 0, 0, 0, 0, 0, 0],
+                                [0, 0, 0, 0, 0, 0, 0, 0],
+                                [0, 10, 0, 0, 0, 0, 10, 0],
+                                [-20, -10, -10, -10, -10, -10, -10, -20]],
+                         "bB": [[-20, -10, -10, -10, -10, -10, -10, -20],
+                                [0, 10, 0, 0, 0, 0, 10, 0],
+                                [0, 0, 0, 0, 0, 0, 0, 0],
+                                [0, 0, 0, 0, 0, 0, 0, 0],
+                                [0, 0, 0, 0, 0, 0, 0, 0],
+                                [0, 0, 0, 0, 0, 0, 0, 0],
+                                [0, 0, 0, 0, 0, 0, 0, 0],
+                                [-20, -10, -10, -10, -10, -10, -10, -20]],
+                         "wR": [[0, 0, 0, 0, 0, 0, 0, 0],
+                              [0, 0, 0, 0, 0, 0, 0, 0],
+                              [0, 0, 0, 0, 0, 0, 0, 0],
+                              [0, 0, 0, 0, 0, 0, 0, 0],
+                              [0, 0, 0, 0, 0, 0, 0, 0],
+                              [0, 0, 0, 0, 0, 0, 0, 0],
+                              [0, 0, 0, 0, 0, 0, 0, 0],
+                              [0, 0, 0, 20, 20, 20, 0, 0]],
+                         "bR": [[0, 0, 0, 20, 20, 20, 0, 0],
+                              [0, 0, 0, 0, 0, 0, 0, 0],
+                              [0, 0, 0, 0, 0, 0, 0, 0],
+                              [0, 0, 0, 0, 0, 0, 0, 0],
+                              [0, 0, 0, 0, 0, 0, 0, 0],
+                              [0, 0, 0, 0, 0, 0, 0, 0],
+                              [0, 0, 0, 0, 0, 0, 0, 0],
+                              [0, 0, 0, 0, 0, 0, 0, 0]],
+                         "wQ": [[0, 0, 0, 0, 0, 0, 0, 0],
+                              [0, 0, 0, 0, 0, 0, 0, 0],
+                              [0, 0, 0, 0, 0, 0, 0, 0],
+                              [0, 0, 0, 0, 0, 0, 0, 0],
+                              [0, 0, 0, 0, 0, 0, 0, 0],
+                              [0, 0, 0, 0, 0, 0, 0, 0],
+                              [0, 0, 0, 0, 0, 0, 0, 0],
+                              [0, 0, 0, 0, 0, 0, 0, 0]],
+                         "bQ": [[0, 0, 0, 0, 0, 0, 0, 0],
+                              [0, 0, 0, 0, 0, 0, 0, 0],
+                              [0, 0, 0, 0, 0, 0, 0, 0],
+                              [0, 0, 0, 0, 0, 0, 0, 0],
+                              [0, 0, 0, 0, 0, 0, 0, 0],
+                              [0, 0, 0, 0, 0, 0, 0, 0],
+                              [0, 0, 0, 0, 0, 0, 0, 0],
+                              [0, 0, 0, 0, 0, 0, 0, 0]],
+                         "wP": [[900, 900, 900, 900, 900, 900, 900, 900],
+                              [200, 200, 200, 200, 200, 200, 200, 200],
+                              [20, 20, 20, 20, 20, 20, 20, 20],
+                              [0, 0, 0, 0, 0, 0, 0, 0],
+                              [0, 0, 20, 25, 25, 20, 0, 10],
+                              [0, 0, 10, 10, 10, 10, 0, 10],
+                              [10, 10, 10, 0, 0, 10, 10, 10],
+                              [0, 0, 0, 0, 0, 0, 0, 0]],
+                         "bP": [[0, 0, 0, 0, 0, 0, 0, 0],
+                              [10, 10, 10, 0, 0, 10, 10, 10],
+                              [0, 0, 10, 10, 10, 10, 0, 10],
+                              [0, 0, 20, 25, 25, 20, 0, 10],
+                              [0, 0, 0, 0, 0, 0, 0, 0],
+                              [20, 20, 20, 20, 20, 20, 20, 20],
+                              [200, 200, 200, 200, 200, 200, 200, 200],
+                              [900, 900, 900, 900, 900, 900, 900, 900]]
+                         }
+
+# squareScore[piece][sq] is what a piece on square sq (row * 8 + col) adds to the score, negative for black pieces
+squareScore = {piece: [(1 if piece[0] == "w" else -1) * (pieceScore[piece[1]] + piece_optimal_squares[piece][sq // 8][sq % 8])
+                       for sq in range(64)]
+               for piece in piece_optimal_squares}
@@ -1,6 +1,8 @@
 """
 Main driver file. Responsible for handling user input and displaying the current GameState object.
 """
+import queue
+from multiprocessing import Process, Queue
 import pygame as p
 from Chess import ChessEngine, ChessAI
 
@@ -9,6 +11,10 @@ MOVE_LOG_PANEL_WIDTH = 250
 MOVE_LOG_PANEL_HEIGHT = BOARD_HEIGHT
 DIMENSION = 8
 SQ_SIZE = (BOARD_WIDTH) // DIMENSION
+MOVES_PER_ROW = 6  # move log layout
+MOVE_LOG_COLUMN_WIDTH = 35
+MOVE_LOG_ROW_HEIGHT = 20
+MOVE_LOG_ROWS = (MOVE_LOG_PANEL_HEIGHT - 5) // MOVE_LOG_ROW_HEIGHT  # rows that fit in the panel
 MAX_FPS = 15
 IMAGES = {}
 
@@ -29,15 +35,18 @@ def main():
     screen = p.display.set_mode((BOARD_WIDTH + MOVE_LOG_PANEL_WIDTH, BOARD_HEIGHT))
     clock = p.time.Clock()
     screen.fill(p.Color("gray"))
-    moveLogFont = p.font.SysFont("Calibri", 12, True, False)
-    gs = ChessEngine.GameState()
+    gs = ChessEngine.newGameState()
     validMoves = gs.get_valid_moves()
     moveMade = False #flag variable for when a move is made
     load_images()
+    renderer = BoardRenderer(screen)
     running = True
     sqSelected = ()  # no square is selected, keep track of last click
     playerClicks = []  # Keep track of player clicks (Two tuples: [(5,3), (2,6)]
     gameOver = False
+    AIThinking = False  # True while a background process searches for the AI's move
+    moveFinderProcess = None
+    returnQueue = None
 
     # Set player vs computer
     playerOne = True  # If a human is playing white, this will be True, if AI is white, false
@@ -67,9 +76,7 @@ def main():
                         print(move.get_chess_notation())
                         for i in range(len(validMoves)):
                             if move == validMoves[i]:
-                                gs.makeMove(validMoves[i])
-                                gs.addBoardPosition()  # Adds board position to past positions and checks for repeats
-                                gs.currentPosition = gs.generateFENNotation()  # Updates current position
+                                gs.makeMove(validMoves[i])  # also records the position for repetition checks
                                 moveMade = True
                                 animate = True
                                 sqSelected = ()
@@ -77,21 +84,25 @@ def main():
                         if not moveMade:
                             playerClicks = [sqSelected]
 
+            elif e.type == p.MOUSEWHEEL:
+                if p.mouse.get_pos()[0] >= BOARD_WIDTH:  # over the move log
+                    renderer.moveLog.scroll(e.y)
+
                 # Key Handler
             elif e.type == p.KEYDOWN:
                 if e.key == p.K_z:
+                    if AIThinking:  # the position it was searching is gone
+                        cancelAISearch(moveFinderProcess)
+                        AIThinking = False
                     gs.undo_move()
-                    # Remove Current Board position from log
-                    if gs.currentPosition in gs.repPositions:
-                        gs.repPositions.pop()
-                    else:
-                        gs.boardPositions.pop()
-                    gs.currentPosition = gs.generateFENNotation()
                     moveMade = True
                     animate = False
                     gameOver = False
                 if e.key == p.K_r: # reset the board when r is pressed
-                    gs = ChessEngine.GameState()
+                    if AIThinking:
+                        cancelAISearch(moveFinderProcess)
+                        AIThinking = False
+                    gs = ChessEngine.newGameState()
                     validMoves = gs.get_valid_moves()
                     sqSelected = ()
                     playerClicks = []
@@ -100,24 +111,46 @@ def main():
                     gameOver = False
 
 
-        #AI move finder logic
+        #AI move finder logic, the search runs in another process so the window keeps drawing and handling input
         if not gameOver and not humanTurn:
-            AIMove = ChessAI.findBestMove(gs, validMoves)
-            if AIMove is None:
-                AIMove = ChessAI.findRandomMove(validMoves)
-            gs.makeMove(AIMove)
-            moveMade = True
-            animate = True
+            if not AIThinking:
+                AIThinking = True
+                returnQueue = Queue()  # used to pass the result back from the search process
+                # A new process per move, so its transposition table and history tables are lost after every move
+                moveFinderProcess = Process(target=ChessAI.findBestMoveWorker, args=(gs, validMoves, returnQueue))
+                moveFinderProcess.start()
+            else:
+                result = None
+                try:
+                    result = returnQueue.get_nowait()
+                except queue.Empty:
+                    if not moveFinderProcess.is_alive():
+                        # It may have put its answer and exited since get_nowait looked, so look once more
+                        try:
+                            result = returnQueue.get(timeout=0.1)
+                        except queue.Empty:  # search process died without an answer
+                            result = (gs.zobristKey, None)
+                if result is not None:
+                    AIThinking = False
+                    positionKey, moveID = result
+                    if positionKey == gs.zobristKey:  # otherwise the answer is for an old position, search again
+                        AIMove = None
+                        for move in validMoves:
+                            if move.moveID == moveID:
+                                AIMove = move
+                        if AIMove is None:
+                            AIMove = ChessAI.findRandomMove(validMoves)
+                        gs.makeMove(AIMove)
+                        moveMade = True
+                        animate = True
 
         if moveMade:
             if animate:
-                animateMove(gs.moveLog[-1], screen, gs.board, clock)
+                renderer.animateMove(gs.moveLog[-1], gs.board, clock)
             validMoves = gs.get_valid_moves()
             moveMade = False
 
-
-        drawGameState(screen, gs, validMoves, sqSelected, moveLogFont)
-
+        text = None
         if gs.checkmate or gs.stalemate or gs.drawRep:
             gameOver = True
             if gs.checkmate:
@@ -129,21 +162,135 @@ def main():
                 text = "Stalemate"
             else:
                 text = "Draw by Repetition"
-            drawEndGameText(screen, text)
 
+        p.display.update(renderer.draw(gs, validMoves, sqSelected, text))  # only the parts of the screen that changed
         clock.tick(MAX_FPS)
-        p.display.flip()
 
+    if AIThinking:
+        cancelAISearch(moveFinderProcess)
 
 
 """
-Responsible for all graphics with current gamestate
+Stops a background AI search whose result is no longer wanted
 """
-def drawGameState(screen, gs, validMoves, sqSelected, moveLogFont):
-    drawBoard(screen) # draw squares on the board
-    highlightSquares(screen, gs, validMoves, sqSelected)
-    drawPieces(screen, gs.board)  # draw pieces on top of board
-    drawMoveLog(screen, gs, moveLogFont)
+def cancelAISearch(moveFinderProcess):
+    moveFinderProcess.terminate()
+    moveFinderProcess.join()
+
+
+
+"""
+Draws the game onto the screen, redrawing only what changed since the last frame. The squares and their coordinates
+are drawn once onto boardLayer, and drawn holds what each square shows as (piece, highlight), so a frame only redraws
+the squares whose state differs, the move log entries that changed (see MoveLogPanel), and the end game text when it
+changes or something was drawn over it. draw returns the changed rects for p.display.update.
+"""
+class BoardRenderer():
+    def __init__(self, screen):
+        self.screen = screen
+        self.boardLayer = p.Surface((BOARD_WIDTH, BOARD_HEIGHT))
+        drawBoard(self.boardLayer)
+        self.highlights = {}
+        for highlight, color in (("selected", "blue"), ("target", "yellow")):
+            s = p.Surface((SQ_SIZE, SQ_SIZE))
+            s.set_alpha(50)  # Transparency value -> 0 transparent; 255 opaque
+            s.fill(p.Color(color))
+            self.highlights[highlight] = s
+        self.drawn = [None] * (DIMENSION * DIMENSION)  # None: not drawn yet, or drawn over
+        self.moveLog = MoveLogPanel(p.font.SysFont("Calibri", 12, True, False))
+        self.endGameFont = p.font.SysFont("Helvitica", 32, True, False)
+        self.endGameText = None
+        self.endGameRect = None
+        self.endGameDirty = False
+
+    """
+    Draws the current gamestate, returns the rects that changed
+    """
+    def draw(self, gs, validMoves, sqSelected, endGameText=None):
+        squares = [(piece, None) for row in gs.board for piece in row]
+        highlightSquares(squares, gs, validMoves, sqSelected)
+        if endGameText != self.endGameText:
+            if self.endGameRect is not None:  # the old text goes, so the squares under it are drawn again
+                self.invalidate(self.endGameRect)
+            self.endGameText = endGameText
+            self.endGameRect = None
+            self.endGameDirty = endGameText is not None
+        rects = self.drawSquares(squares)
+        rects += self.moveLog.draw(self.screen, gs.moveLog)
+        if self.endGameDirty:
+            self.endGameRect = drawEndGameText(self.screen, self.endGameText, self.endGameFont)
+            rects.append(self.endGameRect)
+            self.endGameDirty = False
+        return rects
+
+    """
+    Redraws every square whose (piece, highlight) differs from what it shows, returns their rects
+    """
+    def drawSquares(self, squares):
+        rects = []
+        for sq, state in enumerate(squares):
+            if state != self.drawn[sq]:
+                r, c = divmod(sq, DIMENSION)
+                rect = p.Rect(c*SQ_SIZE, r*SQ_SIZE, SQ_SIZE, SQ_SIZE)
+                self.screen.blit(self.boardLayer, rect, rect)  # the square and any coordinate on it
+                piece, highlight = state
+                if highlight is not None:
+                    self.screen.blit(self.highlights[highlight], rect)
+                if piece != "--":
+                    self.screen.blit(IMAGES[piece], rect)
+                self.drawn[sq] = state
+                rects.append(rect)
+                if self.endGameRect is not None and rect.colliderect(self.endGameRect):
+                    self.endGameDirty = True
+        return rects
+
+    """
+    Marks the squares under rect as drawn over, so the next draw redraws them
+    """
+    def invalidate(self, rect):
+        for sq in range(DIMENSION * DIMENSION):
+            r, c = divmod(sq, DIMENSION)
+            if rect.colliderect(p.Rect(c*SQ_SIZE, r*SQ_SIZE, SQ_SIZE, SQ_SIZE)):
+                self.drawn[sq] = None
+
+    """
+    Animates the move that is made. The board is brought up to date once, with the captured piece still on its square,
+    and copied; each frame then only puts back the copy where the piece was and draws it where it is now.
+    """
+    def animateMove(self, move, board, clock):
+        squares = [(piece, None) for row in board for piece in row]
+        endSq = move.endRow*DIMENSION + move.endCol
+        squares[endSq] = ("--", None)  # Erase piece moved from its ending square
+        # Draw captured piece onto square
+        if move.pieceCaptured != "--":
+            if move.isEnPassantMove:
+                enPassantRow = (move.endRow + 1) if move.pieceMoved[0] == "w" else (move.endRow - 1)
+                squares[enPassantRow*DIMENSION + move.endCol] = (move.pieceCaptured, None)
+            else:
+                squares[endSq] = (move.pieceCaptured, None)
+        p.display.update(self.drawSquares(squares))
+        background = self.screen.subsurface(p.Rect(0, 0, BOARD_WIDTH, BOARD_HEIGHT)).copy()
+        self.endGameDirty = self.endGameText is not None  # the piece may pass over it
+        dR = move.endRow - move.startRow
+        dC = move.endCol - move.startCol
+        framesPerSquare = 2  # frames to move one square
+        frameCount = (abs(dR) + abs(dC)) * framesPerSquare
+        previous = None
+        for frame in range(frameCount+1):
+            r, c = ((move.startRow + dR*frame/frameCount, move.startCol + dC * frame/frameCount))
+            rect = p.Rect(c*SQ_SIZE, r*SQ_SIZE, SQ_SIZE, SQ_SIZE)
+            rects = [rect]
+            if previous is not None:
+                self.screen.blit(background, previous, previous)
+                rects.append(previous)
+            # draw moving piece
+            if move.pieceMoved != "--":
+                self.screen.blit(IMAGES[move.pieceMoved], rect)
+            p.display.update(rects)
+            previous = rect
+            clock.tick(60)
+        self.drawn[endSq] = None  # the moving piece was left drawn on it
+
 
 """
 Draw squares on board (Top left is light)
@@ -168,95 +315,96 @@ def drawBoard(screen):
 
 
 """
-Highlight square selected and moves for piece selected
+Highlight square selected and moves for piece selected, in the (piece, highlight) list of the squares
 """
-def highlightSquares(screen, gs, validMoves, sqSelected):
+def highlightSquares(squares, gs, validMoves, sqSelected):
     if sqSelected != ():
         r, c = sqSelected
         if gs.board[r][c][0] == ("w" if gs.whiteToMove else "b"):  # square selected is a piece that can be moved
             # highlight selected square
-            s = p.Surface((SQ_SIZE, SQ_SIZE))
-            s.set_alpha(50)  # Transparency value -> 0 transparent; 255 opaque
-            s.fill(p.Color("blue"))
-            screen.blit(s, (c*SQ_SIZE, r*SQ_SIZE))
+            squares[r*DIMENSION + c] = (gs.board[r][c], "selected")
             # highlight moves from that square
-            s.fill(p.Color("yellow"))
             for move in validMoves:
                 if move.startRow == r and move.startCol == c:
-                    screen.blit(s, (SQ_SIZE*move.endCol, SQ_SIZE*move.endRow))
-
+                    sq = move.endRow*DIMENSION + move.endCol
+                    squares[sq] = (squares[sq][0], "target")
 
 
 """
-Draw pieces using current gamestate
+Move log panel. Each move's text is rendered once and kept in entries, which follow gs.moveLog from its end: new moves
+are appended and moves that were taken back (or belong to an old game) are dropped, so a frame never looks at the
+whole log. Moves run MOVES_PER_ROW to a row and the panel shows the rows that fit, the newest ones unless scrolled up.
+draw only blits visible entries, and only the ones that changed while the rows shown stay the same.
 """
-def drawPieces(screen, board):
-    for r in range(DIMENSION):
-        for c in range(DIMENSION):
-            piece = board[r][c]
-            if piece != "--":
-                screen.blit(IMAGES[piece], p.Rect(c*SQ_SIZE, r*SQ_SIZE, SQ_SIZE, SQ_SIZE))
+class MoveLogPanel():
+    def __init__(self, font):
+        self.rect = p.Rect(BOARD_WIDTH, 0, MOVE_LOG_PANEL_WIDTH, MOVE_LOG_PANEL_HEIGHT)
+        self.font = font
+        self.entries = []  # (move, rendered text) for each move of the log
+        self.scrollRows = 0  # rows scrolled up from the newest
+        self.rows = 0
+        self.topRow = None  # first row on screen, None until drawn
+        self.shownEntries = 0  # entries there were when last drawn
 
-"""
-Draws and updates move log
-"""
-def drawMoveLog(screen, gs, font):
-    moveLogRect = p.Rect(BOARD_WIDTH, 0, MOVE_LOG_PANEL_WIDTH, MOVE_LOG_PANEL_HEIGHT)
-    p.draw.rect(screen, p.Color("gray"), moveLogRect)
-    moveLog = gs.moveLog
-    moveTexts = moveLog
-    textWidth = 5
-    textHeight = 5
-    for i in range(len(moveTexts)):
-        text = moveTexts[i].get_chess_notation()
-        textObject = font.render(text, True, p.Color("black"))
-        textLocation = moveLogRect.move(textWidth, textHeight)
-        textWidth = textWidth + 35
-        if textWidth > 200:
-            textWidth = 5
-            textHeight += 20
-        screen.blit(textObject, textLocation)
+    """
+    Scrolls the log up (rows > 0) or down, as far as there are rows
+    """
+    def scroll(self, rows):
+        self.scrollRows = max(0, self.scrollRows + rows)
 
-"""
-Animates the move that is made
-"""
-def animateMove(move, screen, board, clock):
-    colors = [p.Color(238, 238, 210), p.Color(118, 150, 86)]
-    dR = move.endRow - move.startRow
-    dC = move.endCol - move.startCol
-    framesPerSquare = 2  # frames to move one square
-    frameCount = (abs(dR) + abs(dC)) * framesPerSquare
-    for frame in range(frameCount+1):
-        r, c = ((move.startRow + dR*frame/frameCount, move.startCol + dC * frame/frameCount))
-        drawBoard(screen)
-        drawPieces(screen, board)
-        # Erase piece moved from its ending square
-        color = colors[(move.endRow + move.endCol) % 2]
-        endSquare = p.Rect(move.endCol*SQ_SIZE, move.endRow*SQ_SIZE, SQ_SIZE, SQ_SIZE)
-        p.draw.rect(screen, color, endSquare)
-        # Draw captured piece onto square
-        if move.pieceCaptured != "--":
-            if move.isEnPassantMove:
-                enPassantRow = (move.endRow + 1) if move.pieceMoved[0] == "w" else (move.endRow - 1)
-                endSquare = p.Rect(move.endCol * SQ_SIZE, enPassantRow * SQ_SIZE, SQ_SIZE, SQ_SIZE)
-            screen.blit(IMAGES[move.pieceCaptured], endSquare)
-        # draw moving piece
-        if move.pieceMoved != "--":
-            screen.blit(IMAGES[move.pieceMoved], p.Rect(c*SQ_SIZE, r*SQ_SIZE, SQ_SIZE, SQ_SIZE))
-        p.display.flip()
-        clock.tick(60)
+    def entryRect(self, index):
+        row, column = divmod(index, MOVES_PER_ROW)
+        return p.Rect(self.rect.x + 5 + column * MOVE_LOG_COLUMN_WIDTH, self.rect.y + 5 + (row - self.topRow) *
+                      MOVE_LOG_ROW_HEIGHT, MOVE_LOG_COLUMN_WIDTH, MOVE_LOG_ROW_HEIGHT)
+
+    """
+    Brings the panel up to date with moveLog, returns the rects that changed
+    """
+    def draw(self, screen, moveLog):
+        entries = self.entries
+        while entries and (len(entries) > len(moveLog) or entries[-1][0] is not moveLog[len(entries) - 1]):
+            entries.pop()
+        firstChanged = len(entries)
+        for move in moveLog[len(entries):]:
+            entries.append((move, self.font.render(move.get_chess_notation(), True, p.Color("black"))))
+        rows = (len(entries) + MOVES_PER_ROW - 1) // MOVES_PER_ROW
+        if self.scrollRows and rows > self.rows:  # scrolled up, keep showing the same rows as new ones come
+            self.scrollRows += rows - self.rows
+        self.rows = rows
+        lastTopRow = max(0, rows - MOVE_LOG_ROWS)
+        self.scrollRows = min(self.scrollRows, lastTopRow)
+        topRow = lastTopRow - self.scrollRows
+        if topRow != self.topRow:  # different rows on screen, draw them all
+            self.topRow = topRow
+            p.draw.rect(screen, p.Color("gray"), self.rect)
+            firstChanged = topRow * MOVES_PER_ROW
+            rects = [self.rect]
+        elif firstChanged == self.shownEntries == len(entries):
+            return []
+        else:  # same rows, clear and draw the entries from the first one that changed
+            rects = []
+            for index in range(firstChanged, max(self.shownEntries, len(entries))):
+                rect = self.entryRect(index)
+                if self.rect.contains(rect):
+                    p.draw.rect(screen, p.Color("gray"), rect)
+                    rects.append(rect)
+        self.shownEntries = len(entries)
+        lastVisible = min(len(entries), (topRow + MOVE_LOG_ROWS) * MOVES_PER_ROW)
+        for index in range(max(firstChanged, topRow * MOVES_PER_ROW), lastVisible):
+            screen.blit(entries[index][1], self.entryRect(index))
+        return rects
 
 
 """
-Takes in a given endgame text and displays it on the screen
+Takes in a given endgame text and displays it on the screen, returns the rect it covers
 """
-def drawEndGameText(screen, text):
-    font = p.font.SysFont("Helvitica", 32, True, False)
+def drawEndGameText(screen, text, font):
     textObject = font.render(text, 0, p.Color("Gray"))
     textLocation = p.Rect(0, 0, BOARD_WIDTH, BOARD_HEIGHT).move(BOARD_WIDTH / 2 - textObject.get_width() / 2, BOARD_HEIGHT / 2 - textObject.get_height() / 2)
     screen.blit(textObject, textLocation)
     textObject = font.render(text, 0, p.Color("Black"))
     screen.blit(textObject, textLocation.move((2, 2)))
+    return textLocation.union(textLocation.move((2, 2)))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,271 @@
+"""
+Headless engine matches. Plays ChessAI against itself with two different settings, one game per task on a pool of
+worker processes, without pygame and without any animation. Each opening is played twice with the colors swapped.
+Games end on checkmate, stalemate, threefold repetition, the fifty move rule, bare kings (or a lone minor piece) or
+the move cap. One JSON line per game is written as it finishes, followed by the totals, the score of player A with an
+Elo estimate, and games per second:
+    python -m Chess.ChessMatch --a "depth=3" --b "depth=2" --games 200 --workers 4 --output match.jsonl
+A player is a comma separated list of settings: depth, time (seconds per move), nodes, book (0 / 1), quiescence (0 / 1)
+and tt (transposition table MB).
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import random
+import sys
+import time
+from Chess import ChessEngine, ChessAI, ChessTranspositionTable, ChessMoveOrdering, ChessPGN
+
+DEFAULT_SETTINGS = {"depth": 3, "time": None, "nodes": None, "book": 1, "quiescence": 1, "tt": 4}
+MAX_PLIES = 300  # a game still going after this many half moves is scored as a draw
+FIFTY_MOVE_PLIES = 100
+
+players = {}  # Player objects of this worker process by (side "A" / "B", settings text), so their tables outlive a game
+
+
+"""
+Reads a player's settings text ("depth=3,time=0.5") into a dict, filling in DEFAULT_SETTINGS for the rest
+"""
+def parseSettings(text):
+    settings = dict(DEFAULT_SETTINGS)
+    for item in text.split(","):
+        if not item.strip():
+            continue
+        name, _, value = item.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_SETTINGS or not value.strip():
+            raise ValueError("Unknown player setting '%s', expected name=value with one of %s" %
+                             (item, ", ".join(DEFAULT_SETTINGS)))
+        settings[name] = float(value) if name == "time" else int(value)
+    return settings
+
+
+class Player():
+    def __init__(self, text):
+        self.name = text
+        self.settings = parseSettings(text)
+        # Each player searches with its own tables so the two sides never share what they found
+        self.transpositionTable = ChessTranspositionTable.TranspositionTable(self.settings["tt"])
+        self.moveOrderer = ChessMoveOrdering.MoveOrderer()
+
+    def newGame(self):
+        self.transpositionTable.clear()
+
+    """
+    Searches for this player's move with ChessAI, switched over to this player's tables and settings
+    """
+    def chooseMove(self, gs, validMoves):
+        ChessAI.transpositionTable = self.transpositionTable
+        ChessAI.moveOrderer = self.moveOrderer
+        ChessAI.QUIESCENCE = bool(self.settings["quiescence"])
+        ChessAI.PRINT_STATS = False
+        move = ChessAI.findBestMove(gs, validMoves, self.settings["time"], self.settings["depth"],
+                                    self.settings["nodes"], bool(self.settings["book"]))
+        return move if move is not None else ChessAI.findRandomMove(validMoves)
+
+
+"""
+The Player of this process for one side of the match. Keyed by side as well, so with the same settings on both sides
+each still has its own tables.
+"""
+def getPlayer(side, text):
+    if (side, text) not in players:
+        players[(side, text)] = Player(text)
+    return players[(side, text)]
+
+
+"""
+True if neither side has mating material: bare kings, or one knight or bishop against a bare king
+"""
+def insufficientMaterial(gs):
+    if gs.pieceCount > 3:
+        return False
+    pieces = [square[1] for row in gs.board for square in row if square != "--" and square[1] != "K"]
+    return not pieces or pieces[0] in ("N", "B")
+
+
+"""
+Result ("1-0", "0-1", "1/2-1/2") and reason if the game on gs is over, else (None, None). Sets checkmate / stalemate.
+"""
+def gameOver(gs, maxPlies):
+    if not gs.hasLegalMove():
+        if gs.checkmate:
+            return ("0-1" if gs.whiteToMove else "1-0"), "checkmate"
+        return "1/2-1/2", "stalemate"
+    if gs.drawRep:
+        return "1/2-1/2", "repetition"
+    if gs.halfmoveClock >= FIFTY_MOVE_PLIES:
+        return "1/2-1/2", "fifty moves"
+    if insufficientMaterial(gs):
+        return "1/2-1/2", "insufficient material"
+    if len(gs.moveLog) >= maxPlies:
+        return "1/2-1/2", "move cap"
+    return None, None
+
+
+"""
+Worker task: plays one game and returns its result dict (the JSON line)
+"""
+def playGame(task):
+    index, whiteText, blackText, whiteSide, openingFEN, openingMoves, maxPlies, seed, backend, withPGN = task
+    random.seed(seed)
+    white = getPlayer(whiteSide, whiteText)
+    black = getPlayer("B" if whiteSide == "A" else "A", blackText)
+    white.newGame()
+    black.newGame()
+    gs = ChessEngine.newGameState(backend)
+    if openingFEN:
+        gs.loadFEN(openingFEN)
+    start = time.perf_counter()
+    for text in openingMoves:
+        gs.makeMove(ChessPGN.moveFromText(gs, text))
+    openingPlies = len(gs.moveLog)
+    result, reason = gameOver(gs, maxPlies)
+    while result is None:
+        player = white if gs.whiteToMove else black
+        gs.makeMove(player.chooseMove(gs, gs.get_valid_moves()))
+        result, reason = gameOver(gs, maxPlies)
+    record = {"game": index, "white": whiteText, "black": blackText, "result": result, "reason": reason,
+              "plies": len(gs.moveLog) - openingPlies, "seconds": round(time.perf_counter() - start, 3)}
+    if openingFEN:
+        record["fen"] = openingFEN
+    if withPGN:
+        record["pgn"] = ChessPGN.gamePGN(gs, {"Event": "ChessMatch", "Round": str(index + 1), "White": whiteText,
+                                              "Black": blackText}, result)
+    return record
+
+
+"""
+Opening moves for game pair `pair`: the given openings in turn, or `randomPlies` random moves from the start position
+"""
+def openingFor(pair, openings, randomPlies, seed):
+    if openings:
+        return openings[pair % len(openings)]
+    rng = random.Random(seed * 7919 + pair)
+    gs = ChessEngine.newGameState("board")
+    moves = []
+    for ply in range(randomPlies):
+        validMoves = gs.get_valid_moves()
+        if not validMoves:
+            break
+        move = rng.choice(validMoves)
+        moves.append(move.get_chess_notation())
+        gs.makeMove(move)
+    return None, moves
+
+
+"""
+Reads openings from a file: FEN / EPD lines, or move lists (one per line, SAN or coordinates)
+"""
+def readOpenings(path):
+    openings = []
+    with open(path) as openingFile:
+        for line in openingFile:
+            line = line.split("#")[0].strip()
+            if not line:
+                continue
+            if "/" in line.split()[0]:
+                fields = ChessEngine.parseEPD(line)[0] if len(line.split()) > 6 else line.split()[:4]
+                openings.append((" ".join(fields[:4]), []))
+            else:
+                openings.append((None, line.split()))
+    return openings
+
+
+"""
+Elo difference for a score fraction, with the 95% margin from the spread of the game scores. None when it is 0 or 1.
+"""
+def eloEstimate(wins, draws, losses):
+    games = wins + draws + losses
+    if games == 0:
+        return None, None
+    score = (wins + draws / 2) / games
+    if score <= 0 or score >= 1:
+        return None, None
+    elo = -400 * math.log10(1 / score - 1)
+    deviation = math.sqrt((wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / games)
+    margin = 1.96 * deviation / math.sqrt(games)
+    high = min(score + margin, 0.9999)
+    low = max(score - margin, 0.0001)
+    return elo, (-400 * math.log10(1 / high - 1) - -400 * math.log10(1 / low - 1)) / 2
+
+
+"""
+Plays the match and writes one JSON line per game to output. Returns the totals dict for player A.
+"""
+def runMatch(playerA, playerB, games, workers, output, openings=None, randomPlies=4, maxPlies=MAX_PLIES, seed=1,
+             backend=None, withPGN=False):
+    parseSettings(playerA)  # fail here rather than in every worker
+    parseSettings(playerB)
+    tasks = []
+    for index in range(games):
+        pair = index // 2
+        openingFEN, openingMoves = openingFor(pair, openings, randomPlies, seed)
+        white, black, whiteSide = (playerA, playerB, "A") if index % 2 == 0 else (playerB, playerA, "B")
+        tasks.append((index, white, black, whiteSide, openingFEN, openingMoves, maxPlies, seed * 100003 + index, backend,
+                      withPGN))
+    totals = {"games": 0, "wins": 0, "draws": 0, "losses": 0, "reasons": {}}
+    start = time.perf_counter()
+    pool = multiprocessing.Pool(workers) if workers > 1 else None
+    try:
+        results = pool.imap_unordered(playGame, tasks) if pool is not None else map(playGame, tasks)
+        for record in results:
+            output.write(json.dumps(record) + "\n")
+            output.flush()
+            totals["games"] += 1
+            totals["reasons"][record["reason"]] = totals["reasons"].get(record["reason"], 0) + 1
+            if record["result"] == "1/2-1/2":
+                totals["draws"] += 1
+            elif (record["result"] == "1-0") == (record["game"] % 2 == 0):  # A has white in the even games
+                totals["wins"] += 1
+            else:
+                totals["losses"] += 1
+    finally:
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+    totals["seconds"] = round(time.perf_counter() - start, 2)
+    return totals
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Play ChessAI against itself with two settings, games in parallel")
+    parser.add_argument("--a", default="depth=3", help="settings of player A, e.g. \"depth=3,time=0.5\"")
+    parser.add_argument("--b", default="depth=2", help="settings of player B")
+    parser.add_argument("--games", type=int, default=100, help="games to play, each opening twice with colors swapped")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--openings", help="file of FEN / EPD lines or move lists to start the games from")
+    parser.add_argument("--random-plies", type=int, default=4,
+                        help="without --openings, start each pair of games after this many random moves")
+    parser.add_argument("--max-plies", type=int, default=MAX_PLIES, help="draw a game still going after this many")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--backend", choices=("board", "bitboard"), default=None)
+    parser.add_argument("--pgn", action="store_true", help="add each game's PGN to its JSON line")
+    parser.add_argument("--output", help="file to write the JSON lines to, stdout by default")
+    args = parser.parse_args(argv)
+    openings = readOpenings(args.openings) if args.openings else None
+    output = open(args.output, "w") if args.output else sys.stdout
+    try:
+        totals = runMatch(args.a, args.b, args.games, max(1, args.workers), output, openings, args.random_plies,
+                          args.max_plies, args.seed, args.backend, args.pgn)
+    finally:
+        if args.output:
+            output.close()
+    elo, margin = eloEstimate(totals["wins"], totals["draws"], totals["losses"])
+    games = totals["games"]
+    summary = "A (%s) vs B (%s): +%d =%d -%d, %.1f%% for A" % (
+        args.a, args.b, totals["wins"], totals["draws"], totals["losses"],
+        100 * (totals["wins"] + totals["draws"] / 2) / games if games else 0)
+    if elo is not None:
+        summary += ", Elo %+.0f +/- %.0f" % (elo, margin)
+    print(summary, file=sys.stderr)
+    print("ends: " + ", ".join("%s %d" % item for item in sorted(totals["reasons"].items())), file=sys.stderr)
+    print("%d games in %.2fs, %.2f games/s over %d workers" % (
+        games, totals["seconds"], games / totals["seconds"] if totals["seconds"] else 0, max(1, args.workers)),
+        file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
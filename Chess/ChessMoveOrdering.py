@@ -0,0 +1,159 @@
+"""
+Move ordering for the alpha beta search. Alpha beta prunes the most when the best move is searched first, so moves are
+sorted by how likely they are to cause a cutoff:
+hash / principal variation move, then captures and promotions by MVV-LVA (most valuable victim, least valuable
+attacker), then the killer moves of the ply, then the remaining quiet moves by their history score.
+ChessAI keeps one MoveOrderer in ChessAI.moveOrderer; any object with the same methods can be swapped in.
+"""
+
+MAX_PLY = 128
+
+# Piece ranks for MVV-LVA, the king is the least welcome attacker since it can only take undefended pieces safely
+ATTACKER_RANK = {"P": 1, "N": 2, "B": 3, "R": 4, "Q": 5, "K": 6}
+VICTIM_RANK = {"P": 1, "N": 2, "B": 3, "R": 4, "Q": 5, "K": 6}
+# Rough piece values for telling losing captures apart, a king capture is always safe since it has to be legal
+TRADE_VALUE = {"P": 1, "N": 3, "B": 3, "R": 5, "Q": 9, "K": 0}
+
+FIRST_MOVE_SCORE = 1000000
+CAPTURE_SCORE = 100000
+KILLER_SCORES = (90000, 80000)
+HISTORY_MAX = 79999  # quiet moves never outrank a killer
+
+
+class MoveOrderer():
+    def __init__(self, useMVVLVA=True, useKillers=True, useHistory=True):
+        self.useMVVLVA = useMVVLVA
+        self.useKillers = useKillers
+        self.useHistory = useHistory
+        self.killers = [[None, None] for ply in range(MAX_PLY)]
+        self.history = [0] * (2 * 64 * 64)  # indexed by color, from square, to square
+        self.cutoffs = 0
+        self.firstMoveCutoffs = 0
+
+    """
+    Clears the killers and ages the history for a new search. History is halved rather than cleared so what was learned
+    on the last move still helps.
+    """
+    def newSearch(self):
+        self.killers = [[None, None] for ply in range(MAX_PLY)]
+        self.history = [value // 2 for value in self.history]
+        self.cutoffs = 0
+        self.firstMoveCutoffs = 0
+
+    def historyIndex(self, move):
+        # moveID is from square * 64 + to square
+        return move.moveID if move.pieceMoved[0] == "w" else 4096 + move.moveID
+
+    def isQuiet(self, move):
+        return move.pieceCaptured == "--" and not move.isEnPassantMove and not move.isPawnPromotion
+
+    """
+    A capture of a less valuable piece, which loses material if the capturing piece is taken back
+    """
+    def isLosingCapture(self, move):
+        if move.isPawnPromotion or move.isEnPassantMove:
+            return False
+        return TRADE_VALUE[move.pieceCaptured[1]] < TRADE_VALUE[move.pieceMoved[1]]
+
+    def scoreMove(self, move, ply, firstMoveID):
+        if move.moveID == firstMoveID:
+            return FIRST_MOVE_SCORE
+        if not self.isQuiet(move):
+            if not self.useMVVLVA:
+                return CAPTURE_SCORE
+            victim = "P" if move.isEnPassantMove else move.pieceCaptured[1]
+            score = CAPTURE_SCORE + 10 * VICTIM_RANK.get(victim, 0) - ATTACKER_RANK[move.pieceMoved[1]]
+            if move.isPawnPromotion:
+                score += 10 * VICTIM_RANK["Q"]
+            return score
+        if self.useKillers:
+            killers = self.killers[ply]
+            if move.moveID == killers[0]:
+                return KILLER_SCORES[0]
+            if move.moveID == killers[1]:
+                return KILLER_SCORES[1]
+        if self.useHistory:
+            return min(self.history[self.historyIndex(move)], HISTORY_MAX)
+        return 0
+
+    """
+    Sorts moves in place, best candidates first. firstMoveID (hash or PV move) is always put in front.
+    """
+    def orderMoves(self, moves, ply, firstMoveID=None):
+        moves.sort(key=lambda move: self.scoreMove(move, ply, firstMoveID), reverse=True)
+
+    """
+    Yields the legal moves of the position one at a time, in stages: firstMoveID (hash or PV move), captures and
+    promotions that win material or trade evenly by MVV-LVA, the killers, the remaining captures, then the quiet moves
+    by history. Quiet moves are only generated once the captures are used up, so a cutoff on an early move skips them.
+    """
+    def stagedMoves(self, gs, ply, firstMoveID=None):
+        stages = gs.generateMovesInStages()
+        captures = next(stages)
+        quiets = None
+        firstMove = None
+        if firstMoveID is not None:
+            for move in captures:
+                if move.moveID == firstMoveID:
+                    firstMove = move
+                    break
+            else:
+                quiets = next(stages)
+                for move in quiets:
+                    if move.moveID == firstMoveID:
+                        firstMove = move
+                        break
+            if firstMove is not None:
+                yield firstMove
+        captures = [move for move in captures if move is not firstMove]
+        losingCaptures = []
+        if self.useMVVLVA:
+            captures.sort(key=lambda move: self.scoreMove(move, ply, None), reverse=True)
+        for move in captures:
+            if self.useMVVLVA and self.isLosingCapture(move):
+                losingCaptures.append(move)
+            else:
+                yield move
+
+        if quiets is None:
+            quiets = next(stages)
+        killerMoves = []
+        if self.useKillers:
+            for killerID in self.killers[ply]:
+                if killerID is None or (firstMove is not None and killerID == firstMove.moveID):
+                    continue
+                for move in quiets:
+                    if move.moveID == killerID:
+                        killerMoves.append(move)
+                        yield move
+                        break
+        for move in losingCaptures:
+            yield move
+        rest = [move for move in quiets if move is not firstMove and move not in killerMoves]
+        if self.useHistory:
+            history = self.history
+            rest.sort(key=lambda move: history[self.historyIndex(move)], reverse=True)
+        for move in rest:
+            yield move
+
+    """
+    Called by the search when the move at position moveIndex of the ordered list caused a beta cutoff
+    """
+    def recordCutoff(self, move, ply, depth, moveIndex):
+        self.cutoffs += 1
+        if moveIndex == 0:
+            self.firstMoveCutoffs += 1
+        if self.isQuiet(move):
+            if self.useKillers:
+                killers = self.killers[ply]
+                if killers[0] != move.moveID:
+                    killers[1] = killers[0]
+                    killers[0] = move.moveID
+            if self.useHistory:
+                self.history[self.historyIndex(move)] += depth * depth
+
+    """
+    Percentage of beta cutoffs produced by the first move searched, the closer to 100 the better the ordering
+    """
+    def firstMoveCutoffRate(self):
+        return 100 * self.firstMoveCutoffs / self.cutoffs if self.cutoffs else 0.0
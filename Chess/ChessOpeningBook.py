@@ -0,0 +1,128 @@
+"""
+Opening book. The book file is a header followed by fixed size records (position Zobrist key, moveID, weight), sorted
+by key. OpeningBook maps the file with mmap and binary searches it, so only the pages a probe touches are read and the
+file is never loaded into memory as a whole. Keys are GameState.zobristKey, which is the same on every run.
+Build a book from move lists (one game per line, coordinate "e2e4" or SAN "e4" moves) or a PGN file with:
+    python -m Chess.ChessOpeningBook Chess/books/openings.txt Chess/books/openings.bin --plies 16
+"""
+import argparse
+import mmap
+import random
+import re
+import struct
+import sys
+from Chess import ChessEngine, ChessPGN
+from Chess.ChessPGN import moveFromText
+
+MAGIC = b"CHESSBK1"
+RECORD = struct.Struct(">QHH")  # key, moveID, weight
+MAX_WEIGHT = 0xFFFF
+
+"""
+Splits PGN or plain move list text into games, each a list of move strings. Tag pairs, comments, variations, move numbers
+and results are dropped. In PGN a game ends at its result, in a plain list every line is a game.
+"""
+def readGames(text):
+    games = []
+    if re.search(r"^\s*(\[|\d+\.)", text, re.MULTILINE):
+        games = [game.moves for game in ChessPGN.readPGN(text.splitlines()) if game.moves]
+    else:
+        for line in text.splitlines():
+            line = line.split("#")[0]
+            if line.strip():
+                games.append(line.split())
+    return games
+
+
+"""
+Plays through the games and writes the book: one record per (position, move) seen in the first `plies` half moves,
+weighted by how many games played it. Returns the number of records written.
+"""
+def buildBook(games, path, plies=16, backend="board"):
+    counts = {}
+    for game in games:
+        gs = ChessEngine.newGameState(backend)
+        for text in game[:plies]:
+            move = moveFromText(gs, text)
+            entry = (gs.zobristKey, move.moveID)
+            counts[entry] = counts.get(entry, 0) + 1
+            gs.makeMove(move)
+    with open(path, "wb") as bookFile:
+        bookFile.write(MAGIC)
+        for key, moveID in sorted(counts):
+            bookFile.write(RECORD.pack(key, moveID, min(counts[(key, moveID)], MAX_WEIGHT)))
+    return len(counts)
+
+
+class OpeningBook():
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # an empty file can't be mapped
+            self.file.close()
+            raise ValueError("Not an opening book: " + path)
+        if self.data[:len(MAGIC)] != MAGIC or (len(self.data) - len(MAGIC)) % RECORD.size:
+            self.close()
+            raise ValueError("Not an opening book: " + path)
+        self.size = (len(self.data) - len(MAGIC)) // RECORD.size
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+    def keyAt(self, index):
+        return struct.unpack_from(">Q", self.data, len(MAGIC) + index * RECORD.size)[0]
+
+    """
+    Returns [(moveID, weight), ...] for the position with this key, empty if it is not in the book
+    """
+    def probe(self, key):
+        low, high = 0, self.size
+        while low < high:  # first record with a key >= key
+            middle = (low + high) // 2
+            if self.keyAt(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        entries = []
+        while low < self.size:
+            recordKey, moveID, weight = RECORD.unpack_from(self.data, len(MAGIC) + low * RECORD.size)
+            if recordKey != key:
+                break
+            entries.append((moveID, weight))
+            low += 1
+        return entries
+
+    """
+    Picks a book move for the position, at random in proportion to the weights. Returns the matching Move from
+    validMoves, or None if the position is out of book.
+    """
+    def chooseMove(self, gs, validMoves, rng=random):
+        movesByID = {move.moveID: move for move in validMoves}
+        entries = [(moveID, weight) for moveID, weight in self.probe(gs.zobristKey) if moveID in movesByID]
+        if not entries:
+            return None
+        pick = rng.uniform(0, sum(weight for moveID, weight in entries))
+        for moveID, weight in entries:
+            pick -= weight
+            if pick <= 0:
+                break
+        return movesByID[moveID]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile games into an opening book file")
+    parser.add_argument("games", help="PGN file or text file with one game of moves per line")
+    parser.add_argument("book", help="book file to write")
+    parser.add_argument("--plies", type=int, default=16, help="half moves of each game to put in the book")
+    args = parser.parse_args(argv)
+    with open(args.games) as gamesFile:
+        games = readGames(gamesFile.read())
+    records = buildBook(games, args.book, args.plies)
+    print(len(games), "games,", records, "book entries written to", args.book)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,354 @@
+"""
+PGN reading and writing. readPGN goes through a PGN file a line at a time and yields one game at a time, so archives of
+any size are read in constant memory. replayGame plays a game's SAN moves through a GameState with get_valid_moves and
+makeMove, and moveToSAN / gamePGN write games back out. The engine only promotes to a queen, so games with an
+under-promotion can't be replayed.
+Replay a whole archive and report games per second (optionally writing the replayed games back out) with:
+    python -m Chess.ChessPGN games.pgn --output replayed.pgn
+"""
+import argparse
+import re
+import sys
+import time
+from Chess import ChessEngine
+
+coordinateMove = re.compile(r"^([a-h][1-8])([a-h][1-8])q?$")
+sanMove = re.compile(r"^([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(=?[QNRB])?$")
+tagPair = re.compile(r'\[\s*(\w+)\s+"((?:[^"\\]|\\.)*)"\s*\]')
+movetextToken = re.compile(r'[{}();]|\$\d+|\d+\.+|1-0|0-1|1/2-1/2|\*|[^\s{}();$]+')
+moveNumber = re.compile(r"^\d+\.+$")
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+# The Seven Tag Roster, written first and in this order
+ROSTER = ("Event", "Site", "Date", "Round", "White", "Black", "Result")
+ROSTER_DEFAULTS = {"Event": "?", "Site": "?", "Date": "????.??.??", "Round": "?", "White": "?", "Black": "?"}
+LINE_LENGTH = 79
+START_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+
+class PGNGame():
+    def __init__(self):
+        self.tags = {}
+        self.moves = []  # SAN move texts of the main line, comments, variations, NAGs and move numbers dropped
+        self.result = "*"
+
+
+"""
+Finds the legal move written as text (coordinate notation or SAN) in the current position. Raises ValueError if there is
+no such move, or if it is an under-promotion the engine can't play. Without validMoves a SAN move is found with
+sanCandidates, which is much quicker than generating every legal move.
+"""
+def moveFromText(gs, text, validMoves=None):
+    token = text.strip().rstrip("+#!?")
+    match = coordinateMove.match(token)
+    if match:
+        for move in gs.get_valid_moves() if validMoves is None else validMoves:
+            if move.get_chess_notation() == match.group(1) + match.group(2):
+                return move
+        raise ValueError("Illegal move " + text)
+    if token in ("O-O", "0-0", "O-O-O", "0-0-0"):
+        kingside = len(token) == 3
+        for move in gs.get_valid_moves() if validMoves is None else validMoves:
+            if move.isCastleMove and (move.endCol > move.startCol) == kingside:
+                return move
+        raise ValueError("Illegal castle " + text)
+    match = sanMove.match(token)
+    if not match:
+        raise ValueError("Can't read move " + text)
+    piece, fromFile, fromRank, target, promotion = match.groups()
+    if promotion is not None and promotion[-1] != "Q":
+        raise ValueError("Only queen promotions are supported: " + text)
+    piece = piece or "P"
+    if validMoves is None:
+        candidates = sanCandidates(gs, piece, fromFile, fromRank, target)
+    else:
+        candidates = [move for move in validMoves
+                      if move.pieceMoved[1] == piece and move.get_rank_file(move.endRow, move.endCol) == target and
+                      (fromFile is None or move.colsToFiles[move.startCol] == fromFile) and
+                      (fromRank is None or move.rowsToRanks[move.startRow] == fromRank)]
+    if len(candidates) != 1:
+        raise ValueError(("Ambiguous move " if candidates else "Illegal move ") + text)
+    return candidates[0]
+
+
+"""
+The legal moves of a piece type ("P", "N", ...) of the side to move to the target square ("e4"), narrowed down by the
+SAN origin file / rank (None if not given). Only the squares the piece could come from are looked at, and a candidate
+is legal if the mover's king is not attacked once it is made. Castling is not covered.
+"""
+def sanCandidates(gs, piece, fromFile, fromRank, target):
+    Move = ChessEngine.Move
+    board = gs.board
+    color = "w" if gs.whiteToMove else "b"
+    ownPiece = color + piece
+    targetRow, targetCol = Move.ranksToRows[target[1]], Move.filesToCols[target[0]]
+    targetSq = targetRow * 8 + targetCol
+    targetPiece = board[targetRow][targetCol]
+    if targetPiece[0] == color:
+        return []
+    origins = []  # (square, en passant)
+    if piece == "P":
+        back = 1 if color == "w" else -1  # row step from the target back to the pawn
+        if fromFile is not None and Move.filesToCols[fromFile] != targetCol:
+            fromCol = Move.filesToCols[fromFile]
+            if abs(fromCol - targetCol) == 1 and in_board(targetRow + back) and \
+                    board[targetRow + back][fromCol] == ownPiece:
+                if targetPiece != "--":
+                    origins.append(((targetRow + back) * 8 + fromCol, False))
+                elif gs.enPassantPossible == (targetRow, targetCol):
+                    origins.append(((targetRow + back) * 8 + fromCol, True))
+        elif targetPiece == "--" and in_board(targetRow + back):
+            if board[targetRow + back][targetCol] == ownPiece:
+                origins.append(((targetRow + back) * 8 + targetCol, False))
+            elif board[targetRow + back][targetCol] == "--" and targetRow == (4 if color == "w" else 3) and \
+                    board[targetRow + 2 * back][targetCol] == ownPiece:
+                origins.append(((targetRow + 2 * back) * 8 + targetCol, False))
+    elif piece == "N" or piece == "K":
+        for sq in (ChessEngine.knightSquares if piece == "N" else ChessEngine.kingSquares)[targetSq]:
+            if board[sq >> 3][sq & 7] == ownPiece:
+                origins.append((sq, False))
+    else:
+        rays = ChessEngine.raySquares[targetSq]
+        for direction in {"R": range(4), "B": range(4, 8), "Q": range(8)}[piece]:
+            for sq in rays[direction]:
+                square = board[sq >> 3][sq & 7]
+                if square != "--":
+                    if square == ownPiece:
+                        origins.append((sq, False))
+                    break
+    candidates = []
+    for sq, enPassant in origins:
+        row, col = ChessEngine.squareCoords[sq]
+        if (fromFile is not None and Move.colsToFiles[col] != fromFile) or \
+                (fromRank is not None and Move.rowsToRanks[row] != fromRank):
+            continue
+        move = Move((row, col), (targetRow, targetCol), board, isEnPassantMove=enPassant)
+        gs.makeMove(move)
+        kingRow, kingCol = gs.whiteKingLocation if color == "w" else gs.blackKingLocation
+        legal = not gs.squareUnderAttack(kingRow, kingCol, color)
+        gs.undo_move()
+        if legal:
+            candidates.append(move)
+    return candidates
+
+
+def in_board(row):
+    return 0 <= row < 8
+
+
+"""
+SAN of a legal move in the current position, with + or # when it gives check or mate. The move is made and taken back
+to find that out, the position is left as it was. validMoves, if given, is only used to see which other pieces could
+go to the same square.
+"""
+def moveToSAN(gs, move, validMoves=None):
+    if move.isCastleMove:
+        san = "O-O" if move.endCol > move.startCol else "O-O-O"
+    else:
+        piece = move.pieceMoved[1]
+        target = move.get_rank_file(move.endRow, move.endCol)
+        capture = "x" if move.pieceCaptured != "--" or move.isEnPassantMove else ""
+        if piece == "P":
+            san = (move.colsToFiles[move.startCol] + capture if capture else "") + target
+            if move.isPawnPromotion:
+                san += "=Q"
+        else:
+            if validMoves is None:
+                validMoves = sanCandidates(gs, piece, None, None, target)
+            rivals = [other for other in validMoves if other.pieceMoved == move.pieceMoved and
+                      other.endRow == move.endRow and other.endCol == move.endCol and other.moveID != move.moveID]
+            origin = ""
+            if rivals:
+                if all(other.startCol != move.startCol for other in rivals):
+                    origin = move.colsToFiles[move.startCol]
+                elif all(other.startRow != move.startRow for other in rivals):
+                    origin = move.rowsToRanks[move.startRow]
+                else:
+                    origin = move.get_rank_file(move.startRow, move.startCol)
+            san = piece + origin + capture + target
+    gs.makeMove(move)
+    if not gs.hasLegalMove() and gs.checkmate:
+        san += "#"
+    elif gs.inCheck:
+        san += "+"
+    gs.undo_move()
+    return san
+
+
+"""
+Yields the games of a PGN file (any iterable of lines) one at a time as PGNGame objects. Only the game being read is
+kept in memory.
+"""
+def readPGN(lines):
+    game = PGNGame()
+    inMovetext = False
+    inComment = False
+    variationDepth = 0
+    for line in lines:
+        if line.startswith("%"):  # escape line
+            continue
+        position = 0
+        if not inComment and variationDepth == 0 and line.lstrip().startswith("["):
+            if inMovetext:  # a game without a result before the next tags
+                yield game
+                game = PGNGame()
+                inMovetext = False
+            for match in tagPair.finditer(line):
+                game.tags[match.group(1)] = match.group(2).replace('\\"', '"').replace("\\\\", "\\")
+            continue
+        while position < len(line):
+            if inComment:
+                end = line.find("}", position)
+                if end < 0:
+                    break
+                inComment = False
+                position = end + 1
+                continue
+            match = movetextToken.search(line, position)
+            if not match:
+                break
+            token = match.group()
+            position = match.end()
+            if token == "{":
+                inComment = True
+            elif token == ";":  # comment to the end of the line
+                break
+            elif token == "(":
+                variationDepth += 1
+            elif token == ")":
+                variationDepth = max(0, variationDepth - 1)
+            elif variationDepth > 0 or token[0] == "$" or moveNumber.match(token) or token == "e.p.":
+                continue
+            elif token in RESULTS:
+                game.result = token
+                yield game
+                game = PGNGame()
+                inMovetext = False
+            else:
+                game.moves.append(token)
+                inMovetext = True
+    if inMovetext or game.tags:
+        yield game
+
+
+"""
+Sets up the game's start position (the FEN tag, if there is one) and plays its moves. Returns the GameState after the
+last move. Raises ValueError naming the move that could not be played.
+"""
+def replayGame(game, backend=None):
+    gs = ChessEngine.newGameState(backend)
+    if "FEN" in game.tags:
+        gs.loadFEN(game.tags["FEN"])
+    for text in game.moves:
+        try:
+            move = moveFromText(gs, text)
+        except ValueError as error:
+            raise ValueError("%s at move %d%s" % (error, gs.fullmoveNumber, "." if gs.whiteToMove else "..."))
+        gs.makeMove(move)
+    return gs
+
+
+"""
+Game result from the final position: the winner on checkmate, a draw on stalemate, "*" otherwise
+"""
+def finalResult(gs):
+    if gs.hasLegalMove():
+        return "*"
+    if gs.checkmate:
+        return "0-1" if gs.whiteToMove else "1-0"
+    return "1/2-1/2"
+
+
+"""
+Writes a PGN game: the tags (Seven Tag Roster first) and the SAN moves with move numbers, wrapped to LINE_LENGTH.
+"""
+def formatPGN(tags, sanMoves, result="*", fullmoveNumber=1, whiteToMove=True):
+    tags = dict(tags)
+    tags["Result"] = result
+    names = list(ROSTER) + [name for name in tags if name not in ROSTER]
+    lines = []
+    for name in names:
+        value = str(tags.get(name, ROSTER_DEFAULTS.get(name)))
+        lines.append('[%s "%s"]' % (name, value.replace("\\", "\\\\").replace('"', '\\"')))
+    lines.append("")
+    tokens = []
+    for san in sanMoves:
+        if whiteToMove:
+            tokens.append("%d." % fullmoveNumber)
+        elif not tokens:
+            tokens.append("%d..." % fullmoveNumber)
+        tokens.append(san)
+        if not whiteToMove:
+            fullmoveNumber += 1
+        whiteToMove = not whiteToMove
+    tokens.append(result)
+    line = ""
+    for token in tokens:
+        if line and len(line) + 1 + len(token) > LINE_LENGTH:
+            lines.append(line)
+            line = token
+        else:
+            line = line + " " + token if line else token
+    lines.append(line)
+    return "\n".join(lines) + "\n"
+
+
+"""
+The PGN of the game played on gs so far. The moves are taken back to find the start position (written as a FEN tag if
+it isn't the standard one) and played again to write their SAN, the GameState ends up where it was.
+"""
+def gamePGN(gs, tags=None, result=None):
+    moves = list(gs.moveLog)
+    while gs.moveLog:
+        gs.undo_move()
+    startFEN = gs.getFEN()
+    fullmoveNumber, whiteToMove = gs.fullmoveNumber, gs.whiteToMove
+    sanMoves = []
+    for move in moves:
+        sanMoves.append(moveToSAN(gs, move))
+        gs.makeMove(move)
+    tags = dict(tags or {})
+    if startFEN != START_FEN:
+        tags["SetUp"] = "1"
+        tags["FEN"] = startFEN
+    return formatPGN(tags, sanMoves, result or finalResult(gs), fullmoveNumber, whiteToMove)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay every game of a PGN file and report games per second")
+    parser.add_argument("pgn", help="PGN file to read")
+    parser.add_argument("--backend", choices=("board", "bitboard"), default=None)
+    parser.add_argument("--limit", type=int, default=None, help="stop after this many games")
+    parser.add_argument("--output", help="write the replayed games to this PGN file")
+    args = parser.parse_args(argv)
+    games = 0
+    plies = 0
+    failed = 0
+    output = open(args.output, "w") if args.output else None
+    start = time.perf_counter()
+    try:
+        with open(args.pgn, encoding="utf-8", errors="replace") as pgnFile:
+            for game in readPGN(pgnFile):
+                if args.limit is not None and games >= args.limit:
+                    break
+                games += 1
+                try:
+                    gs = replayGame(game, args.backend)
+                except ValueError as error:
+                    failed += 1
+                    print("game %d (%s - %s): %s" % (games, game.tags.get("White", "?"), game.tags.get("Black", "?"),
+                                                     error), file=sys.stderr)
+                    continue
+                plies += len(game.moves)
+                if output is not None:
+                    output.write(gamePGN(gs, game.tags, game.result) + "\n")
+    finally:
+        if output is not None:
+            output.close()
+    seconds = time.perf_counter() - start
+    print("%d games (%d failed), %d moves in %.2fs: %.1f games/s, %d moves/s" %
+          (games, failed, plies, seconds, games / seconds if seconds else 0, plies / seconds if seconds else 0))
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,199 @@
+"""
+Parallel root search. The root moves are shared out over a pool of worker processes. Every task carries its own pickled
+copy of the GameState, and the worker scores one root move with ChessAI's alpha beta search, keeping its transposition
+table and move ordering tables between tasks. Iterative deepening runs in the main process: each depth is one round of
+tasks, started in the order of the previous round's scores so the slowest (best) moves go out first.
+Every root move gets a full window search, so at a fixed depth the chosen move scores the same as the serial search.
+Switch it on with ChessAI.SEARCH_WORKERS, or measure the speedup with:
+    python -m Chess.ChessParallel --depth 4 --workers 1 2 4 8
+"""
+import argparse
+import multiprocessing
+import random
+import sys
+import time
+from Chess import ChessEngine, ChessAI, ChessTranspositionTable
+
+pool = None
+poolWorkers = 0
+nodesSearched = 0  # nodes searched by all workers during the last findBestMoveParallel call
+STOP_POLL = 0.05  # seconds between checks of ChessAI.stopSearch while waiting for the workers
+# ChessAI settings sent with every task, a pooled worker would otherwise keep the ones it was started with
+WORKER_SETTINGS = ("QUIESCENCE", "DELTA_MARGIN", "STALEMATE_PROBE_PIECES", "DEBUG_EVAL", "TABLEBASE_PATH")
+
+
+"""
+Returns the shared process pool, creating it (or recreating it with a new size) on first use
+"""
+def getPool(workers):
+    global pool, poolWorkers
+    if pool is None or poolWorkers != workers:
+        closePool()
+        pool = multiprocessing.Pool(workers)
+        poolWorkers = workers
+    return pool
+
+
+def closePool():
+    global pool, poolWorkers
+    if pool is not None:
+        pool.terminate()
+        pool.join()
+    pool = None
+    poolWorkers = 0
+
+
+"""
+The search settings of this process for a task: WORKER_SETTINGS and the transposition table size
+"""
+def searchSettings():
+    return tuple(getattr(ChessAI, name) for name in WORKER_SETTINGS) + (ChessAI.transpositionTable.sizeMB,)
+
+
+"""
+Sets the settings from searchSettings in the worker, keeping its tables unless their size changed
+"""
+def applySettings(settings):
+    for name, value in zip(WORKER_SETTINGS, settings):
+        if name == "TABLEBASE_PATH" and value != ChessAI.TABLEBASE_PATH:
+            ChessAI.tablebases = None  # opened again from the new path on first use
+        setattr(ChessAI, name, value)
+    if ChessAI.transpositionTable.sizeMB != settings[-1]:
+        ChessAI.transpositionTable = ChessTranspositionTable.TranspositionTable(settings[-1])
+
+
+"""
+Worker task: plays one root move on the worker's copy of the game and searches the reply to depth - 1.
+Returns (moveID, score for the side to move at the root, nodes), with a score of None if the budget ran out.
+"""
+def searchRootMove(task):
+    gs, moveID, depth, deadline, nodeLimit, settings = task
+    applySettings(settings)
+    ChessAI.stopSearch = False  # a forked worker starts with the flag of its parent, the main process stops the search
+    for move in gs.get_valid_moves():
+        if move.moveID == moveID:
+            break
+    else:
+        raise ValueError("Root move %d is not legal in the position" % moveID)
+    gs.makeMove(move)
+    if gs.isRepetition(2):
+        return moveID, ChessAI.STALEMATE, 1
+    try:
+        score, nodes = ChessAI.scorePosition(gs, depth - 1, deadline, nodeLimit, 1)
+    except ChessAI.SearchTimeout:
+        return moveID, None, ChessAI.stats.nodes
+    return moveID, -score, nodes
+
+
+"""
+Waits for the next result of a round of tasks, or returns None as soon as ChessAI.stopSearch is set if canStop
+"""
+def nextResult(results, canStop):
+    while not (canStop and ChessAI.stopSearch):
+        try:
+            return results.next(STOP_POLL)
+        except multiprocessing.TimeoutError:
+            pass
+    return None
+
+
+"""
+Same contract as ChessAI.findBestMove, with the root moves of every iteration searched by a pool of worker processes.
+Returns the best move of the last depth all root moves finished. The nodes and depths are added to stats if given.
+ChessAI.stopSearch ends the search like the time limit does, with the tasks still running cancelled by closing the pool.
+"""
+def findBestMoveParallel(gs, validMoves, workers, timeLimit=ChessAI.TIME_LIMIT, maxDepth=ChessAI.MAX_DEPTH,
+                         nodeLimit=None, stats=None):
+    global nodesSearched
+    nodesSearched = 0
+    rootMoves = list(validMoves)
+    if not rootMoves:  # checkmate or stalemate, as the serial search there is no move to return
+        return None
+    workerPool = getPool(workers)
+    deadline = None if timeLimit is None else time.time() + timeLimit
+    settings = searchSettings()
+    random.shuffle(rootMoves)  # so equally good moves are picked at random
+    bestMove = None
+    for depth in range(1, maxDepth + 1):
+        taskDeadline = None
+        taskNodeLimit = None
+        if depth > 1:  # depth 1 always finishes so there is always a move
+            taskDeadline = deadline
+            if nodeLimit is not None:
+                taskNodeLimit = max(1, (nodeLimit - nodesSearched) // len(rootMoves))
+        tasks = [(gs, move.moveID, depth, taskDeadline, taskNodeLimit, settings) for move in rootMoves]
+        scores = {}
+        finished = True
+        results = workerPool.imap_unordered(searchRootMove, tasks)
+        for task in tasks:
+            result = nextResult(results, depth > 1)
+            if result is None:
+                closePool()  # the workers don't see stopSearch, without a deadline they would search on
+                finished = False
+                break
+            moveID, score, nodes = result
+            nodesSearched += nodes
+            if stats is not None:
+                stats.nodes += nodes
+            if score is None:
+                finished = False
+            else:
+                scores[moveID] = score
+        if not finished:
+            break
+        rootMoves.sort(key=lambda move: scores[move.moveID], reverse=True)
+        bestMove = rootMoves[0]
+        if stats is not None:
+            stats.recordIteration(depth, scores[bestMove.moveID], [bestMove.moveID])
+        if len(rootMoves) <= 1 or ChessAI.isMateScore(scores[bestMove.moveID]):
+            break
+        if nodeLimit is not None and nodesSearched >= nodeLimit:
+            break
+    return bestMove
+
+
+"""
+Times the serial search and the parallel search with each worker count at a fixed depth and prints the speedup. The
+score of the parallel move is checked against the serial root score.
+"""
+def benchmark(fen, depth, workerCounts, backend=None):
+    gs = ChessEngine.newGameState(backend)
+    if fen:
+        gs.loadFEN(fen)
+    ChessAI.transpositionTable.clear()
+    start = time.perf_counter()
+    serialMove = ChessAI.findBestMove(gs, gs.get_valid_moves(), timeLimit=None, maxDepth=depth, useBook=False)
+    serialTime = time.perf_counter() - start
+    serialNodes = ChessAI.stats.nodes
+    ChessAI.transpositionTable.clear()
+    serialScore = ChessAI.scorePosition(gs, depth)[0]
+    print("serial     %-6s score %6d %8d nodes %7.2fs" % (serialMove, serialScore, serialNodes, serialTime))
+    for workers in workerCounts:
+        closePool()
+        getPool(workers)  # start the processes before the clock does
+        start = time.perf_counter()
+        move = findBestMoveParallel(gs, gs.get_valid_moves(), workers, timeLimit=None, maxDepth=depth)
+        seconds = time.perf_counter() - start
+        gs.makeMove(move)
+        ChessAI.transpositionTable.clear()
+        score = -ChessAI.scorePosition(gs, depth - 1, ply=1)[0]
+        gs.undo_move()
+        print("%2d workers %-6s score %6d %8d nodes %7.2fs speedup %.2fx%s" %
+              (workers, move, score, nodesSearched, seconds, serialTime / seconds,
+               "" if score == serialScore else "  SCORE DIFFERS"))
+    closePool()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the parallel root search against the serial search")
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--fen", help="position to search, defaults to the starting position")
+    parser.add_argument("--backend", choices=("board", "bitboard"), default=None)
+    args = parser.parse_args(argv)
+    benchmark(args.fen, args.depth, args.workers, args.backend)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""
+Perft (performance test) for the move generator. Counts every leaf of the legal move tree to a fixed depth, checks the
+counts against known values and reports nodes per second, so correctness and speed of get_valid_moves / makeMove /
+undo_move can be tracked over time. Runs without pygame:
+    python -m Chess.ChessPerft --depth 4 --backend bitboard --json perft_results.jsonl
+    python -m Chess.ChessPerft --fen "<fen>" --depth 3 --divide
+    python -m Chess.ChessPerft --terminal --depth 3
+"""
+import argparse
+import json
+import sys
+import time
+from Chess import ChessEngine
+
+# (name, FEN, {depth: node count}). The counts are the published ones except where a position has promotions within the
+# depth: the engine only promotes to a queen, so those counts leave out the under-promotions (checked on both backends).
+STANDARD_POSITIONS = [
+    ("start", "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+     {1: 20, 2: 400, 3: 8902, 4: 197281, 5: 4865609}),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     {1: 48, 2: 2039, 3: 97862}),
+    ("position3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+     {1: 14, 2: 191, 3: 2812, 4: 43238, 5: 674624}),
+    ("position4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+     {1: 6, 2: 228, 3: 8087}),  # queen promotions only
+    ("position5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+     {1: 41, 2: 1373, 3: 54007}),  # queen promotions only
+    ("position6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     {1: 46, 2: 2079, 3: 89890}),
+]
+
+# Positions whose move trees are full of mates and stalemates, for timing GameState.hasLegalMove against get_valid_moves
+TERMINAL_POSITIONS = [
+    ("backrank", "6k1/5ppp/8/8/8/8/5PPP/R2R2K1 w - - 0 1"),
+    ("queen-king", "7k/8/5K2/8/8/8/8/6Q1 w - - 0 1"),
+    ("stalemates", "k7/8/1Q6/8/8/8/8/4K3 w - - 0 1"),
+    ("smothered", "r5rk/6pp/7N/8/8/1Q6/8/6K1 w - - 0 1"),
+    ("scholar", "r1bqkbnr/pppp1ppp/2n5/4p3/2B1P3/5Q2/PPPP1PPP/RNB1K1NR w KQkq - 4 4"),
+    ("fools", "rnbqkbnr/pppp1ppp/8/4p3/6P1/5P2/PPPPP2P/RNBQKBNR b KQkq - 0 2"),
+]
+
+
+"""
+Number of leaf nodes of the legal move tree of the given depth
+"""
+def perft(gs, depth):
+    moves = gs.get_valid_moves()
+    if depth <= 1:
+        return len(moves) if depth == 1 else 1
+    nodes = 0
+    for move in moves:
+        gs.makeMove(move)
+        nodes += perft(gs, depth - 1)
+        gs.undo_move()
+    return nodes
+
+
+"""
+Perft split by root move, returns a dict of move notation to node count. Used to find which move a wrong count is under.
+"""
+def divide(gs, depth):
+    counts = {}
+    for move in gs.get_valid_moves():
+        gs.makeMove(move)
+        counts[move.get_chess_notation()] = perft(gs, depth - 1)
+        gs.undo_move()
+    return counts
+
+
+"""
+Runs perft on one position and returns a result dict (what is written as a JSON line)
+"""
+def runPosition(name, fen, depth, expected=None, backend=None):
+    gs = ChessEngine.newGameState(backend)
+    gs.loadFEN(fen)
+    start = time.perf_counter()
+    nodes = perft(gs, depth)
+    seconds = time.perf_counter() - start
+    return {"position": name, "fen": fen, "depth": depth, "backend": backend or ChessEngine.BACKEND,
+            "nodes": nodes, "expected": expected, "passed": expected is None or nodes == expected,
+            "seconds": round(seconds, 4), "nps": int(nodes / seconds) if seconds > 0 else 0}
+
+
+"""
+Runs every standard position to the given depth (or its deepest known count if that is lower)
+"""
+def runSuite(depth, backend=None, output=None):
+    results = []
+    for name, fen, counts in STANDARD_POSITIONS:
+        d = min(depth, max(counts))
+        result = runPosition(name, fen, d, counts[d], backend)
+        results.append(result)
+        if output is not None:
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+    return results
+
+
+"""
+Walks the move tree to the given depth and, at every node, answers "does the side to move have a move?" both with
+hasLegalMove and with a full get_valid_moves. stats collects the node count, terminal positions found, disagreements
+and the seconds each way took.
+"""
+def terminalWalk(gs, depth, stats):
+    start = time.perf_counter()
+    hasMove = gs.hasLegalMove()
+    probeMate, probeStalemate = gs.checkmate, gs.stalemate
+    middle = time.perf_counter()
+    moves = gs.get_valid_moves()
+    stats["probeSeconds"] += middle - start
+    stats["generateSeconds"] += time.perf_counter() - middle
+    stats["nodes"] += 1
+    if not moves:
+        stats["terminal"] += 1
+    if hasMove != bool(moves) or probeMate != gs.checkmate or probeStalemate != gs.stalemate:
+        stats["mismatches"] += 1
+    if depth > 0:
+        for move in moves:
+            gs.makeMove(move)
+            terminalWalk(gs, depth - 1, stats)
+            gs.undo_move()
+
+
+def runTerminal(name, fen, depth, backend=None):
+    gs = ChessEngine.newGameState(backend)
+    gs.loadFEN(fen)
+    stats = {"position": name, "fen": fen, "depth": depth, "backend": backend or ChessEngine.BACKEND, "nodes": 0,
+             "terminal": 0, "mismatches": 0, "probeSeconds": 0.0, "generateSeconds": 0.0}
+    terminalWalk(gs, depth, stats)
+    stats["passed"] = stats["mismatches"] == 0
+    stats["speedup"] = round(stats["generateSeconds"] / stats["probeSeconds"], 2) if stats["probeSeconds"] else 0
+    stats["probeSeconds"] = round(stats["probeSeconds"], 4)
+    stats["generateSeconds"] = round(stats["generateSeconds"], 4)
+    return stats
+
+
+def printTerminal(result):
+    status = "ok" if result["passed"] else "FAILED (%d mismatches)" % result["mismatches"]
+    print("%-10s depth %d %8d nodes %6d mate/stalemate  hasLegalMove %7.2fs  get_valid_moves %7.2fs  %5.2fx  %s" %
+          (result["position"], result["depth"], result["nodes"], result["terminal"], result["probeSeconds"],
+           result["generateSeconds"], result["speedup"], status))
+
+
+def printResult(result):
+    status = "ok" if result["passed"] else "FAILED (expected " + str(result["expected"]) + ")"
+    print("%-10s depth %d %10d nodes %8.2fs %9d nodes/s  %s" % (result["position"], result["depth"], result["nodes"],
+                                                               result["seconds"], result["nps"], status))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Count move generator leaf nodes and measure nodes per second")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--backend", choices=("board", "bitboard"), default=None,
+                        help="GameState backend, defaults to ChessEngine.BACKEND")
+    parser.add_argument("--fen", help="run one position instead of the standard suite")
+    parser.add_argument("--divide", action="store_true", help="print the count under each root move (with --fen)")
+    parser.add_argument("--json", help="append one JSON result line per position to this file")
+    parser.add_argument("--terminal", action="store_true",
+                        help="time hasLegalMove against get_valid_moves on positions full of mates and stalemates")
+    args = parser.parse_args(argv)
+
+    if args.terminal:
+        positions = [("fen", args.fen)] if args.fen else TERMINAL_POSITIONS
+        results = [runTerminal(name, fen, args.depth, args.backend) for name, fen in positions]
+        if args.json:
+            with open(args.json, "a") as output:
+                for result in results:
+                    output.write(json.dumps(result) + "\n")
+        for result in results:
+            printTerminal(result)
+        return 0 if all(result["passed"] for result in results) else 1
+
+    output = open(args.json, "a") if args.json else None
+    try:
+        if args.fen:
+            if args.divide:
+                gs = ChessEngine.newGameState(args.backend)
+                gs.loadFEN(args.fen)
+                counts = divide(gs, args.depth)
+                for notation in sorted(counts):
+                    print(notation, counts[notation])
+                print("total", sum(counts.values()))
+                return 0
+            results = [runPosition("fen", args.fen, args.depth, backend=args.backend)]
+            if output is not None:
+                output.write(json.dumps(results[0]) + "\n")
+        else:
+            results = runSuite(args.depth, args.backend, output)
+    finally:
+        if output is not None:
+            output.close()
+    for result in results:
+        printResult(result)
+    totalNodes = sum(result["nodes"] for result in results)
+    totalSeconds = sum(result["seconds"] for result in results)
+    print("total %d nodes in %.2fs, %d nodes/s" % (totalNodes, totalSeconds, totalNodes / totalSeconds if totalSeconds else 0))
+    return 0 if all(result["passed"] for result in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
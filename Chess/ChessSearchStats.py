@@ -0,0 +1,220 @@
+"""
+Statistics of one ChessAI.findBestMove call: nodes, leaf evaluations, beta cutoffs and how many came from the first
+move, transposition table use, the nodes and time of every depth, the effective branching factor and nodes per second.
+findBestMove(..., returnStats=True) returns them with the move, ChessAI.stats always holds the last ones, and
+ChessAI.STATS_PATH appends each search to a file as a JSON line.
+Two optional hooks show where the time goes: with ChessAI.TIME_CALLS on, the GameState calls and evaluation functions
+listed below are counted and timed, as self time (see timedCall), and with ChessAI.PROFILE_PATH set every search runs
+under cProfile, the profile of all searches so far being written there after each one (read it with python -m pstats).
+"""
+import contextlib
+import cProfile
+import json
+import time
+from Chess import ChessEngine
+
+GAME_STATE_CALLS = ("get_valid_moves", "makeMove", "undo_move", "hasLegalMove")
+GAME_STATE_GENERATORS = ("generateMovesInStages",)  # timed over each batch it yields, not just the call
+EVALUATION_CALLS = ("scoreBoard", "materialBalance")
+profiler = None  # one cProfile.Profile for all the searches of this process, so PROFILE_PATH adds them up
+
+
+"""
+Coordinate notation ("e2e4") of a packed moveID
+"""
+def moveIDText(moveID):
+    fromSq, toSq = moveID >> 6, moveID & 63
+    return "".join(ChessEngine.Move.colsToFiles[sq % 8] + ChessEngine.Move.rowsToRanks[sq // 8] for sq in (fromSq, toSq))
+
+
+class SearchStats():
+    def __init__(self):
+        self.source = "search"  # where the move came from: "search", "parallel", "book" or "tablebase"
+        self.bestMove = None
+        self.score = None  # for the side to move, of the last depth finished
+        self.depth = 0
+        self.nodes = 0  # quiescence nodes included
+        self.quiescenceNodes = 0
+        self.leafEvaluations = 0
+        self.betaCutoffs = 0
+        self.firstMoveCutoffs = 0
+        self.ttProbes = 0
+        self.ttHits = 0
+        self.ttCutoffs = 0
+        self.iterations = []  # one dict per finished depth: depth, score, nodes and seconds of that depth, pv
+        self.timers = {}  # name: [calls, self seconds] of the calls timed with TIME_CALLS
+        self.startTime = time.perf_counter()
+        self.iterationStart = self.startTime
+        self.iterationNodes = 0  # nodes searched before the current depth
+        self.seconds = 0.0
+
+    """
+    Called when a depth finishes, with its score and principal variation (moveIDs)
+    """
+    def recordIteration(self, depth, score, principalVariation):
+        now = time.perf_counter()
+        self.iterations.append({"depth": depth, "score": score, "nodes": self.nodes - self.iterationNodes,
+                                "seconds": round(now - self.iterationStart, 4),
+                                "pv": [moveIDText(moveID) for moveID in principalVariation]})
+        self.iterationStart = now
+        self.iterationNodes = self.nodes
+        self.depth = depth
+        self.score = score
+
+    """
+    Called when the search is over: takes the cutoff and table counts from the move orderer and transposition table
+    that searched, if the move was searched for
+    """
+    def finish(self, move, transpositionTable=None, moveOrderer=None):
+        self.seconds = time.perf_counter() - self.startTime
+        self.bestMove = None if move is None else move.get_chess_notation()
+        if moveOrderer is not None:
+            self.betaCutoffs = moveOrderer.cutoffs
+            self.firstMoveCutoffs = moveOrderer.firstMoveCutoffs
+        if transpositionTable is not None:
+            self.ttProbes = transpositionTable.probes
+            self.ttHits = transpositionTable.hits
+            self.ttCutoffs = transpositionTable.cutoffs
+
+    """
+    Percentage of beta cutoffs produced by the first move searched
+    """
+    def firstMoveCutoffRate(self):
+        return 100 * self.firstMoveCutoffs / self.betaCutoffs if self.betaCutoffs else 0.0
+
+    """
+    How many times more nodes each depth took than the one before, averaged (geometric mean) from depth 2 on. None with
+    fewer than two depths to compare.
+    """
+    def branchingFactor(self):
+        counted = [iteration for iteration in self.iterations[1:] if iteration["nodes"]]
+        if not counted or not self.iterations[0]["nodes"]:
+            return None
+        first, last = self.iterations[0], counted[-1]
+        return (last["nodes"] / first["nodes"]) ** (1 / (last["depth"] - first["depth"]))
+
+    def nodesPerSecond(self):
+        return self.nodes / self.seconds if self.seconds else 0.0
+
+    def timer(self, name):
+        return self.timers.setdefault(name, [0, 0.0])
+
+    def asDict(self):
+        branchingFactor = self.branchingFactor()
+        return {"source": self.source, "bestmove": self.bestMove, "score": self.score, "depth": self.depth,
+                "nodes": self.nodes, "quiescenceNodes": self.quiescenceNodes, "leafEvaluations": self.leafEvaluations,
+                "betaCutoffs": self.betaCutoffs, "firstMoveCutoffRate": round(self.firstMoveCutoffRate(), 2),
+                "ttProbes": self.ttProbes, "ttHits": self.ttHits, "ttCutoffs": self.ttCutoffs,
+                "branchingFactor": None if branchingFactor is None else round(branchingFactor, 3),
+                "seconds": round(self.seconds, 4), "nodesPerSecond": round(self.nodesPerSecond()),
+                "iterations": self.iterations,
+                "timers": {name: {"calls": calls, "seconds": round(seconds, 4)}
+                           for name, (calls, seconds) in self.timers.items()}}
+
+    def toJSON(self):
+        return json.dumps(self.asDict())
+
+    """
+    Appends the stats to a file as one JSON line
+    """
+    def writeJSON(self, path):
+        with open(path, "a") as statsFile:
+            statsFile.write(self.toJSON() + "\n")
+
+    """
+    One line for the console, what findBestMove prints after a search
+    """
+    def summary(self):
+        if self.source in ("book", "tablebase"):
+            return "%s move %s" % (self.source, self.bestMove)
+        if self.source == "parallel":  # the workers keep their own cutoff and quiescence counts
+            return "%d nodes over the worker processes, depth %d, %.0f nodes/s" % (
+                self.nodes, self.depth, self.nodesPerSecond())
+        line = "%d nodes (%d quiescence), %.1f%% of beta cutoffs on the first move, depth %d, %.0f nodes/s" % (
+            self.nodes, self.quiescenceNodes, self.firstMoveCutoffRate(), self.depth, self.nodesPerSecond())
+        branchingFactor = self.branchingFactor()
+        if branchingFactor is not None:
+            line += ", branching factor %.2f" % branchingFactor
+        for name, (calls, seconds) in sorted(self.timers.items(), key=lambda item: -item[1][1]):
+            if calls:
+                line += "\n    %-22s %9d calls %8.3fs self" % (name, calls, seconds)
+        return line
+
+
+"""
+Wraps function to add its self time to timer ([calls, seconds]). The timed calls nest (scoreBoard calls materialBalance,
+get_valid_moves calls generateMovesInStages...), so each one keeps its children's time on the shared stack and leaves
+it out: every second is counted once, under the innermost timed call, and the timers add up to at most the search time.
+"""
+def timedCall(function, timer, stack):
+    def timed(*args):
+        stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            timer[0] += 1
+            timer[1] += elapsed - stack.pop()
+            if stack:
+                stack[-1] += elapsed
+    return timed
+
+
+"""
+timedCall for a generator function: times each batch it yields, as a call of its own
+"""
+def timedGenerator(function, timer, stack):
+    def timed(*args):
+        generator = function(*args)
+        while True:
+            stack.append(0.0)
+            start = time.perf_counter()
+            try:
+                value = next(generator)
+            except StopIteration:
+                return
+            finally:
+                elapsed = time.perf_counter() - start
+                timer[0] += 1
+                timer[1] += elapsed - stack.pop()
+                if stack:
+                    stack[-1] += elapsed
+            yield value
+    return timed
+
+
+"""
+Runs the block with the optional hooks on: with timeCalls the GameState calls of gs and the evaluation functions of the
+search module are swapped for timed versions (and put back afterwards), with profilePath the block is profiled.
+"""
+@contextlib.contextmanager
+def instrumented(stats, gs, searchModule, timeCalls=False, profilePath=None):
+    global profiler
+    patched = []
+    if timeCalls:
+        stack = []  # time spent in timed calls inside each timed call running, innermost last
+        for name in GAME_STATE_CALLS + GAME_STATE_GENERATORS:
+            wrap = timedGenerator if name in GAME_STATE_GENERATORS else timedCall
+            # an instance attribute hides the method, so calls from inside GameState are timed too
+            setattr(gs, name, wrap(getattr(gs, name), stats.timer(name), stack))
+            patched.append((gs, name, None))
+        for name in EVALUATION_CALLS:
+            original = getattr(searchModule, name)
+            setattr(searchModule, name, timedCall(original, stats.timer(name), stack))
+            patched.append((searchModule, name, original))
+    if profilePath is not None:
+        if profiler is None:
+            profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profilePath is not None:
+            profiler.disable()
+            profiler.dump_stats(profilePath)
+        for target, name, original in reversed(patched):
+            if original is None:
+                delattr(target, name)
+            else:
+                setattr(target, name, original)
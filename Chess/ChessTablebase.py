@@ -0,0 +1,388 @@
+"""
+Endgame tablebases for small material sets (KQK, KRK, KPK, ... and 4 piece sets such as KQKR). A table holds, for every
+placement of its pieces and side to move, whether the side to move wins, draws or loses and in how many plies the game
+ends in mate with best play (distance to mate).
+Tables are built offline by retrograde analysis on top of ChessEngine's move generation: every position's legal moves
+are generated once, then results spread backwards from the checkmates one ply at a time. Moves that capture or promote
+leave the table and are scored from the smaller table they lead to, which is built first if it is missing.
+A table file is a header, an index of block offsets and zlib compressed blocks of one byte per position, so a probe only
+decompresses the block it needs. Build the shipped tables with:
+    python -m Chess.ChessTablebase KQK KRK KPK KBK KNK --output Chess/tablebases
+Tables assume no castling rights and no en passant capture, positions with either are never probed. (Inside a table
+with pawns on both sides, a double push is scored as if it could not be taken en passant.)
+"""
+import argparse
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from Chess import ChessEngine
+
+MAGIC = b"CHESSTB1"
+HEADER = struct.Struct(">8sBII")  # magic, number of pieces, positions, positions per block
+BLOCK_SIZE = 4096
+BLOCK_CACHE = 64  # decompressed blocks kept per table
+PIECE_ORDER = "KQRBNP"
+
+# Results, from the side to move's point of view
+WIN = 1
+DRAW = 0
+LOSS = -1
+
+# One byte per position: 0 is a draw (or an illegal placement), an odd code n is a win in n plies and an even code n is
+# a loss in n - 2 plies (2 means checkmated)
+
+
+def decodeResult(code):
+    if code == 0:
+        return DRAW, 0
+    if code & 1:
+        return WIN, code
+    return LOSS, code - 2
+
+
+"""
+Table name of a material set, e.g. ("KQ", "K") -> "KQK". The white pieces come first.
+"""
+def tableName(whitePieces, blackPieces):
+    return "".join(sorted(whitePieces, key=PIECE_ORDER.index)) + "".join(sorted(blackPieces, key=PIECE_ORDER.index))
+
+
+"""
+Pieces of a table in index order, e.g. "KQKR" -> ["wK", "wQ", "bK", "bR"]
+"""
+def tablePieces(name):
+    if len(name) < 2 or name[0] != "K" or "K" not in name[1:] or any(piece not in PIECE_ORDER for piece in name):
+        raise ValueError("Not a table name: " + name)
+    blackStart = name.index("K", 1)
+    return ["w" + piece for piece in name[:blackStart]] + ["b" + piece for piece in name[blackStart:]]
+
+
+"""
+Position index: side to move (0 white, 1 black) followed by one square (row * 8 + col) per piece in table order
+"""
+def positionIndex(squares, whiteToMove):
+    index = 0 if whiteToMove else 1
+    for sq in squares:
+        index = index * 64 + sq
+    return index
+
+
+class Table():
+    def __init__(self, name, values=None, path=None):
+        self.name = name
+        self.pieces = tablePieces(name)
+        self.values = values  # a bytearray while the table is built in memory
+        self.blocks = {}
+        if path is not None:
+            with open(path, "rb") as tableFile:
+                self.data = tableFile.read()
+            magic, pieceCount, self.size, self.blockSize = HEADER.unpack_from(self.data)
+            if magic != MAGIC or pieceCount != len(self.pieces):
+                raise ValueError("Not a tablebase file for " + name + ": " + path)
+            blockCount = (self.size + self.blockSize - 1) // self.blockSize
+            self.offsets = struct.unpack_from(">%dI" % (blockCount + 1), self.data, HEADER.size)
+
+    def code(self, index):
+        if self.values is not None:
+            return self.values[index]
+        blockNumber = index // self.blockSize
+        block = self.blocks.get(blockNumber)
+        if block is None:
+            if len(self.blocks) >= BLOCK_CACHE:
+                self.blocks.clear()
+            block = zlib.decompress(self.data[self.offsets[blockNumber]:self.offsets[blockNumber + 1]])
+            self.blocks[blockNumber] = block
+        return block[index % self.blockSize]
+
+    def save(self, path):
+        blocks = [zlib.compress(bytes(self.values[start:start + BLOCK_SIZE]), 9)
+                  for start in range(0, len(self.values), BLOCK_SIZE)]
+        offset = HEADER.size + 4 * (len(blocks) + 1)
+        offsets = [offset]
+        for block in blocks:
+            offset += len(block)
+            offsets.append(offset)
+        with open(path, "wb") as tableFile:
+            tableFile.write(HEADER.pack(MAGIC, len(self.pieces), len(self.values), BLOCK_SIZE))
+            tableFile.write(struct.pack(">%dI" % len(offsets), *offsets))
+            for block in blocks:
+                tableFile.write(block)
+
+
+class Tablebases():
+    def __init__(self, directory=None):
+        self.tables = {}
+        self.paths = {}
+        if directory is not None and os.path.isdir(directory):
+            for fileName in os.listdir(directory):
+                if fileName.endswith(".tb"):
+                    self.paths[fileName[:-3]] = os.path.join(directory, fileName)
+        self.maxPieces = max([len(name) for name in self.paths], default=2)
+        self.probes = 0
+        self.hits = 0
+
+    def getTable(self, name):
+        table = self.tables.get(name)
+        if table is None and name in self.paths:
+            table = Table(name, path=self.paths[name])
+            self.tables[name] = table
+        return table
+
+    def addTable(self, table):
+        self.tables[table.name] = table
+        self.maxPieces = max(self.maxPieces, len(table.pieces))
+
+    """
+    Looks the position on the board up. Returns the byte code (see decodeResult), or None if there is no table for
+    its material.
+    """
+    def probeBoard(self, board, whiteToMove):
+        white = []
+        black = []
+        for r in range(8):
+            for c in range(8):
+                piece = board[r][c]
+                if piece != "--":
+                    (white if piece[0] == "w" else black).append((piece[1], r * 8 + c))
+        if len(white) == 1 and len(black) == 1:
+            return 0  # bare kings
+        name = tableName([piece for piece, sq in white], [piece for piece, sq in black])
+        table = self.getTable(name)
+        if table is None:
+            # Look the position up with the colors swapped, mirrored so pawns still move the right way
+            name = tableName([piece for piece, sq in black], [piece for piece, sq in white])
+            table = self.getTable(name)
+            if table is None:
+                return None
+            white, black = [(piece, sq ^ 56) for piece, sq in black], [(piece, sq ^ 56) for piece, sq in white]
+            whiteToMove = not whiteToMove
+        squares = []
+        for tablePiece in table.pieces:
+            pieces = white if tablePiece[0] == "w" else black
+            for i in range(len(pieces)):
+                if pieces[i][0] == tablePiece[1]:
+                    squares.append(pieces.pop(i)[1])
+                    break
+        return table.code(positionIndex(squares, whiteToMove))
+
+    """
+    Returns (WIN / DRAW / LOSS, plies to mate) for the side to move, or None if the position is not covered
+    """
+    def probe(self, gs):
+        if gs.pieceCount > self.maxPieces or gs.castleRights or self.canCaptureEnPassant(gs):
+            return None
+        self.probes += 1
+        code = self.probeBoard(gs.board, gs.whiteToMove)
+        if code is None:
+            return None
+        self.hits += 1
+        return decodeResult(code)
+
+    """
+    True if the side to move has a pawn next to the pawn that just made a double push
+    """
+    def canCaptureEnPassant(self, gs):
+        if gs.enPassantPossible == ():
+            return False
+        row, col = gs.enPassantPossible
+        pawnRow, pawn = (row + 1, "wP") if gs.whiteToMove else (row - 1, "bP")
+        return (col > 0 and gs.board[pawnRow][col - 1] == pawn) or (col < 7 and gs.board[pawnRow][col + 1] == pawn)
+
+    """
+    Picks the best move by probing the position after every move: the fastest win, else a draw, else the slowest loss.
+    Returns None unless every move can be looked up.
+    """
+    def bestMove(self, gs, validMoves):
+        bestMove = None
+        bestRank = None
+        for move in validMoves:
+            gs.makeMove(move)
+            result = self.probe(gs)
+            gs.undo_move()
+            if result is None:
+                return None
+            outcome, plies = result  # the opponent's result, so a LOSS is a win for us
+            rank = (outcome, plies if outcome == LOSS else -plies)  # lower is better for us
+            if bestRank is None or rank < bestRank:
+                bestRank = rank
+                bestMove = move
+        return bestMove
+
+
+"""
+Builds a table by retrograde analysis and returns it (not saved). Tables for what captures and promotions lead to are
+taken from tablebases, and built and added to it first when they are missing.
+"""
+def generateTable(name, tablebases, verbose=False):
+    pieces = tablePieces(name)
+    pieceCount = len(pieces)
+    size = 2 * 64 ** pieceCount
+    start = time.perf_counter()
+    # Every table reachable by a capture or promotion has to exist before this one
+    for sub in subTables(name):
+        if tablebases.getTable(sub) is None and tablebases.getTable(swappedName(sub)) is None:
+            tablebases.addTable(generateTable(sub, tablebases, verbose))
+
+    gs = ChessEngine.GameState()
+    gs.board = [["--"] * 8 for r in range(8)]
+    gs.castleRights = 0
+    gs.enPassantPossible = ()
+    illegal = bytearray(size)
+    drawEscape = bytearray(size)  # the side to move has a move out of the table that doesn't lose
+    winAt = array("H", bytes(2 * size))  # fastest win through a move out of the table, 0 if none
+    lossAt = array("H", bytes(2 * size))  # a loss can't come sooner than this
+    remaining = array("H", bytes(2 * size))  # moves whose result inside the table is not known yet
+    successorStart = array("I", [0])
+    successors = array("I")
+    buckets = [[] for plies in range(512)]
+    # Forward pass: generate the legal moves of every position once
+    for index in range(size):
+        rest = index
+        squares = [0] * pieceCount
+        for i in range(pieceCount - 1, -1, -1):
+            squares[i] = rest & 63
+            rest >>= 6
+        whiteToMove = rest == 0
+        if len(set(squares)) < pieceCount or \
+                any(piece[1] == "P" and squares[i] // 8 in (0, 7) for i, piece in enumerate(pieces)):
+            illegal[index] = 1
+            successorStart.append(len(successors))
+            continue
+        for piece, sq in zip(pieces, squares):
+            gs.board[sq // 8][sq % 8] = piece
+            if piece == "wK":
+                gs.whiteKingLocation = ChessEngine.squareCoords[sq]
+            elif piece == "bK":
+                gs.blackKingLocation = ChessEngine.squareCoords[sq]
+        gs.whiteToMove = whiteToMove
+        gs.attackMaps = {}  # the board was changed by hand
+        waitingRow, waitingCol = gs.blackKingLocation if whiteToMove else gs.whiteKingLocation
+        if gs.squareUnderAttack(waitingRow, waitingCol, "b" if whiteToMove else "w"):
+            illegal[index] = 1  # the side that just moved is in check
+        else:
+            moves = gs.get_valid_moves()
+            if not moves:
+                if gs.inCheck:
+                    buckets[0].append(index)
+                # stalemate stays a draw
+            for move in moves:
+                if move.pieceCaptured != "--" or move.isPawnPromotion:
+                    gs.makeMove(move)
+                    outcome, plies = decodeResult(tablebases.probeBoard(gs.board, gs.whiteToMove))
+                    gs.undo_move()
+                    if outcome == LOSS:
+                        if winAt[index] == 0 or plies + 1 < winAt[index]:
+                            winAt[index] = plies + 1
+                    elif outcome == DRAW:
+                        drawEscape[index] = 1
+                    else:
+                        lossAt[index] = max(lossAt[index], plies + 1)
+                else:
+                    fromSq = move.startRow * 8 + move.startCol
+                    childSquares = [move.endRow * 8 + move.endCol if sq == fromSq else sq for sq in squares]
+                    successors.append(positionIndex(childSquares, not whiteToMove))
+                    remaining[index] += 1
+            if moves:
+                if winAt[index]:
+                    buckets[winAt[index]].append(index)
+                elif remaining[index] == 0 and not drawEscape[index]:
+                    buckets[lossAt[index]].append(index)
+        for sq in squares:
+            gs.board[sq // 8][sq % 8] = "--"
+        successorStart.append(len(successors))
+    if verbose:
+        print("%s: %d moves generated in %.1fs" % (name, len(successors), time.perf_counter() - start))
+
+    # Invert the move lists so the results can be passed back to the positions leading to them
+    predecessorStart = array("I", bytes(4 * (size + 1)))
+    for child in successors:
+        predecessorStart[child + 1] += 1
+    for index in range(size):
+        predecessorStart[index + 1] += predecessorStart[index]
+    predecessors = array("I", bytes(4 * len(successors)))
+    fill = array("I", predecessorStart)
+    for index in range(size):
+        for i in range(successorStart[index], successorStart[index + 1]):
+            child = successors[i]
+            predecessors[fill[child]] = index
+            fill[child] += 1
+    del successors, fill
+
+    # Backward pass in order of distance to mate, so the first result a position gets is its best one
+    values = bytearray(size)
+    for plies in range(len(buckets)):
+        for index in buckets[plies]:
+            if values[index]:
+                continue
+            isWin = plies & 1
+            values[index] = plies if isWin else plies + 2
+            for i in range(predecessorStart[index], predecessorStart[index + 1]):
+                parent = predecessors[i]
+                if values[parent]:
+                    continue
+                if not isWin:
+                    buckets[plies + 1].append(parent)
+                else:
+                    remaining[parent] -= 1
+                    if plies + 1 > lossAt[parent]:
+                        lossAt[parent] = plies + 1
+                    if remaining[parent] == 0 and not drawEscape[parent] and not winAt[parent]:
+                        buckets[lossAt[parent]].append(parent)
+        buckets[plies] = None
+    if verbose:
+        wins = sum(1 for code in values if code & 1)
+        losses = sum(1 for code in values if code and not code & 1)
+        print("%s: %d legal positions, %d wins, %d losses, longest win %d plies, %.1fs" %
+              (name, size - sum(illegal), wins, losses, max([code for code in values if code & 1], default=0),
+               time.perf_counter() - start))
+    return Table(name, values)
+
+
+def swappedName(name):
+    blackStart = name.index("K", 1)
+    return name[blackStart:] + name[:blackStart]
+
+
+"""
+Names of the tables a capture or promotion in this table can lead to (not counting bare kings)
+"""
+def subTables(name):
+    blackStart = name.index("K", 1)
+    white, black = name[:blackStart], name[blackStart:]
+    names = set()
+    for i in range(1, len(white)):
+        names.add(tableName(white[:i] + white[i + 1:], black))
+        if white[i] == "P":
+            names.add(tableName(white[:i] + "Q" + white[i + 1:], black))
+    for i in range(1, len(black)):
+        names.add(tableName(white, black[:i] + black[i + 1:]))
+        if black[i] == "P":
+            names.add(tableName(white, black[:i] + "Q" + black[i + 1:]))
+    names.discard("KK")
+    return sorted(names, key=len)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build endgame tablebase files by retrograde analysis")
+    parser.add_argument("tables", nargs="+", help="material sets to build, e.g. KQK KRK KPK KQKR")
+    parser.add_argument("--output", default=os.path.join(os.path.dirname(__file__), "tablebases"))
+    args = parser.parse_args(argv)
+    os.makedirs(args.output, exist_ok=True)
+    tablebases = Tablebases(args.output)
+    for name in args.tables:
+        tablePieces(name)
+        if len(name) > 4:
+            raise ValueError("Only tables of up to 4 pieces are supported: " + name)
+        table = generateTable(name, tablebases, verbose=True)
+        tablebases.addTable(table)
+        path = os.path.join(args.output, name + ".tb")
+        table.save(path)
+        print("wrote", path, os.path.getsize(path), "bytes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""
+Fixed size transposition table for the search. Positions are stored by Zobrist key (GameState.zobristKey) together with
+the depth they were searched to, the kind of score found, the score and the best move's moveID.
+The table is two preallocated lists (keys and packed entries) whose length is a power of two chosen from a memory
+budget, so it never grows during a game.
+"""
+
+# Bound types
+EXACT = 0  # score is the true value of the position
+LOWER = 1  # search failed high, true value is >= score
+UPPER = 2  # search failed low, true value is <= score
+
+# Rough bytes per slot: a list pointer plus a Python int object for both the key and the packed entry
+ENTRY_BYTES = 80
+SCORE_OFFSET = 1 << 15  # scores are stored shifted so they are never negative
+NO_MOVE = 0xFFFF
+
+
+class TranspositionTable():
+    def __init__(self, sizeMB=16):
+        entries = 1
+        while entries * 2 * ENTRY_BYTES <= sizeMB * 1024 * 1024:
+            entries *= 2
+        self.sizeMB = sizeMB
+        self.size = entries
+        self.mask = entries - 1
+        self.keys = [0] * entries
+        self.entries = [0] * entries
+        self.generation = 0  # bumped for every new search so old entries can be replaced first
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.cutoffs = 0  # counted by the search when a probe ends a node
+
+    """
+    Starts a new search. Entries from earlier searches stay usable but are the first to be overwritten.
+    """
+    def newSearch(self):
+        self.generation = (self.generation + 1) & 0xFF
+        self.probes = 0
+        self.hits = 0
+        self.stores = 0
+        self.cutoffs = 0
+
+    def clear(self):
+        self.keys = [0] * self.size
+        self.entries = [0] * self.size
+        self.generation = 0
+
+    """
+    Returns (depth, bound, score, moveID) for the position, or None if it is not in the table. moveID is None when no
+    best move was stored.
+    """
+    def probe(self, key):
+        self.probes += 1
+        index = key & self.mask
+        if self.keys[index] != key:
+            return None
+        self.hits += 1
+        entry = self.entries[index]
+        moveID = entry >> 26 & 0xFFFF
+        return (entry & 0xFF, entry >> 8 & 0x3, (entry >> 10 & 0xFFFF) - SCORE_OFFSET,
+                None if moveID == NO_MOVE else moveID)
+
+    """
+    Stores a search result. An existing entry for a different position is only replaced if it comes from an older
+    search or was searched less deeply, so the expensive deep results survive.
+    """
+    def store(self, key, depth, bound, score, moveID=None):
+        index = key & self.mask
+        oldEntry = self.entries[index]
+        if self.keys[index] != key and oldEntry and oldEntry >> 42 == self.generation and oldEntry & 0xFF > depth:
+            return
+        if moveID is None:
+            if self.keys[index] == key:
+                moveID = oldEntry >> 26 & 0xFFFF  # keep the old best move for ordering
+            else:
+                moveID = NO_MOVE
+        self.keys[index] = key
+        self.entries[index] = depth | bound << 8 | (score + SCORE_OFFSET) << 10 | moveID << 26 | self.generation << 42
+        self.stores += 1
+
+    """
+    Percentage of slots holding an entry from the current search
+    """
+    def usage(self):
+        used = 0
+        for entry in self.entries:
+            if entry and entry >> 42 == self.generation:
+                used += 1
+        return 100 * used / self.size
@@ -0,0 +1,242 @@
+"""
+UCI front end, so tournament managers and other tools can run the engine without the pygame window. Built straight on
+ChessEngine and ChessAI and nothing else, so it is ready to answer "uci" as soon as Python has started. Searches run on
+a worker thread: the main thread keeps reading commands, answers "isready" and "stop" at once, and streams an info
+line for every depth the search finishes.
+    python -m Chess.ChessUCI
+Supports uci, isready, ucinewgame, setoption (Hash, OwnBook), position startpos / fen ... moves ..., go (depth,
+movetime, nodes, wtime / btime / winc / binc / movestogo, infinite), stop and quit. The engine only promotes to a
+queen, so any other promotion piece is read as a queen.
+"""
+import argparse
+import sys
+import threading
+import time
+from Chess import ChessEngine, ChessAI, ChessTranspositionTable
+from Chess.ChessPGN import START_FEN
+
+ENGINE_NAME = "Chess_Project_2021"
+MOVES_TO_GO = 30  # with a clock and no movestogo, plan each move as if this many are left to play
+MOVE_OVERHEAD = 0.05  # seconds kept back from every clock move for the replies to travel
+
+
+class UCIEngine():
+    def __init__(self, output, backend=None):
+        self.output = output
+        self.outputLock = threading.Lock()
+        self.backend = backend
+        self.ownBook = True
+        self.gs = ChessEngine.newGameState(backend)  # None after a position command that failed, until a good one
+        self.searchThread = None
+        self.infinite = False
+        self.stopped = threading.Event()  # set by stop / quit, an infinite search waits for it before its bestmove
+
+    def send(self, line):
+        with self.outputLock:
+            self.output.write(line + "\n")
+            self.output.flush()
+
+    """
+    Handles one command line. Returns False on quit.
+    """
+    def command(self, line):
+        words = line.split()
+        if not words:
+            return True
+        name, arguments = words[0], words[1:]
+        if name == "uci":
+            self.send("id name " + ENGINE_NAME)
+            self.send("id author BenGasper")
+            self.send("option name Hash type spin default %d min 1 max 1024" % ChessAI.TT_SIZE_MB)
+            self.send("option name OwnBook type check default true")
+            self.send("uciok")
+        elif name == "isready":
+            self.send("readyok")
+        elif name == "ucinewgame":
+            self.stopSearch()  # a search still running is over once the GUI moves on
+            ChessAI.transpositionTable.clear()
+            self.gs = ChessEngine.newGameState(self.backend)
+        elif name == "setoption":
+            self.stopSearch()
+            self.setOption(arguments)
+        elif name == "position":
+            self.stopSearch()
+            self.setPosition(arguments)
+        elif name == "go":
+            self.stopSearch()
+            self.go(arguments)
+        elif name == "stop":
+            self.stopSearch()
+        elif name == "quit":
+            self.stopSearch()
+            return False
+        return True  # anything else (debug, register, ponderhit...) is ignored, as UCI asks
+
+    def setOption(self, arguments):
+        text = " ".join(arguments)
+        if " value " not in text:
+            return
+        option, value = text.split(" value ", 1)
+        option = option.replace("name", "", 1).strip().lower()
+        value = value.strip()
+        if option == "hash" and value.isdigit():
+            ChessAI.transpositionTable = ChessTranspositionTable.TranspositionTable(max(1, int(value)))
+        elif option == "ownbook":
+            self.ownBook = value.lower() == "true"
+
+    """
+    position [startpos | fen <fen>] [moves <move>...]. A bad FEN or move clears the position, so a go that follows
+    doesn't search the one before.
+    """
+    def setPosition(self, arguments):
+        moves = arguments.index("moves") if "moves" in arguments else len(arguments)
+        if arguments and arguments[0] == "fen":
+            fen = " ".join(arguments[1:moves])
+        else:
+            fen = START_FEN
+        gs = ChessEngine.newGameState(self.backend)
+        try:
+            gs.loadFEN(fen)
+            for text in arguments[moves + 1:]:
+                gs.makeMove(self.readMove(gs, text))
+        except ValueError as error:
+            self.send("info string " + str(error))
+            self.gs = None
+            return
+        self.gs = gs
+
+    """
+    The legal move for a UCI move ("e2e4", "e7e8q")
+    """
+    def readMove(self, gs, text):
+        for move in gs.get_valid_moves():
+            if move.get_chess_notation() == text[:4]:
+                return move
+        raise ValueError("Illegal move " + text)
+
+    """
+    UCI text of a move: coordinates, plus "q" for a promotion
+    """
+    def moveText(self, move):
+        return move.get_chess_notation() + ("q" if move.isPawnPromotion else "")
+
+    """
+    The principal variation moveIDs as UCI moves, played out on gs to find the promotions and taken back again
+    """
+    def variationText(self, gs, variation):
+        texts = []
+        for moveID in variation:
+            move = next((move for move in gs.get_valid_moves() if move.moveID == moveID), None)
+            if move is None:
+                break
+            texts.append(self.moveText(move))
+            gs.makeMove(move)
+        for text in texts:
+            gs.undo_move()
+        return " ".join(texts)
+
+    """
+    go [depth d] [movetime ms] [nodes n] [wtime ms] [btime ms] [winc ms] [binc ms] [movestogo n] [infinite]
+    """
+    def go(self, arguments):
+        if self.gs is None:
+            self.send("info string no position to search, the last position command failed")
+            self.send("bestmove 0000")
+            return
+        limits = {}
+        for index, word in enumerate(arguments[:-1]):
+            if word in ("depth", "movetime", "nodes", "wtime", "btime", "winc", "binc", "movestogo"):
+                try:
+                    limits[word] = int(arguments[index + 1])
+                except ValueError:
+                    pass
+        self.infinite = infinite = "infinite" in arguments
+        maxDepth = limits.get("depth", ChessAI.MAX_DEPTH)
+        nodeLimit = limits.get("nodes")
+        clock, increment = ("wtime", "winc") if self.gs.whiteToMove else ("btime", "binc")
+        if "movetime" in limits:
+            timeLimit = limits["movetime"] / 1000
+        elif clock in limits:
+            remaining = limits[clock] / 1000
+            timeLimit = remaining / limits.get("movestogo", MOVES_TO_GO) + limits.get(increment, 0) / 1000 * 3 / 4
+            timeLimit = max(0.01, min(timeLimit, remaining / 2) - MOVE_OVERHEAD)
+        elif infinite or limits:
+            timeLimit = None
+        else:
+            timeLimit = ChessAI.TIME_LIMIT  # a bare "go" thinks as long as the game window would
+        self.stopped.clear()
+        ChessAI.stopSearch = False
+        self.searchThread = threading.Thread(target=self.search, args=(self.gs, timeLimit, maxDepth, nodeLimit, infinite),
+                                             daemon=True)
+        self.searchThread.start()
+
+    """
+    Runs on the search thread: searches, streams an info line per finished depth, then sends bestmove. An error in the
+    search is sent as an info string followed by bestmove 0000, since the GUI waits for a bestmove whatever happens.
+    """
+    def search(self, gs, timeLimit, maxDepth, nodeLimit, infinite):
+        start = time.perf_counter()
+
+        def sendInfo(depth, score, nodes, variation):
+            milliseconds = max(1, int((time.perf_counter() - start) * 1000))
+            if ChessAI.isMateScore(score):
+                mateIn = (ChessAI.mateDistance(score) + 1) // 2  # the PV stops short at a transposition table cutoff
+                scoreText = "mate %d" % (mateIn if score > 0 else -mateIn)
+            else:
+                scoreText = "cp %d" % score
+            self.send("info depth %d score %s nodes %d nps %d time %d pv %s" % (
+                depth, scoreText, nodes, nodes * 1000 // milliseconds, milliseconds, self.variationText(gs, variation)))
+
+        move = None
+        startLength = len(gs.moveLog)
+        ChessAI.iterationCallback = sendInfo
+        ChessAI.PRINT_STATS = False  # stdout is for UCI only
+        try:
+            validMoves = gs.get_valid_moves()
+            if validMoves:
+                move = ChessAI.findBestMove(gs, validMoves, timeLimit, maxDepth, nodeLimit, self.ownBook)
+        except Exception as error:
+            self.send("info string search failed: %s: %s" % (type(error).__name__, error))
+            while len(gs.moveLog) > startLength:  # take back the moves the failed search left on the board
+                gs.undo_move()
+        finally:
+            ChessAI.iterationCallback = None
+        if infinite:
+            self.stopped.wait()  # UCI only allows the bestmove of an infinite search after stop
+        self.send("bestmove " + (self.moveText(move) if move is not None else "0000"))
+
+    """
+    Stops the search if one is running and waits for it to send its bestmove
+    """
+    def stopSearch(self):
+        self.stopped.set()
+        ChessAI.stopSearch = True
+        self.waitForSearch()
+
+    """
+    Waits for the running search, if any, to finish on its own and send its bestmove. Only stop ends an infinite one.
+    """
+    def waitForSearch(self):
+        if self.searchThread is not None:
+            self.searchThread.join()
+            self.searchThread = None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the engine over the UCI protocol on stdin / stdout")
+    parser.add_argument("--backend", choices=("board", "bitboard"), default=None)
+    args = parser.parse_args(argv)
+    engine = UCIEngine(sys.stdout, args.backend)
+    for line in sys.stdin:
+        if not engine.command(line):
+            return 0
+    # End of input, e.g. commands piped in from a file: let the last search finish, unless nothing but stop would end it
+    if engine.infinite:
+        engine.stopSearch()
+    else:
+        engine.waitForSearch()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
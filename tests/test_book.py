@@ -0,0 +1,81 @@
+"""
+Opening book files (ChessOpeningBook) and the book probe of the search. Run from the repository root with
+python -m unittest discover tests.
+"""
+import contextlib
+import io
+import os
+import random
+import tempfile
+import unittest
+from Chess import ChessEngine, ChessAI, ChessOpeningBook
+
+
+class OpeningBookTest(unittest.TestCase):
+    def setUp(self):
+        self.temporary = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temporary.cleanup()
+        ChessAI.openingBook = None  # opened again from OPENING_BOOK_PATH on first use
+
+    """
+    The committed book knows the starting position and the main replies to 1. e4, all legal
+    """
+    def testCommittedBook(self):
+        book = ChessOpeningBook.OpeningBook(ChessAI.OPENING_BOOK_PATH)
+        try:
+            gs = ChessEngine.newGameState("board")
+            for text in ("e2e4", None):
+                validMoves = gs.get_valid_moves()
+                legal = {move.moveID for move in validMoves}
+                entries = book.probe(gs.zobristKey)
+                self.assertTrue(entries)
+                self.assertTrue(all(moveID in legal and weight > 0 for moveID, weight in entries))
+                self.assertIn(book.chooseMove(gs, validMoves, random.Random(1)), validMoves)
+                if text is not None:
+                    gs.makeMove(next(move for move in validMoves if move.get_chess_notation() == text))
+            gs.loadFEN("4k3/8/8/8/8/8/8/4K2R w K - 0 1")
+            self.assertEqual(book.probe(gs.zobristKey), [])
+            self.assertIsNone(book.chooseMove(gs, gs.get_valid_moves()))
+        finally:
+            book.close()
+
+    def testBuildAndProbe(self):
+        path = os.path.join(self.temporary.name, "book.bin")
+        games = ChessOpeningBook.readGames("e4 e5 Nf3\ne4 c5\nd2d4 d7d5\n")
+        self.assertEqual(ChessOpeningBook.buildBook(games, path, plies=2), 5)  # e4 twice, counted once with weight 2
+        book = ChessOpeningBook.OpeningBook(path)
+        try:
+            gs = ChessEngine.newGameState("board")
+            entries = dict(book.probe(gs.zobristKey))
+            ids = {move.get_chess_notation(): move.moveID for move in gs.get_valid_moves()}
+            self.assertEqual(entries, {ids["e2e4"]: 2, ids["d2d4"]: 1})
+        finally:
+            book.close()
+
+    """
+    A file that isn't a book is refused, and the search says so on stderr: under ChessUCI stdout is the protocol
+    """
+    def testBadBookFile(self):
+        path = os.path.join(self.temporary.name, "bad.bin")
+        with open(path, "wb") as bookFile:
+            bookFile.write(b"not a book")
+        with self.assertRaises(ValueError):
+            ChessOpeningBook.OpeningBook(path)
+        bookPath = ChessAI.OPENING_BOOK_PATH
+        ChessAI.OPENING_BOOK_PATH = path
+        ChessAI.openingBook = None
+        stdout, stderr = io.StringIO(), io.StringIO()
+        try:
+            with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                gs = ChessEngine.newGameState("board")
+                self.assertIsNone(ChessAI.findBookMove(gs, gs.get_valid_moves()))
+        finally:
+            ChessAI.OPENING_BOOK_PATH = bookPath
+        self.assertEqual(stdout.getvalue(), "")
+        self.assertIn("Not an opening book", stderr.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,55 @@
+"""
+FEN / EPD loading (GameState.loadFEN, loadEPD). Run from the repository root with python -m unittest discover tests.
+"""
+import unittest
+from Chess import ChessEngine
+
+BACKENDS = ("board", "bitboard")
+FENS = ("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+        "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+        "rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3",
+        "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 b - - 12 40")
+
+
+class FENTest(unittest.TestCase):
+    def testRoundTrip(self):
+        for backend in BACKENDS:
+            for fen in FENS:
+                gs = ChessEngine.newGameState(backend)
+                gs.loadFEN(fen)
+                self.assertEqual(gs.getFEN(), fen, backend)
+
+    def testDefaultClocks(self):
+        gs = ChessEngine.newGameState("board")
+        gs.loadFEN("4k3/8/8/8/8/8/8/4K3 b - -")
+        self.assertEqual(gs.getFEN(), "4k3/8/8/8/8/8/8/4K3 b - - 0 1")
+
+    def testEPDRoundTrip(self):
+        line = 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - bm Qxf6; id "kiwipete test";'
+        gs = ChessEngine.newGameState("board")
+        operations = gs.loadEPD(line)
+        self.assertEqual(operations, {"bm": ["Qxf6"], "id": ["kiwipete test"]})
+        self.assertEqual(gs.getEPD(operations), line)
+
+    """
+    Positions that can't occur, on which the move generators of the backends would disagree
+    """
+    def testImpossiblePositions(self):
+        for backend in BACKENDS:
+            for fen in ("8/8/8/8/8/8/8/8 w - - 0 1",  # no kings
+                        "4k3/8/8/8/8/8/8/4K2K w - - 0 1",  # two white kings
+                        "4k2P/8/8/8/8/8/8/4K3 w - - 0 1",  # a pawn on the last rank
+                        "4k3/8/8/8/8/8/8/p3K3 b - - 0 1",  # a pawn on the first rank
+                        "4k3/8/8/8/8/8/8/4R1K1 w - - 0 1"):  # black, not to move, in check
+                with self.assertRaises(ValueError, msg=fen):
+                    ChessEngine.newGameState(backend).loadFEN(fen)
+
+    def testMalformed(self):
+        for fen in ("8/8/8 w - - 0 1", "4k3/8/8/8/8/8/8/4K3 x - - 0 1", "4k3/8/8/8/8/8/8/4K3 w - z9 0 1",
+                    "4k3/8/8/8/8/8/8/4K3 w -"):
+            with self.assertRaises(ValueError, msg=fen):
+                ChessEngine.newGameState("board").loadFEN(fen)
+
+
+if __name__ == "__main__":
+    unittest.main()
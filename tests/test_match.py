@@ -0,0 +1,36 @@
+"""
+Headless matches (ChessMatch). Run from the repository root with python -m unittest discover tests.
+"""
+import io
+import json
+import unittest
+from Chess import ChessAI, ChessMatch
+
+
+class MatchTest(unittest.TestCase):
+    def tearDown(self):
+        ChessMatch.players.clear()
+        ChessAI.QUIESCENCE = True
+
+    """
+    With the same settings on both sides each side still searches with its own tables
+    """
+    def testSidesDoNotShareTables(self):
+        playerA = ChessMatch.getPlayer("A", "depth=1")
+        playerB = ChessMatch.getPlayer("B", "depth=1")
+        self.assertIsNot(playerA, playerB)
+        self.assertIsNot(playerA.transpositionTable, playerB.transpositionTable)
+        self.assertIs(ChessMatch.getPlayer("A", "depth=1"), playerA)
+
+    def testMirrorMatchTotals(self):
+        output = io.StringIO()
+        totals = ChessMatch.runMatch("depth=1,book=0", "depth=1,book=0", 4, 1, output, randomPlies=2, maxPlies=40)
+        records = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(totals["games"], 4)
+        winsForA = sum(record["result"] == ("1-0" if record["game"] % 2 == 0 else "0-1") for record in records)
+        draws = sum(record["result"] == "1/2-1/2" for record in records)
+        self.assertEqual((totals["wins"], totals["draws"], totals["losses"]), (winsForA, draws, 4 - winsForA - draws))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+"""
+The compact Move: __slots__, moveID and the packed int of Move.encode / Move.decode. Run from the repository root with
+python -m unittest discover tests.
+"""
+import unittest
+from Chess import ChessEngine
+from Chess.ChessEngine import Move
+
+SLOTS = ("startRow", "startCol", "endRow", "endCol", "pieceMoved", "pieceCaptured", "moveID", "isPawnPromotion",
+         "isEnPassantMove", "isCastleMove")
+FENS = ("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",  # castling and every capture
+        "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",  # promotions with and without captures
+        "rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3")  # en passant
+
+
+class MoveTest(unittest.TestCase):
+    def testNoInstanceDict(self):
+        move = ChessEngine.newGameState("board").get_valid_moves()[0]
+        self.assertFalse(hasattr(move, "__dict__"))
+
+    def testMoveID(self):
+        gs = ChessEngine.newGameState("board")
+        move = next(move for move in gs.get_valid_moves() if move.get_chess_notation() == "e2e4")
+        self.assertEqual(move.moveID, (6 * 8 + 4) * 64 + 4 * 8 + 4)
+
+    """
+    Every move to depth 2 of positions with castling, en passant and promotions decodes to the same move, and the
+    decoded move plays the same on the board
+    """
+    def testEncodeDecode(self):
+        for fen in FENS:
+            gs = ChessEngine.newGameState("board")
+            gs.loadFEN(fen)
+            for move in gs.get_valid_moves():
+                self.checkRoundTrip(gs, move)
+                gs.makeMove(move)
+                for reply in gs.get_valid_moves():
+                    self.checkRoundTrip(gs, reply)
+                gs.undo_move()
+
+    def checkRoundTrip(self, gs, move):
+        code = move.encode()
+        self.assertLess(code, 1 << 23)
+        decoded = Move.decode(code)
+        self.assertEqual([getattr(decoded, name) for name in SLOTS], [getattr(move, name) for name in SLOTS])
+        self.assertEqual(decoded, move)
+        gs.makeMove(move)
+        after = gs.getFEN()
+        gs.undo_move()
+        gs.makeMove(decoded)
+        self.assertEqual(gs.getFEN(), after, move.get_chess_notation())
+        gs.undo_move()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+"""
+Move ordering (ChessMoveOrdering.MoveOrderer). Run from the repository root with python -m unittest discover tests.
+"""
+import unittest
+from Chess import ChessEngine
+from Chess.ChessMoveOrdering import MoveOrderer
+
+BACKENDS = ("board", "bitboard")
+FENS = ("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+        "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+        "rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3",
+        "4k3/8/8/8/8/8/4q3/4K3 w - - 0 1")  # in check
+
+
+def notation(moves):
+    return [move.get_chess_notation() for move in moves]
+
+
+class MoveOrderingTest(unittest.TestCase):
+    """
+    The staged generator gives every legal move exactly once, starting with the requested first move
+    """
+    def testStagedMovesAreTheLegalMoves(self):
+        for backend in BACKENDS:
+            for fen in FENS:
+                gs = ChessEngine.newGameState(backend)
+                gs.loadFEN(fen)
+                legal = gs.get_valid_moves()
+                orderer = MoveOrderer()
+                staged = list(orderer.stagedMoves(gs, 0))
+                self.assertEqual(sorted(notation(staged)), sorted(notation(legal)), (backend, fen))
+                last = legal[-1]
+                staged = list(orderer.stagedMoves(gs, 0, last.moveID))
+                self.assertEqual(staged[0].moveID, last.moveID)
+                self.assertEqual(len(staged), len(legal))
+
+    """
+    Kiwipete: the winning captures by MVV-LVA first, then the killer, then losing captures, then the quiet moves
+    """
+    def testStageOrder(self):
+        gs = ChessEngine.newGameState("board")
+        gs.loadFEN(FENS[1])
+        moves = {move.get_chess_notation(): move for move in gs.get_valid_moves()}
+        orderer = MoveOrderer()
+        orderer.recordCutoff(moves["a2a3"], 0, 3, 1)
+        staged = notation(orderer.stagedMoves(gs, 0))
+        self.assertEqual(staged[0], "e2a6")  # bishop takes bishop before the pawn and knight captures
+        killer = staged.index("a2a3")
+        self.assertLess(staged.index("g2h3"), killer)  # pawn takes pawn, an even trade
+        self.assertLess(killer, staged.index("f3f6"))  # queen takes knight, losing if taken back
+        self.assertLess(staged.index("f3f6"), staged.index("e1g1"))  # every capture before the quiet moves
+
+    def testHistoryOrdersQuietMoves(self):
+        gs = ChessEngine.newGameState("board")
+        moves = {move.get_chess_notation(): move for move in gs.get_valid_moves()}
+        orderer = MoveOrderer(useKillers=False)
+        orderer.recordCutoff(moves["g1f3"], 2, 4, 0)
+        orderer.recordCutoff(moves["d2d4"], 3, 2, 3)
+        validMoves = list(moves.values())
+        orderer.orderMoves(validMoves, 0)
+        self.assertEqual(notation(validMoves[:2]), ["g1f3", "d2d4"])
+        self.assertEqual((orderer.cutoffs, orderer.firstMoveCutoffRate()), (2, 50.0))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+"""
+Move generator parity: perft counts of the board and bitboard backends against the known counts and each other
+(ChessPerft). Run from the repository root with python -m unittest discover tests.
+"""
+import unittest
+from Chess import ChessEngine, ChessPerft
+
+BACKENDS = ("board", "bitboard")
+DEPTH = 2  # shallow, so the suite stays quick. python -m Chess.ChessPerft --depth 4 goes deeper.
+
+
+class PerftTest(unittest.TestCase):
+    def testKnownCounts(self):
+        for name, fen, counts in ChessPerft.STANDARD_POSITIONS:
+            for backend in BACKENDS:
+                result = ChessPerft.runPosition(name, fen, DEPTH, counts[DEPTH], backend)
+                self.assertTrue(result["passed"], result)
+
+    """
+    Per root move, so a difference points at the move whose subtree the backends disagree on. Perft has to leave the
+    position as it found it.
+    """
+    def testBackendsAgreeByRootMove(self):
+        for name, fen, counts in ChessPerft.STANDARD_POSITIONS:
+            divisions = []
+            for backend in BACKENDS:
+                gs = ChessEngine.newGameState(backend)
+                gs.loadFEN(fen)
+                key, score = gs.zobristKey, gs.materialScore
+                divisions.append(ChessPerft.divide(gs, DEPTH + 1 if name in ("start", "position3") else DEPTH))
+                self.assertEqual((gs.getFEN(), gs.zobristKey, gs.materialScore), (fen, key, score), (name, backend))
+            self.assertEqual(divisions[0], divisions[1], name)
+
+    def testHasLegalMoveAgrees(self):
+        for name, fen in ChessPerft.TERMINAL_POSITIONS:
+            for backend in BACKENDS:
+                result = ChessPerft.runTerminal(name, fen, DEPTH, backend)
+                self.assertEqual(result["mismatches"], 0, result)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+SAN and PGN reading and writing (ChessPGN). Run from the repository root with python -m unittest discover tests.
+"""
+import unittest
+from Chess import ChessEngine, ChessPGN
+
+BACKENDS = ("board", "bitboard")
+FENS = ("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",  # castling both ways, many captures
+        "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",  # in check
+        "rnbqkbnr/ppp1p1pp/8/3pPp2/8/8/PPPP1PPP/RNBQKBNR w KQkq f6 0 3",  # en passant
+        "4k3/8/8/8/8/8/8/R4RK1 w - - 0 1",  # two rooks on one rank
+        "7k/8/2N5/8/8/8/2N1N3/1K6 w - - 0 1",  # three knights reaching d4, two on a file and two on a rank
+        "1n2k3/P7/8/8/8/8/8/4K3 w - - 0 1")  # promotions with and without a capture
+
+SCHOLARS_MATE = """[Event "Test"]
+[Site "?"]
+[Date "????.??.??"]
+[Round "?"]
+[White "?"]
+[Black "?"]
+[Result "1-0"]
+
+1. e4 e5 2. Bc4 Nc6 3. Qh5 Nf6 4. Qxf7# 1-0
+"""
+
+
+class SANTest(unittest.TestCase):
+    """
+    Every legal move written in SAN reads back as the same move
+    """
+    def testRoundTrip(self):
+        for backend in BACKENDS:
+            for fen in FENS:
+                gs = ChessEngine.newGameState(backend)
+                gs.loadFEN(fen)
+                validMoves = gs.get_valid_moves()
+                sans = [ChessPGN.moveToSAN(gs, move, validMoves) for move in validMoves]
+                self.assertEqual(len(set(sans)), len(sans), (backend, fen))
+                for move, san in zip(validMoves, sans):
+                    self.assertEqual(ChessPGN.moveFromText(gs, san).moveID, move.moveID, (backend, fen, san))
+                self.assertEqual(gs.getFEN(), fen)
+
+    def testNotation(self):
+        gs = ChessEngine.newGameState("board")
+        gs.loadFEN(FENS[0])
+        sans = {ChessPGN.moveToSAN(gs, move) for move in gs.get_valid_moves()}
+        self.assertTrue({"O-O", "O-O-O", "Bxa6", "Qxf6", "dxe6", "Nxf7", "Rb1"} <= sans)
+        gs.loadFEN(FENS[3])
+        sans = {ChessPGN.moveToSAN(gs, move) for move in gs.get_valid_moves()}
+        self.assertTrue({"Rab1", "Rae1+", "Rfe1+", "Ra8+", "Rf8+"} <= sans, sans)
+        gs.loadFEN(FENS[4])
+        sans = {ChessPGN.moveToSAN(gs, move) for move in gs.get_valid_moves()}
+        self.assertTrue({"Nc2d4", "Ned4", "N6d4", "N2b4", "N6b4", "Nc1"} <= sans, sans)
+        gs.loadFEN(FENS[5])
+        sans = {ChessPGN.moveToSAN(gs, move) for move in gs.get_valid_moves()}
+        self.assertTrue({"axb8=Q+", "a8=Q"} <= sans, sans)
+
+    def testUnderPromotionRefused(self):
+        gs = ChessEngine.newGameState("board")
+        gs.loadFEN(FENS[5])
+        with self.assertRaises(ValueError):
+            ChessPGN.moveFromText(gs, "axb8=N")
+
+
+class PGNTest(unittest.TestCase):
+    def testReplayAndWrite(self):
+        for backend in BACKENDS:
+            game = next(ChessPGN.readPGN(SCHOLARS_MATE.splitlines()))
+            gs = ChessPGN.replayGame(game, backend)
+            self.assertEqual(ChessPGN.finalResult(gs), "1-0")
+            self.assertEqual(ChessPGN.gamePGN(gs, {"Event": "Test"}), SCHOLARS_MATE)
+
+    """
+    Comments, variations, NAGs and escape lines are dropped, and a game without a result still ends at the next tags
+    """
+    def testReadPGN(self):
+        text = ["% escaped line", '[Event "One"]', "", "1. e4 {best by test} e5 (1... c5 2. Nf3) 2. Nf3 $1 Nc6 ; note",
+                "3. Bb5 1/2-1/2", '[Event "Two"]', "1. d4 d5", '[Event "Three"]', "1. c4 *"]
+        games = list(ChessPGN.readPGN(text))
+        self.assertEqual([game.tags["Event"] for game in games], ["One", "Two", "Three"])
+        self.assertEqual(games[0].moves, ["e4", "e5", "Nf3", "Nc6", "Bb5"])
+        self.assertEqual(games[0].result, "1/2-1/2")
+        self.assertEqual(games[1].moves, ["d4", "d5"])
+
+    """
+    A game from a set up position is written with its FEN and starts at the right move number
+    """
+    def testSetUpPosition(self):
+        gs = ChessEngine.newGameState("board")
+        gs.loadFEN("4k3/8/8/8/8/8/8/R3K2R b KQ - 0 30")
+        for text in ("Kd7", "O-O-O+"):
+            gs.makeMove(ChessPGN.moveFromText(gs, text))
+        pgn = ChessPGN.gamePGN(gs)
+        self.assertIn('[FEN "4k3/8/8/8/8/8/8/R3K2R b KQ - 0 30"]', pgn)
+        self.assertTrue(pgn.endswith("\n30... Kd7 31. O-O-O+ *\n"), pgn)
+        game = next(ChessPGN.readPGN(pgn.splitlines()))
+        self.assertEqual(ChessPGN.replayGame(game).getFEN(), gs.getFEN())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,160 @@
+"""
+Search regressions. Run from the repository root with python -m unittest discover tests (or python -m pytest).
+"""
+import io
+import unittest
+from Chess import ChessEngine, ChessAI, ChessSearchStats, ChessUCI, ChessParallel
+
+BACKENDS = ("board", "bitboard")
+
+
+class QuiescenceTest(unittest.TestCase):
+    """
+    The only capture is exd6 en passant, worth a pawn. With alpha between the static score + DELTA_MARGIN and the
+    static score + a pawn + DELTA_MARGIN, delta pruning must still search it.
+    """
+    def testEnPassantIsNotDeltaPruned(self):
+        for backend in BACKENDS:
+            gs = ChessEngine.newGameState(backend)
+            gs.loadFEN("4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1")
+            ChessAI.stats = ChessSearchStats.SearchStats()
+            ChessAI.canAbort = False
+            standPat = ChessAI.materialBalance(gs)
+            alpha = standPat + ChessAI.DELTA_MARGIN + ChessAI.pieceScore["P"] // 2
+            ChessAI.quiescence(gs, alpha, alpha + 1000, 1, 0)
+            self.assertEqual(ChessAI.stats.quiescenceNodes, 2, backend)  # the position and the en passant capture
+            self.assertEqual(gs.getFEN(), "4k3/8/8/3pP3/8/8/8/4K3 w - d6 0 1", backend)
+
+
+class TablebaseTest(unittest.TestCase):
+    """
+    Qxd5 takes the last black pawn into the KQK table: a tablebase win is as final as a mate, so iterative deepening
+    stops after depth 1 and the UCI info line gives it as a mate counted from the root.
+    """
+    FEN = "7k/8/8/3p4/8/8/8/3QK3 w - - 0 1"
+
+    def setUp(self):
+        ChessAI.PRINT_STATS = False
+        ChessAI.transpositionTable.clear()
+
+    def testSearchStopsOnTablebaseWin(self):
+        for backend in BACKENDS:
+            gs = ChessEngine.newGameState(backend)
+            gs.loadFEN(self.FEN)
+            move, stats = ChessAI.findBestMove(gs, gs.get_valid_moves(), None, 6, None, False, True)
+            self.assertEqual(move.get_chess_notation(), "d1d5", backend)
+            self.assertEqual(stats.depth, 1, backend)
+            self.assertTrue(ChessAI.isMateScore(stats.score), backend)
+
+    def testUCIReportsTablebaseMate(self):
+        output = io.StringIO()
+        engine = ChessUCI.UCIEngine(output)
+        engine.command("position fen " + self.FEN)
+        engine.command("go depth 6")
+        engine.waitForSearch()
+        lines = output.getvalue().splitlines()
+        plies = ChessAI.mateDistance(ChessAI.searchScore)
+        self.assertEqual(lines[0].split()[:5], ["info", "depth", "1", "score", "mate"])
+        self.assertEqual(int(lines[0].split()[5]), (plies + 1) // 2)
+        self.assertEqual(lines[-1], "bestmove d1d5")
+
+
+class MateScoreTest(unittest.TestCase):
+    """
+    Rb7 and Qa8 mate in 2 moves (3 plies). Mate scores carry the distance, so the score and the UCI mate count stay right
+    when the principal variation stops short, at a quiescence leaf or on a transposition table entry from the last search.
+    """
+    FEN = "7k/8/8/8/8/8/1R6/Q5K1 w - - 0 1"
+
+    def setUp(self):
+        ChessAI.PRINT_STATS = False
+        ChessAI.transpositionTable.clear()
+
+    def testMateScoreCountsPlies(self):
+        for backend in BACKENDS:
+            gs = ChessEngine.newGameState(backend)
+            gs.loadFEN(self.FEN)
+            move, stats = ChessAI.findBestMove(gs, gs.get_valid_moves(), None, 6, None, False, True)
+            self.assertEqual(stats.score, ChessAI.CHECKMATE - 3, backend)
+            self.assertEqual(ChessAI.mateDistance(stats.score), 3, backend)
+
+    def testUCIMateFromScore(self):
+        output = io.StringIO()
+        engine = ChessUCI.UCIEngine(output)
+        for search in range(2):  # the second search starts from the first one's table entries
+            engine.command("position fen " + self.FEN)
+            engine.command("go depth 6")
+            engine.waitForSearch()
+        mates = [line.split()[5] for line in output.getvalue().splitlines() if " score mate " in line]
+        self.assertTrue(mates)
+        self.assertEqual(set(mates), {"2"})
+
+
+class BatchEvalTest(unittest.TestCase):
+    """
+    BATCH_EVAL only reorders the moves of the last ply, so every depth scores the same with it on
+    """
+    def testSameScores(self):
+        ChessAI.PRINT_STATS = False
+        gs = ChessEngine.newGameState("board")
+        gs.loadFEN("r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4")
+        scores = []
+        try:
+            for batchEval in (False, True):
+                ChessAI.BATCH_EVAL = batchEval
+                ChessAI.transpositionTable.clear()
+                stats = ChessAI.findBestMove(gs, gs.get_valid_moves(), None, 3, None, False, True)[1]
+                scores.append([iteration["score"] for iteration in stats.iterations])
+        finally:
+            ChessAI.BATCH_EVAL = False
+        self.assertEqual(scores[0], scores[1])
+
+
+class ParallelTest(unittest.TestCase):
+    def setUp(self):
+        ChessAI.PRINT_STATS = False
+        ChessAI.transpositionTable.clear()
+
+    def tearDown(self):
+        ChessAI.stopSearch = False
+        ChessAI.QUIESCENCE = True
+        ChessParallel.closePool()
+
+    def testIllegalRootMove(self):
+        gs = ChessEngine.newGameState("board")
+        with self.assertRaises(ValueError):
+            ChessParallel.searchRootMove((gs, 0, 2, None, None, ChessParallel.searchSettings()))  # a1a1
+
+    def testNoLegalMoves(self):
+        gs = ChessEngine.newGameState("board")
+        gs.loadFEN("k7/8/1Q6/8/8/8/8/7K b - - 0 1")  # stalemate
+        self.assertIsNone(ChessParallel.findBestMoveParallel(gs, gs.get_valid_moves(), 2, None, 3))
+
+    """
+    The pool outlives the search that started it: a setting changed since must still reach the workers. Qxe5+ dxe5
+    scores differently with and without quiescence.
+    """
+    def testWorkersFollowSettings(self):
+        ChessParallel.getPool(2)  # started with QUIESCENCE on
+        ChessAI.QUIESCENCE = False
+        gs = ChessEngine.newGameState("board")
+        gs.loadFEN("4k3/8/3p4/4p3/8/8/8/4QK2 w - - 0 1")
+        serialScore = ChessAI.findBestMove(gs, gs.get_valid_moves(), None, 1, None, False, True)[1].score
+        stats = ChessSearchStats.SearchStats()
+        ChessParallel.findBestMoveParallel(gs, gs.get_valid_moves(), 2, None, 1, None, stats)
+        self.assertEqual(stats.score, serialScore)
+
+    """
+    With stopSearch set and no time limit, the search returns the depth 1 move instead of going on to maxDepth
+    """
+    def testStopSearch(self):
+        gs = ChessEngine.newGameState("board")
+        stats = ChessSearchStats.SearchStats()
+        ChessAI.stopSearch = True
+        move = ChessParallel.findBestMoveParallel(gs, gs.get_valid_moves(), 2, None, 8, None, stats)
+        self.assertIsNotNone(move)
+        self.assertEqual(stats.depth, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
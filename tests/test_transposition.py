@@ -0,0 +1,59 @@
+"""
+Transposition table packing and replacement (ChessTranspositionTable). Run from the repository root with
+python -m unittest discover tests.
+"""
+import unittest
+from Chess import ChessAI
+from Chess.ChessTranspositionTable import TranspositionTable, EXACT, LOWER, UPPER
+
+
+class TranspositionTableTest(unittest.TestCase):
+    def setUp(self):
+        self.table = TranspositionTable(1)
+
+    def testPacking(self):
+        key = 0x9E3779B97F4A7C15
+        for depth, bound, score, moveID in ((0, EXACT, 0, None), (5, LOWER, -37, 0), (255, UPPER, 4095, 4095),
+                                            (3, EXACT, -ChessAI.CHECKMATE, 1234), (7, LOWER, ChessAI.CHECKMATE - 5, 77),
+                                            (1, UPPER, -(ChessAI.TABLEBASE_WIN - 200), None)):
+            self.table.clear()
+            self.table.store(key, depth, bound, score, moveID)
+            self.assertEqual(self.table.probe(key), (depth, bound, score, moveID))
+
+    def testMissAndKeptMove(self):
+        self.assertIsNone(self.table.probe(12345))
+        self.table.store(12345, 4, LOWER, 10, 321)
+        self.table.store(12345, 5, UPPER, -20)  # no best move found this time, the old one stays for ordering
+        self.assertEqual(self.table.probe(12345), (5, UPPER, -20, 321))
+        self.assertIsNone(self.table.probe(12345 + self.table.size * 2))  # same slot, other position
+
+    """
+    A deeper entry of the current search keeps its slot, one from an older search gives it up
+    """
+    def testReplacement(self):
+        key, other = 7, 7 + self.table.size
+        self.table.store(key, 6, EXACT, 1, 1)
+        self.table.store(other, 2, EXACT, 2, 2)
+        self.assertEqual(self.table.probe(key), (6, EXACT, 1, 1))
+        self.assertIsNone(self.table.probe(other))
+        self.table.newSearch()
+        self.table.store(other, 2, EXACT, 2, 2)
+        self.assertEqual(self.table.probe(other), (2, EXACT, 2, 2))
+        self.assertIsNone(self.table.probe(key))
+
+    """
+    Mate scores go in counted from the position stored and come out counted from the root of the probing search
+    """
+    def testMateScoresFollowPly(self):
+        for score in (ChessAI.CHECKMATE - 7, -(ChessAI.CHECKMATE - 7), ChessAI.TABLEBASE_WIN - 40, 150, -150):
+            self.table.store(99, 3, EXACT, ChessAI.scoreToTable(score, 4))
+            stored = self.table.probe(99)[2]
+            self.assertEqual(ChessAI.scoreFromTable(stored, 4), score)
+            if ChessAI.isMateScore(score):  # the same mate, found two plies nearer the root
+                self.assertEqual(ChessAI.mateDistance(ChessAI.scoreFromTable(stored, 2)), ChessAI.mateDistance(score) - 2)
+            else:
+                self.assertEqual(ChessAI.scoreFromTable(stored, 2), score)
+
+
+if __name__ == "__main__":
+    unittest.main()
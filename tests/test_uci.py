@@ -0,0 +1,81 @@
+"""
+Scripted sessions with the UCI front end (ChessUCI.UCIEngine). Run from the repository root with
+python -m unittest discover tests.
+"""
+import io
+import unittest
+from Chess import ChessAI, ChessUCI
+
+
+class UCISessionTest(unittest.TestCase):
+    def setUp(self):
+        ChessAI.transpositionTable.clear()
+        self.output = io.StringIO()
+        self.engine = ChessUCI.UCIEngine(self.output)
+
+    def tearDown(self):
+        self.engine.command("quit")
+        ChessAI.stopSearch = False
+
+    def session(self, *commands):
+        for line in commands:
+            self.engine.command(line)
+        self.engine.waitForSearch()
+        return self.output.getvalue().splitlines()
+
+    def testHandshake(self):
+        lines = self.session("uci", "isready")
+        self.assertEqual(lines[0], "id name " + ChessUCI.ENGINE_NAME)
+        self.assertEqual(lines[-2:], ["uciok", "readyok"])
+
+    """
+    An infinite search only answers after stop, with a legal move for the side to move
+    """
+    def testGoInfiniteThenStop(self):
+        self.engine.command("setoption name OwnBook value false")  # a book move would come without info lines
+        self.engine.command("position startpos moves e2e4 e7e5")
+        self.engine.command("go infinite")
+        self.assertTrue(self.engine.searchThread.is_alive())
+        self.engine.command("stop")
+        lines = self.output.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith("info depth 1 "))
+        self.assertEqual(lines[-1].split()[0], "bestmove")
+        legal = [self.engine.moveText(move) for move in self.engine.gs.get_valid_moves()]
+        self.assertIn(lines[-1].split()[1], legal)
+        self.assertEqual(self.engine.gs.getFEN(), "rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq e6 0 2")
+
+    def testGoDepth(self):
+        lines = self.session("position fen 4k3/8/8/8/8/8/3PPP2/4K3 w - - 0 1", "go depth 2")
+        self.assertEqual([line.split()[2] for line in lines if line.startswith("info depth")], ["1", "2"])
+        self.assertTrue(lines[-1].startswith("bestmove "))
+
+    """
+    A position command with an illegal move must not leave the position before it to be searched
+    """
+    def testIllegalMoveClearsPosition(self):
+        lines = self.session("position fen 4k3/8/8/8/8/8/8/4K2R w K - 0 1", "position fen 4k3/8/8/8/8/8/8/R3K3 b - - 0 1 "
+                             "moves e2e4", "go movetime 100")
+        self.assertEqual(lines[0], "info string Illegal move e2e4")
+        self.assertEqual(lines[-1], "bestmove 0000")
+        lines = self.session("position startpos", "go depth 1")
+        self.assertNotEqual(lines[-1], "bestmove 0000")
+
+    """
+    An error in the search thread still ends with a bestmove, or the GUI would wait forever
+    """
+    def testSearchErrorSendsBestmove(self):
+        findBestMove = ChessAI.findBestMove
+
+        def failingSearch(*args):
+            raise KeyError("--")
+        ChessAI.findBestMove = failingSearch
+        try:
+            lines = self.session("position startpos", "go movetime 100")
+        finally:
+            ChessAI.findBestMove = findBestMove
+        self.assertEqual(lines, ["info string search failed: KeyError: '--'", "bestmove 0000"])
+        self.assertEqual(len(self.engine.gs.moveLog), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()